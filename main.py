@@ -1,26 +1,36 @@
 # main.py
 # B站直播间点歌系统主入口
 
+import time
+STARTUP_AT = time.perf_counter()  # 启动计时起点（统计至首次轮询的耗时）
+
+import argparse
 import asyncio
 import sys
 import threading
-import time
 from watchdog.observers import Observer
 
 # 导入所有模块
-from modules.config_loader import ConfigLoader, ConfigReloadHandler, load_preset_config
+from modules.config_loader import ConfigLoader, ConfigReloadHandler, FileReloadHandler, load_preset_config
 from modules.music_bot import MusicBot
 from modules.listener import BilibiliListener
 from modules.player import Player
 from modules.queue_manager import QueueManager
 from modules.permission import PermissionManager, WhitelistReloadHandler
 from modules.command_handler import CommandHandler
-from modules.logger import Logger, HistoryManager
-from modules.gui import LogWindow, setup_gui_logging
-from modules.utils import check_and_install_requirements, format_system_output, format_admin_output, format_group_output, format_user_output, format_denied_output, is_valid_bilibili_id, parse_bilibili_id, load_fused_keys
-from modules.hotkeys import HotkeyManager  # 新增导入
+from modules.logger import Logger
+from modules.history import HistoryManager
+from modules.analytics import Analytics
+from modules.song_index import SongIndex
+from modules.persistence import persistence
+from modules.log_sink import install_log_sink
+from modules.control_server import ControlServer
+from modules.runtime import Runtime
+from modules.event_bus import DROP_OLDEST, UNBOUNDED, Enqueued, EventBus, TrackEnded, TrackStarted
+from modules.pipeline import RequestPipeline
+from modules.utils import check_and_install_requirements, format_system_output
 
-def main():
+def main(headless=False):
     # 检查并安装依赖
     check_and_install_requirements()
     
@@ -31,27 +41,76 @@ def main():
     # 初始化预设配置
     preset_config = load_preset_config()
     
+    # 监听、播放、命令处理与计时器共用的事件循环；其他线程只经它的桥接方法交付工作
+    runtime = Runtime()
+    # 模块之间以事件通知：点歌、入队、开始/结束播放
+    bus = EventBus()
+    
     # 初始化各模块
-    logger = Logger(config.get("env_log_file", "data/requests.log"))
-    history_manager = HistoryManager()
+    analytics = Analytics(
+        snapshot_file=config.get("env_analytics_file", "data/analytics.json"),
+        snapshot_interval=config.get("env_analytics_interval", 300)
+    )
+    # 本地歌曲索引：先用点歌日志中的歌曲填充，随机歌单在后台补充
+    song_index = SongIndex(threshold=config.get("env_index_threshold", 0.75))
+    # 点歌日志在启动时只扫描一遍，同时填充日志索引、歌曲索引与（首次启动时的）统计
+    log_consumers = [lambda record, item: song_index.add_item(item)]
+    seed_analytics = not analytics.load()
+    if seed_analytics:
+        log_consumers.append(analytics.seed_record)
+    logger = Logger(
+        config.get("env_log_file", "data/requests.log"),
+        flush_interval=config.get("env_log_flush_interval", 1.0),
+        fsync=config.get("env_log_fsync", "flush"),
+        max_bytes=config.get("env_log_max_bytes", 10 * 1024 * 1024),
+        backup_count=config.get("env_log_backups", 5),
+        analytics=analytics,
+        consumers=log_consumers
+    )
+    if seed_analytics:
+        # 首次启动：统计已在上面的扫描中重建
+        analytics.save()
+    history_manager = HistoryManager(
+        capacity=config.get("env_history_capacity", 50),
+        spill_file=config.get("env_history_file", "data/history.jsonl"),
+        analytics=analytics,
+        song_index=song_index
+    )
     queue_manager = QueueManager(maxsize=config.get("env_queue_maxsize", 5))
     permission_manager = PermissionManager(config)
     music_bot = MusicBot(
         session_file=config.get("env_session_file", "data/session.ncm"),
-        fallback_playlist_id=config.get("env_playlist", 9162892605)
+        fallback_playlist_id=config.get("env_playlist", 9162892605),
+        song_index=song_index,
+        background_login=True  # 登录与其余模块的启动并行
     )
     
-    # 初始化GUI
-    gui_log = LogWindow(
-        title="CLI",
-        geometry="400x200",
-        alpha=config.get("env_alpha", 1.0)  # 使用原始配置键名
-    )
+    # 初始化GUI（无界面模式下不导入 tkinter）
+    gui_log = None
+    if not headless:
+        from modules.gui import LogWindow
+        gui_log = LogWindow(
+            title="CLI",
+            geometry="400x200",
+            alpha=config.get("env_alpha", 1.0),  # 使用原始配置键名
+            max_lines=config.get("env_gui_max_lines", 1000),
+            flush_interval=config.get("env_gui_flush_ms", 50)
+        )
     
     # 初始化播放器
     player = Player(
         mpv_path=config.get("env_mpv_path", "mpv"),
-        video_timeout_buffer=config.get("env_video_timeout_buffer", 3)
+        video_timeout_buffer=config.get("env_video_timeout_buffer", 3),
+        history=history_manager,
+        bus=bus
+    )
+    
+    # 设置日志输出：GUI（如有）、控制台与轮转日志文件
+    log_sink = install_log_sink(
+        gui_log,
+        capacity=config.get("env_console_lines", 2000),
+        log_file=config.get("env_console_log_file", "data/console.log") or None,
+        max_bytes=config.get("env_console_log_max_bytes", 5 * 1024 * 1024)
     )
     
     # 初始化命令处理器 - 传递gui_log参数
@@ -61,196 +120,177 @@ def main():
         permission_manager=permission_manager,
         music_bot=music_bot,
         config=config,
-        gui_log=gui_log  # 传递GUI对象
+        gui_log=gui_log,  # 传递GUI对象
+        logger=logger,
+        analytics=analytics,
+        config_loader=config_loader,
+        log_sink=log_sink,
+        bus=bus
     )
     
-    # 设置GUI日志输出
-    setup_gui_logging(gui_log)
     
-    # 初始化快捷键管理器
-    hotkey_manager = HotkeyManager(player, queue_manager)
+    def build_song_index():
+        # 词典映射中指向歌曲ID的词条作为别名
+        aliases = {key: int(value) for key, value in command_handler.dict_map.items() if str(value).isdigit()}
+        count = music_bot.build_song_index(aliases)
+        print(format_system_output(f"本地歌曲索引已就绪: {len(song_index)} 首 (歌单 {count} 首)"))
+    
+    threading.Thread(target=build_song_index, daemon=True).start()
+    
+    # 初始化快捷键管理器（无界面模式下不导入 keyboard / pynput）
+    hotkey_manager = None
+    if not headless:
+        from modules.hotkeys import HotkeyManager
+        hotkey_manager = HotkeyManager(player, queue_manager, history_manager, runtime=runtime)
+    
+    # 弹幕处理流程：请求路径只负责权限、解析与入队，结果以事件发布
+    pipeline = RequestPipeline(bus, permission_manager, queue_manager, music_bot, command_handler, config)
+    
+    # 事件订阅者：各自独立消费，不拖慢请求路径
+    # 点歌日志（含统计）与播放历史需要持久化，队列不限长，突发时不丢事件
+    bus.subscribe(Enqueued, lambda event: logger.log_request(event.item.requester, event.item),
+                  maxsize=UNBOUNDED, name="logger")
+    bus.subscribe(TrackEnded, lambda event: history_manager.record(event.play), maxsize=UNBOUNDED, name="history")
+    if gui_log is not None:
+        # 窗口标题显示正在播放的歌曲，只关心最新状态
+        def show_now_playing(event):
+            text = f"♪ {event.item.display()}" if isinstance(event, TrackStarted) else None
+            gui_log.submit(gui_log.set_status, text)
+        bus.subscribe((TrackStarted, TrackEnded), show_now_playing, maxsize=4, policy=DROP_OLDEST, name="gui")
+    
+    def report_startup():
+        elapsed = time.perf_counter() - STARTUP_AT
+        budget = config.get("env_startup_budget", 5.0)
+        note = "" if elapsed <= budget else f" (超出预算 {budget:.1f}s)"
+        print(format_system_output(f"启动完成: {elapsed:.2f}s 至首次轮询{note}"))
     
-    # 定义消息处理回调
-    async def handle_message(msg_data):
-        raw_content = msg_data.get('text', '')
-        content = raw_content.strip()
-        user_name = msg_data.get('nickname', '未知')
-        
-        # 确定用户类型
-        if permission_manager.is_admin(user_name):
-            user_prefix = "ADM"
-            print(format_admin_output(user_name, content))
-        elif permission_manager.has_permission(user_name):
-            user_prefix = "GRP"
-            print(format_group_output(user_name, content))
-        else:
-            user_prefix = "USR"
-            print(format_user_output(user_name, content))
-        
-        # 检查管理员密钥
-        is_valid, result = permission_manager.is_valid_admin_key(content)
-        if is_valid:
-            admin_key = result
-            if user_name not in permission_manager.admins:
-                permission_manager.add_admin(user_name)
-                print(format_system_output(f"{user_name} 成为管理员"))
-                permission_manager.save_fused_key(admin_key)
-                print(format_system_output(f"{admin_key} 熔断"))
-            else:
-                print(format_system_output(f"{user_name} 已经是管理员"))
-            return  
-        
-        # 检查是否是命令
-        if content.startswith('!'):
-            result = await command_handler.handle_command(user_name, content)
-            if result:
-                print(format_system_output(result))
-            return
-        
-        # 检查是否包含"撤销"关键词
-        if "撤销" in content:
-            removed_count = queue_manager.remove_user_songs(user_name, logger.log_file)
-            if removed_count > 0:
-                print(format_system_output(f"{user_name} 撤销了 {removed_count} 首歌曲"))
-            return
-        
-        # 统一处理点歌请求（包括音乐和视频）
-        if content.startswith(("点歌：", "点歌:")):
-            query = content.replace("点歌：", "").replace("点歌:", "").strip()
-            if not query: 
-                return
-            print(format_system_output(f"收到点歌请求: {query} (来自: {user_name})"))
-            
-            # 检查词典映射
-            if query in command_handler.dict_map:
-                print(format_system_output(f"完成映射: {query} -> {command_handler.dict_map[query]}"))
-                query = command_handler.dict_map[query]
-            
-            # 检查用户权限
-            has_perm = permission_manager.check_user_temp_grant(user_name)
-            
-            if not has_perm:
-                print(format_system_output(f"{user_name} 's request aborted: Permission denied"))
-                return
-            
-            # 检查是否是B站视频ID
-            parsed_video_id, p_number = parse_bilibili_id(query)
-            
-            if is_valid_bilibili_id(parsed_video_id) and config.get("enable_video_playback", True):
-                # 处理视频ID
-                if queue_manager.size() >= 5:
-                    print(format_system_output("点歌队列已满，无法加入"))
-                    return
-                # 如果有分p信息，构建完整的URL
-                if p_number:
-                    video_url = f"{parsed_video_id}?p={p_number}"
-                    print(format_system_output(f"解析分p视频: {video_url}"))
-                else:
-                    video_url = parsed_video_id
-                success, msg = await queue_manager.add_song(video_url)
-                if success:
-                    print(format_system_output(f"入队成功: {video_url} (点歌者: {user_name})"))
-                    # 记录成功的视频请求
-                    logger.log_video_request(user_name, video_url)
-                    # 扣减临时次数（仅对非白名单、非时间许可用户）
-                    if (not permission_manager.has_permission(user_name) and
-                        permission_manager.grant_until_time <= time.time() and
-                        user_name in permission_manager.temp_grant_counts):
-                        permission_manager.use_temp_grant(user_name)
-            else:
-                # 处理音乐搜索
-                sid, name, artist = music_bot.get_song_info(query)
-                if sid:
-                    # 对网易云音乐进行查重检查在add_song方法中完成
-                    success, msg = await queue_manager.add_song((sid, name, artist))
-                    if success:
-                        print(format_system_output(f"入队成功: {name} (点歌者: {user_name})"))
-                        # 记录成功的点歌请求
-                        logger.log_request(user_name, name, artist)
-                        # 扣减临时次数（仅对非白名单、非时间许可用户）
-                        if (not permission_manager.has_permission(user_name) and
-                            permission_manager.grant_until_time <= time.time() and
-                            user_name in permission_manager.temp_grant_counts):
-                            permission_manager.use_temp_grant(user_name)
-                    else:
-                        print(format_system_output(msg))  # 输出查重或队列满的错误信息
-                else:
-                    print(format_system_output("未找到歌曲或无效的视频ID"))
-
     # 初始化监听器
     listener = BilibiliListener(
         room_id=config.get("env_roomid", 1896163590),
-        callback=handle_message,
-        poll_interval=config.get("env_poll_interval", 5)
+        callback=pipeline.handle_message,
+        poll_interval=config.get("env_poll_interval", 5),
+        on_first_poll=report_startup
     )
     
-    # 启动配置热重载监听
+    # 配置变更只分发给关注对应配置项的模块（GUI相关的变更转交GUI线程执行）
+    if gui_log is not None:
+        config_loader.subscribe(
+            ["env_alpha"],
+            lambda changes: gui_log.submit(gui_log.set_alpha, config_loader.get("env_alpha"))
+        )
+        config_loader.subscribe(
+            ["env_gui_max_lines"],
+            lambda changes: gui_log.submit(gui_log.set_max_lines, config_loader.get("env_gui_max_lines"))
+        )
+        config_loader.subscribe(
+            ["env_gui_flush_ms"],
+            lambda changes: setattr(gui_log, "flush_interval", config_loader.get("env_gui_flush_ms"))
+        )
+    config_loader.subscribe(
+        ["env_video_timeout_buffer"],
+        lambda changes: setattr(player, "video_timeout_buffer", config_loader.get("env_video_timeout_buffer"))
+    )
+    config_loader.subscribe(["env_console_lines"], lambda changes: log_sink.resize(config_loader.get("env_console_lines")))
+    config_loader.subscribe(
+        ["env_index_threshold"],
+        lambda changes: setattr(song_index, "threshold", config_loader.get("env_index_threshold"))
+    )
+    config_loader.subscribe(
+        ["env_admin_password"],
+        lambda changes: setattr(permission_manager, "admin_password", config_loader.get("env_admin_password"))
+    )
+    config_loader.subscribe(
+        ["env_default_admins"],
+        lambda changes: setattr(permission_manager, "admins", set(config_loader.get("env_default_admins")))
+    )
+    
+    # 启动配置热重载监听（重载回调转交事件循环执行，不在看门狗线程中修改共享状态）
     observer = Observer()
     observer.schedule(
-        ConfigReloadHandler(config_loader, lambda new_config: update_config(new_config, gui_log, player, permission_manager, command_handler)),
+        ConfigReloadHandler(config_loader, dispatch=runtime.call),
+        path="config",
+        recursive=False
+    )
+    # 启动词典映射热重载监听
+    observer.schedule(
+        FileReloadHandler("./config/dict.json", command_handler.reload_dict_map, dispatch=runtime.call),
         path="config",
         recursive=False
     )
     # 启动白名单热重载监听
     observer.schedule(
-        WhitelistReloadHandler(permission_manager),
+        WhitelistReloadHandler(permission_manager, dispatch=runtime.call),
         path="config",
         recursive=False
     )
     observer.start()
     
-    # 启动播放器
-    def start_player():
-        asyncio.run(
-            player.start_player(
-                queue_manager.song_queue,
-                music_bot,
-                config.get("enable_fallback_playlist", True),
-                config.get("env_playlist", 9162892605)
-            )
-        )
+    def shutdown():
+        if hotkey_manager is not None:
+            print("[SYS] 停止快捷键监听器...")
+            hotkey_manager.stop_listening()
+        print("[SYS] 停止看门狗监听器...")
+        observer.stop()
+        observer.join()
+        print("[SYS] 看门狗监听器已停止")
+        # 取消事件循环中的任务（监听器借此关闭连接池）
+        runtime.stop()
+        # 处理尚未被订阅者消费的事件（如待写入的点歌日志）
+        bus.drain()
+        # 刷新缓冲中的日志
+        logger.close()
+        history_manager.close()
+        analytics.save()
+        # 写入尚在合并等待中的配置/状态文件
+        persistence.flush()
+        log_sink.close()
     
-    # 启动快捷键监听器
-    def start_hotkeys():
-        hotkey_manager.start_listening()
+    def start_player_loop():
+        return player.start_player(
+            queue_manager.song_queue,
+            music_bot,
+            config.get("enable_fallback_playlist", True),
+            config.get("env_playlist", 9162892605)
+        )
     
-    # 启动播放器线程
-    player_thread = threading.Thread(target=start_player, daemon=True)
-    player_thread.start()
+    control_server = None
+    if headless:
+        # 无界面模式：管理命令经本地控制端口下发
+        control_port = config.get("env_control_port", 8765)
+        control_server = ControlServer(
+            command_handler,
+            password=config.get("env_admin_password", ""),
+            host=config.get("env_control_host", "127.0.0.1"),
+            port=control_port
+        ) if control_port else None
     
-    # 启动快捷键监听线程
-    hotkey_thread = threading.Thread(target=start_hotkeys, daemon=True)
-    hotkey_thread.start()
+    async def run_services():
+        # 监听、播放与命令处理共用同一个事件循环
+        bus.start()
+        tasks = [start_player_loop(), listener.start()]
+        if control_server:
+            tasks.append(control_server.serve_forever())
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            # 退出时事件循环取消本任务，在此关闭备线浏览器
+            await command_handler.close()
     
-    # 启动监听器
-    def start_listener():
-        asyncio.run(listener.start())
+    if headless:
+        try:
+            runtime.run(run_services())
+        except KeyboardInterrupt:
+            print(format_system_output("程序被用户中断"))
+        finally:
+            shutdown()
+        return
     
-    listener_thread = threading.Thread(target=start_listener, daemon=True)
-    listener_thread.start()
+    # 事件循环运行在工作线程中，主线程留给 Tk
+    runtime.start(run_services())
     
-    # 更新配置的回调函数
-    def update_config(new_config, gui_log, player, permission_manager, command_handler):
-        # 更新GUI透明度
-        alpha = new_config.get("env_alpha", 1.0)  # 使用原始配置键名
-        gui_log.set_alpha(alpha)
-        # 更新管理员列表
-        permission_manager.admins = set(new_config.get("env_default_admins", ["磕磕绊绊学语文", "琴吹炒面"]))
-        # 更新权限管理器配置
-        permission_manager.config = new_config
-        permission_manager.admin_password = new_config.get("env_admin_password", "mysecret")
-        # 更新播放器配置
-        player.video_timeout_buffer = new_config.get("env_video_timeout_buffer", 3)
-        # 更新命令处理器配置
-        command_handler.config.update(new_config)
-        command_handler.fallback_playlist_id = new_config.get("env_playlist", 9162892605)
-        command_handler.enable_video_playback = new_config.get("enable_video_playback", True)
-        command_handler.video_timeout_buffer = new_config.get("env_video_timeout_buffer", 3)
-        command_handler.enable_fallback_playlist = new_config.get("enable_fallback_playlist", True)
-        command_handler.queue_maxsize = new_config.get("env_queue_maxsize", 5)
-        # 重新加载词典映射
-        command_handler.dict_map = command_handler.load_dict_map()
-        print("[SYS] 配置已热重载")
+    # 快捷键监听线程只负责接收按键，操作经桥接转交事件循环
+    hotkey_thread = threading.Thread(target=hotkey_manager.start_listening, daemon=True)
+    hotkey_thread.start()
     
     # 启动GUI
     try:
@@ -258,12 +298,10 @@ def main():
     except KeyboardInterrupt:
         print(format_system_output("程序被用户中断"))
     finally:
-        print("[SYS] 停止快捷键监听器...")
-        hotkey_manager.stop_listening()
-        print("[SYS] 停止看门狗监听器...")
-        observer.stop()
-        observer.join()
-        print("[SYS] 看门狗监听器已停止")
+        shutdown()
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="B站直播间点歌系统")
+    parser.add_argument("--headless", action="store_true", help="无界面模式：不启动GUI与快捷键，通过本地控制端口管理")
+    args = parser.parse_args()
+    main(headless=args.headless)
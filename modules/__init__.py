@@ -6,11 +6,29 @@ B站直播间点歌系统模块包
 - config_loader: 配置文件管理
 - music_bot: 网易云音乐API集成
 - listener: B站直播间监听
+- http_client: 共享HTTP连接池与LRU+TTL结果缓存
 - player: MPV播放器控制
 - queue_manager: 播放队列管理
+- unorthodox: 备线音乐源（直连解析，浏览器池兜底）
+- queue_item: 播放队列条目模型
 - permission: 权限验证和白名单管理
+- grant_store: 临时点歌授权存储
 - command_handler: 命令处理逻辑
+- command_registry: 命令注册与查表分发
+- alias_map: 点歌词典映射（归一化与模糊匹配）
+- persistence: 配置/状态文件的合并原子写入
 - logger: 日志记录系统
+- log_writer: 缓冲式后台日志写入
+- tail: 日志尾部读取与跟随
+- log_sink: 控制台输出汇聚（环形缓冲区，分发到GUI/文件/控制台）
+- history: 播放历史（环形缓冲区）
+- song_index: 本地歌曲模糊索引
+- analytics: 点歌/播放增量统计
 - gui: GUI界面展示
+- control_server: 无界面模式的本地管理控制端口
+- runtime: 单事件循环运行时与跨线程桥接
+- event_bus: 进程内事件总线（有界队列与丢弃策略）
+- pipeline: 弹幕消息与点歌请求处理流程
 - utils: 通用工具函数
+- startup: 启动导入耗时测试
 """
\ No newline at end of file
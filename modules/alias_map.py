@@ -0,0 +1,208 @@
+# modules/alias_map.py
+# 点歌词典映射模块
+
+import time
+
+from modules.utils import normalize_text
+
+MAX_DISTANCE = 2   # 模糊匹配允许的最大编辑距离
+
+def _deletions(text, depth):
+    """删除至多 depth 个字符得到的所有变体（含自身）"""
+    variants = {text}
+    frontier = {text}
+    for _ in range(depth):
+        frontier = {item[:i] + item[i + 1:] for item in frontier for i in range(len(item))}
+        variants |= frontier
+    return variants
+
+def _distance(a, b, limit):
+    """编辑距离（超过 limit 时提前返回 limit + 1）"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev = list(range(len(b) + 1))
+    for i, char in enumerate(a, 1):
+        row = [i]
+        for j, other in enumerate(b, 1):
+            row.append(min(row[j - 1] + 1, prev[j] + 1, prev[j - 1] + (char != other)))
+        if min(row) > limit:
+            return limit + 1
+        prev = row
+    return prev[-1]
+
+class _TrieNode:
+    __slots__ = ("children", "key", "count")
+
+    def __init__(self):
+        self.children = {}
+        self.key = None     # 以此节点结尾的归一化键
+        self.count = 0      # 子树中的键数量
+
+class AliasMap(dict):
+    """
+    词典映射（原始键 -> 目标），同时维护归一化键的前缀树
+    查询依次尝试：原样匹配、归一化匹配、唯一前缀补全、有界编辑距离匹配
+    编辑距离匹配使用对称删除索引（键与查询各自删除至多N个字符后查表），
+    增删条目时增量更新，查询代价只与查询长度相关，与词条数量无关
+    """
+
+    def __init__(self, data=None, min_prefix=3):
+        super().__init__()
+        self.min_prefix = min_prefix    # 前缀补全要求的最短查询长度
+        self._root = _TrieNode()
+        self._raw = {}                  # 归一化键 -> 原始键列表
+        self._deletes = {}              # 删除变体 -> {归一化键}
+        for key, value in (data or {}).items():
+            self[key] = value
+
+    # ---------- 增量维护 ----------
+
+    def _insert(self, norm):
+        path = [self._root]
+        for char in norm:
+            path.append(path[-1].children.setdefault(char, _TrieNode()))
+        if path[-1].key is not None:
+            return
+        path[-1].key = norm
+        for node in path:
+            node.count += 1
+        for variant in _deletions(norm, MAX_DISTANCE):
+            self._deletes.setdefault(variant, set()).add(norm)
+
+    def _remove(self, norm):
+        path = [self._root]
+        for char in norm:
+            path.append(path[-1].children[char])
+        path[-1].key = None
+        for node in path:
+            node.count -= 1
+        # 删除空的分支
+        for depth in range(len(norm), 0, -1):
+            if path[depth].count == 0:
+                del path[depth - 1].children[norm[depth - 1]]
+        for variant in _deletions(norm, MAX_DISTANCE):
+            keys = self._deletes[variant]
+            keys.discard(norm)
+            if not keys:
+                del self._deletes[variant]
+
+    def __setitem__(self, key, value):
+        if key not in self:
+            norm = normalize_text(key)
+            if norm:
+                self._raw.setdefault(norm, []).append(key)
+                self._insert(norm)
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        norm = normalize_text(key)
+        keys = self._raw.get(norm)
+        if keys:
+            keys.remove(key)
+            if not keys:
+                del self._raw[norm]
+                self._remove(norm)
+
+    def pop(self, key, *default):
+        if key in self:
+            value = self[key]
+            del self[key]
+            return value
+        return super().pop(key, *default)
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def sync(self, data):
+        """与新内容对齐（只增删/修改有差异的词条），返回变更数"""
+        changed = 0
+        for key in [key for key in self if key not in data]:
+            del self[key]
+            changed += 1
+        for key, value in data.items():
+            if key not in self or self[key] != value:
+                self[key] = value
+                changed += 1
+        return changed
+
+    def clear(self):
+        super().clear()
+        self._root = _TrieNode()
+        self._raw.clear()
+        self._deletes.clear()
+
+    # ---------- 查询 ----------
+
+    def _value(self, norm):
+        return self[self._raw[norm][-1]]
+
+    def _prefix(self, norm):
+        """唯一以 norm 为前缀的键"""
+        node = self._root
+        for char in norm:
+            node = node.children.get(char)
+            if node is None:
+                return None
+        if node.count != 1:
+            return None
+        while node.key is None:
+            node = next(iter(node.children.values()))
+        return node.key
+
+    def _fuzzy(self, norm, max_distance):
+        """编辑距离不超过 max_distance 的唯一最近键（目标不同的并列结果视为歧义）"""
+        candidates = set()
+        for variant in _deletions(norm, max_distance):
+            candidates |= self._deletes.get(variant, set())
+        best, best_distance, ambiguous = None, max_distance + 1, False
+        for key in candidates:
+            distance = _distance(norm, key, max_distance)
+            if distance < best_distance:
+                best, best_distance, ambiguous = key, distance, False
+            elif best is not None and distance == best_distance and self._value(key) != self._value(best):
+                ambiguous = True
+        return None if ambiguous else best
+
+    def resolve(self, query):
+        """查找映射，返回 (命中的原始键, 目标)；未命中返回None"""
+        if query in self:
+            return query, self[query]
+        norm = normalize_text(query)
+        if not norm:
+            return None
+        match = norm if norm in self._raw else None
+        if match is None and len(norm) >= self.min_prefix:
+            match = self._prefix(norm)
+        if match is None and len(norm) >= 3:
+            # 短查询只允许1处差异，较长查询允许2处
+            match = self._fuzzy(norm, 1 if len(norm) <= 6 else MAX_DISTANCE)
+        if match is None:
+            return None
+        return self._raw[match][-1], self._value(match)
+
+def _benchmark(count=50000, queries=5000):
+    """查询耗时测试：原样 / 归一化 / 编辑距离匹配"""
+    import random
+    random.seed(0)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    data = {''.join(random.choices(letters, k=random.randint(4, 10))): str(i) for i in range(count)}
+    start = time.perf_counter()
+    aliases = AliasMap(data)
+    print(f"{len(aliases)} 条映射: 构建 {time.perf_counter() - start:.2f}s")
+    keys = random.sample(list(aliases), queries)
+    cases = {
+        "原样": keys,
+        "归一化": [f" {key.upper()} " for key in keys],
+        "一处错字": [key[:-1] + ("x" if key[-1] != "x" else "y") for key in keys],
+    }
+    for label, samples in cases.items():
+        start = time.perf_counter()
+        hits = sum(1 for query in samples if aliases.resolve(query))
+        elapsed = time.perf_counter() - start
+        print(f"{label}: {elapsed / queries * 1e6:.1f} µs/次, 命中 {hits}/{queries}")
+
+if __name__ == "__main__":
+    # python -m modules.alias_map
+    _benchmark()
@@ -0,0 +1,177 @@
+# modules/analytics.py
+# 点歌/播放统计模块
+
+import heapq
+import json
+import os
+import time
+from datetime import datetime
+from operator import itemgetter
+
+from modules.logger import Logger
+from modules.persistence import persistence
+from modules.queue_item import QueueItem
+
+class Analytics:
+    """
+    增量统计：热门歌曲、点歌用户排行、分时段分布与跳过率
+    所有计数在事件到达时更新，查询代价与日志长度无关
+    """
+
+    def __init__(self, snapshot_file="data/analytics.json", snapshot_interval=300, window_days=7):
+        self.snapshot_file = snapshot_file
+        self.snapshot_interval = snapshot_interval
+        self.window_days = window_days
+        self._last_snapshot = time.time()
+        self._reset()
+
+    def _reset(self):
+        self.song_names = {}       # 歌曲键 -> 展示名
+        self.song_counts = {}      # 歌曲键 -> 总点歌次数
+        self.user_counts = {}      # 用户 -> 总点歌次数
+        self.hourly = [0] * 24     # 每小时（0-23时）点歌次数
+        self.plays = {}            # 歌曲键 -> [播放次数, 跳过次数]
+        self.daily = {}            # 日序号 -> {"songs": {...}, "users": {...}}
+        self.window_songs = {}     # 近 window_days 天的歌曲计数
+        self.window_users = {}     # 近 window_days 天的用户计数
+
+    @staticmethod
+    def _bump(counter, key, delta=1):
+        value = counter.get(key, 0) + delta
+        if value > 0:
+            counter[key] = value
+        else:
+            counter.pop(key, None)
+
+    def _roll_window(self, today):
+        """淘汰窗口外的日计数，并从窗口计数中扣除"""
+        for day in [d for d in self.daily if d <= today - self.window_days]:
+            expired = self.daily.pop(day)
+            for key, count in expired["songs"].items():
+                self._bump(self.window_songs, key, -count)
+            for user, count in expired["users"].items():
+                self._bump(self.window_users, user, -count)
+
+    def record_request(self, username, item, ts=None):
+        """记录一次成功的点歌请求"""
+        ts = time.time() if ts is None else ts
+        moment = datetime.fromtimestamp(ts)
+        key = Logger.song_key(item)
+        self.song_names[key] = item.display()
+        self._bump(self.song_counts, key)
+        self._bump(self.user_counts, username)
+        self.hourly[moment.hour] += 1
+
+        today = moment.toordinal()
+        self._roll_window(datetime.now().toordinal())
+        if today > datetime.now().toordinal() - self.window_days:
+            day = self.daily.setdefault(today, {"songs": {}, "users": {}})
+            self._bump(day["songs"], key)
+            self._bump(day["users"], username)
+            self._bump(self.window_songs, key)
+            self._bump(self.window_users, username)
+        self._maybe_snapshot()
+
+    def record_play(self, event):
+        """记录一次播放结束事件"""
+        key = Logger.song_key(event.item)
+        self.song_names[key] = event.item.display()
+        stats = self.plays.setdefault(key, [0, 0])
+        stats[0] += 1
+        if event.skipped:
+            stats[1] += 1
+        self._maybe_snapshot()
+
+    def top_songs(self, k=5, window=True):
+        """点歌次数最多的 k 首歌曲 [(展示名, 次数)]"""
+        if window:
+            self._roll_window(datetime.now().toordinal())
+        counts = self.window_songs if window else self.song_counts
+        return [(self.song_names.get(key, key), count)
+                for key, count in heapq.nlargest(k, counts.items(), key=itemgetter(1))]
+
+    def top_requesters(self, k=5, window=True):
+        """点歌次数最多的 k 位用户 [(用户, 次数)]"""
+        if window:
+            self._roll_window(datetime.now().toordinal())
+        counts = self.window_users if window else self.user_counts
+        return heapq.nlargest(k, counts.items(), key=itemgetter(1))
+
+    def hourly_histogram(self):
+        """每小时点歌次数（0-23时）"""
+        return list(self.hourly)
+
+    def top_skipped(self, k=5, min_plays=3):
+        """跳过率最高的 k 首歌曲 [(展示名, 跳过率, 播放次数)]"""
+        rates = [(key, skips / plays, plays) for key, (plays, skips) in self.plays.items()
+                 if plays >= min_plays and skips]
+        return [(self.song_names.get(key, key), rate, plays)
+                for key, rate, plays in heapq.nlargest(k, rates, key=itemgetter(1))]
+
+    def clear_requests(self):
+        """清空点歌计数（随点歌日志一起清空），保留播放/跳过统计"""
+        plays, names = self.plays, self.song_names
+        self._reset()
+        self.plays = plays
+        self.song_names = {key: names[key] for key in plays if key in names}
+        self.save()
+
+    def seed_from_records(self, records):
+        """从结构化点歌日志重建计数（首次启动没有快照时使用）"""
+        for record in records:
+            self.seed_record(record)
+
+    def seed_record(self, record, item=None):
+        """按一条结构化点歌记录计数（可作为 Logger 启动扫描的回调）"""
+        item = QueueItem.from_json(record["item"]) if item is None else item
+        self.record_request(record["user"], item, record["ts"])
+
+    def _maybe_snapshot(self):
+        if self.snapshot_file and time.time() - self._last_snapshot >= self.snapshot_interval:
+            self.save()
+
+    def save(self):
+        """保存统计快照"""
+        if not self.snapshot_file:
+            return False
+        data = {
+            "song_names": self.song_names,
+            "song_counts": self.song_counts,
+            "user_counts": self.user_counts,
+            "hourly": self.hourly,
+            "plays": self.plays,
+            "daily": {str(day): counts for day, counts in self.daily.items()},
+            "saved_at": time.time()
+        }
+        try:
+            persistence.write_json_now(self.snapshot_file, data, indent=None)
+            self._last_snapshot = time.time()
+            return True
+        except Exception as e:
+            print(f"[{'SYS':>3}] 保存统计快照失败: {e}")
+            return False
+
+    def load(self):
+        """加载统计快照，不存在时返回False"""
+        if not self.snapshot_file or not os.path.exists(self.snapshot_file):
+            return False
+        try:
+            with open(self.snapshot_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"[{'SYS':>3}] 加载统计快照失败: {e}")
+            return False
+        self._reset()
+        self.song_names = data.get("song_names", {})
+        self.song_counts = data.get("song_counts", {})
+        self.user_counts = data.get("user_counts", {})
+        self.hourly = data.get("hourly", [0] * 24)
+        self.plays = data.get("plays", {})
+        self.daily = {int(day): counts for day, counts in data.get("daily", {}).items()}
+        for counts in self.daily.values():
+            for key, count in counts["songs"].items():
+                self._bump(self.window_songs, key, count)
+            for user, count in counts["users"].items():
+                self._bump(self.window_users, user, count)
+        self._roll_window(datetime.now().toordinal())
+        return True
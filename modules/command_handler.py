@@ -2,175 +2,45 @@
 # 命令处理逻辑模块
 
 import re
+import os
+import json
+import asyncio
+import platform
 from datetime import datetime
+from modules.queue_item import QueueItem
+from modules.alias_map import AliasMap
+from modules.persistence import persistence
+from modules.command_registry import CommandRegistry, Arg, command, parse_bool, TRUE_VALUES
 
-class CommandHandler:
-    def __init__(self, player, queue_manager, permission_manager, music_bot, config, gui_log=None):
-        self.player = player
-        self.queue_manager = queue_manager
-        self.permission_manager = permission_manager
-        self.music_bot = music_bot
-        self.config = config
-        self.log_file = config.get("env_log_file", "data/requests.log")
-        self.fallback_playlist_id = config.get("env_playlist", 9162892605)
-        self.enable_video_playback = config.get("enable_video_playback", True)
-        self.video_timeout_buffer = config.get("env_video_timeout_buffer", 3)
-        self.enable_fallback_playlist = config.get("enable_fallback_playlist", True)
-        self.queue_maxsize = config.get("env_queue_maxsize", 5)
-        self.gui_log = gui_log  # 添加GUI引用
-        
-        # 从配置加载词典映射
-        self.dict_map = self.load_dict_map()
-        
-        # GUI相关状态变量
-        self.gui_hide_state = 0  # 0为未隐藏，1为隐藏
-        self.gui_ignore_state = 0  # 0为不穿透，1为穿透
-        self.gui_direct_state = 0  # 0为有边框，1为无边框
+# 随配置变更同步的属性：配置键 -> 属性名
+CONFIG_ATTRS = {
+    "env_playlist": "fallback_playlist_id",
+    "enable_video_playback": "enable_video_playback",
+    "env_video_timeout_buffer": "video_timeout_buffer",
+    "enable_fallback_playlist": "enable_fallback_playlist",
+    "env_queue_maxsize": "queue_maxsize",
+    "env_unorthodox": "unorthodox_enabled",
+    "env_unorthodox_pool_size": "unorthodox_pool_size",
+    "env_unorthodox_idle_timeout": "unorthodox_idle_timeout",
+    "env_unorthodox_cache_ttl": "unorthodox_cache_ttl"
+}
 
-        # 引入unorthodox功能
-        self.unorthodox_enabled = config.get("env_unorthodox", False)
+PRESET_PATH = "./config/preset.json"
 
-    def load_dict_map(self):
-        """加载词典映射文件"""
-        import json
-        import os
-        
-        dict_path = "./config/dict.json"
-        default_dict = {
-            "lll": "473403182"
-        }
-        
-        if not os.path.exists(dict_path):
-            # 创建config目录
-            os.makedirs(os.path.dirname(dict_path), exist_ok=True)
-            with open(dict_path, 'w', encoding='utf-8') as f:
-                json.dump(default_dict, f, indent=4, ensure_ascii=False)
-            print(f"[SYS] 词典映射文件已创建: {dict_path}")
-            return default_dict
-        
-        with open(dict_path, 'r', encoding='utf-8') as f:
-            print(f"[SYS] {dict_path} 已加载")
-            return json.load(f)
-    
-    def save_dict_map(self):
-        """保存词典映射到文件"""
-        import json
-        import os
-        
-        dict_path = "./config/dict.json"
-        # 确保config目录存在
-        os.makedirs(os.path.dirname(dict_path), exist_ok=True)
-        with open(dict_path, 'w', encoding='utf-8') as f:
-            json.dump(self.dict_map, f, ensure_ascii=False, indent=2)
-        print(f"词典映射已保存到 {dict_path}")
-    
-    def is_valid_bilibili_id(self, video_id):
-        """检查B站视频ID格式 (av号或BV号)"""
-        # 检查av号格式 (如 av123456789)
-        if video_id.lower().startswith('av'):
-            av_num = video_id[2:]
-            return av_num.isdigit()
-        
-        # 检查BV号格式 (如 BV1xx411c7mu)
-        if video_id.startswith('BV'):
-            # BV号应为12位字符，包含字母和数字
-            return len(video_id) == 12 and re.match(r'^[a-zA-Z0-9]+$', video_id)
-        
-        return False
+# !env 可查看/设置的环境变量：名称 -> (配置键, 解析函数, 默认值)
+ENV_VARS = {
+    "ROOM_ID": ("env_roomid", int, 1896163590),
+    "POLL_INTERVAL": ("env_poll_interval", int, 5),
+    "FALLBACK_PLAYLIST_ID": ("env_playlist", int, 9162892605),
+    "QUEUE_MAXSIZE": ("env_queue_maxsize", int, 5),
+    "ENABLE_VIDEO_PLAYBACK": ("enable_video_playback", lambda value: value.lower() in TRUE_VALUES, True),
+    "VIDEO_TIMEOUT_BUFFER": ("env_video_timeout_buffer", int, 3),
+    "ENABLE_FALLBACK_PLAYLIST": ("enable_fallback_playlist", lambda value: value.lower() in TRUE_VALUES, True),
+    "ALPHA": ("env_alpha", float, 1.0),  # 保留原始配置键名，对外显示为ALPHA
+    "UNORTHODOX": ("env_unorthodox", lambda value: value.lower() in TRUE_VALUES, False)
+}
 
-    def parse_bilibili_id(self, video_id):
-        """
-        解析B站视频ID，支持BV号_pN格式
-        返回 (bv号, 分p数) 元组，如果不符合格式则返回 (原ID, None)
-        """
-        # 检查是否是BV号_pN格式
-        match = re.match(r'^(BV[A-Za-z0-9]{10})_p(\d+)$', video_id)
-        if match:
-            bv_id = match.group(1)
-            p_number = int(match.group(2))
-            return bv_id, p_number
-        
-        # 检查是否是BV号?p=N格式
-        match = re.match(r'^(BV[A-Za-z0-9]{10}).*?\?p=(\d+)$', video_id)
-        if match:
-            bv_id = match.group(1)
-            p_number = int(match.group(2))
-            return bv_id, p_number
-        
-        # 如果不是特殊格式，返回原ID
-        return video_id, None
-    
-    def log_video_request(self, username, video_id):
-        """记录成功的视频请求到日志文件"""
-        import os
-        timestamp = datetime.now().strftime('%Y:%m:%d][%H:%M:%S')
-        log_entry = f"[{timestamp}] [{username}]： 视频 - {video_id}\n"
-        # 确保data目录存在
-        os.makedirs(os.path.dirname(self.log_file), exist_ok=True)
-        with open(self.log_file, 'a', encoding='utf-8') as f:
-            f.write(log_entry)
-
-    def log_successful_request(self, username, song_name, artist):
-        """记录成功的点歌请求到日志文件"""
-        import os
-        timestamp = datetime.now().strftime('%Y:%m:%d][%H:%M:%S')
-        log_entry = f"[{timestamp}] [{username}]： {song_name} - {artist}\n"
-        # 确保data目录存在
-        os.makedirs(os.path.dirname(self.log_file), exist_ok=True)
-        with open(self.log_file, 'a', encoding='utf-8') as f:
-            f.write(log_entry)
-    
-    async def handle_command(self, user_name, command_text):
-        """处理命令"""
-        if not command_text.startswith('!'):
-            return None
-        # 检查是否是管理员
-        if not self.permission_manager.is_admin(user_name):
-            print(f"[DNY] {user_name}: {command_text}")
-            return None
-        # 解析命令
-        parts = command_text.split()
-        cmd = parts[0].lower()
-        
-        try:
-            if cmd == '!touch' and len(parts) >= 2:
-                username = parts[1]
-                if self.permission_manager.add_user_to_whitelist(username):
-                    return f"已添加 '{username}' 到白名单"
-                else:
-                    return f" '{username}' 已在白名单中"
-            elif cmd == '!rm' and len(parts) >= 2:
-                username = parts[1]
-                if self.permission_manager.remove_user_from_whitelist(username):
-                    return f"已从白名单移除  '{username}'"
-                else:
-                    return f" '{username}' 不在白名单中"
-            elif cmd == '!cat': 
-                users = self.permission_manager.list_whitelist_users()
-                if users:
-                    user_list = ", ".join(users[:10]) 
-                    if len(users) > 10:
-                        user_list += f" ... 等{len(users)}个用户"
-                    return f"白名单用户 ({len(users)}人): {user_list}"
-                else:
-                    return "白名单为空"
-            elif cmd == '!clr':
-                self.permission_manager.clear_whitelist()
-                return "白名单已清空，仅保留管理员"
-            elif cmd == '!time':
-                # !time 命令实现
-                if len(parts) == 1:
-                    # !time 无参数，输出时间部分
-                    current_time = datetime.now().strftime('%y%m%d%H')
-                    return f"{current_time}"
-                elif len(parts) == 2 and parts[1] == '-h':
-                    # !time -h 输出人类可读形式
-                    current_time_readable = datetime.now().strftime('%Y/%m/%d %H时')
-                    return f"当前时间: {current_time_readable}"
-                else:
-                    return "无效的time命令参数，使用 !help 查看帮助"
-            elif cmd == '!help':
-                help_text = """
+HELP_TEXT = """
 ~
 ┌──────────────────────
 │ [音乐播放控制]
@@ -189,6 +59,8 @@ class CommandHandler:
 │ !queue         - 显示当前队列
 │ !queue ls      - 显示当前队列
 │ !queue add ... - 添加歌曲
+│ !queue add a | b - 批量添加歌曲
+│ !queue pl ID [N] - 导入歌单前N首
 │ !queue uadd ...- 使用备用源点歌
 │ !queue del N   - 删除第N首
 │ !queue clr     - 清除队列
@@ -207,14 +79,24 @@ class CommandHandler:
 │ !grant         - 开放所有人点歌权限
 │ !grant -t SEC  - 开放SEC秒权限
 │ !grant -c NUM  - 开放NUM次权限
+│ !grant -u USER SEC - 开放单个用户SEC秒权限
 │ !revoke -c     - 收回次数权限
 │ !revoke -t     - 收回时间权限
+│ !revoke -u [USER] - 收回单用户权限
 │ !revoke        - 收回所有权限
 
 ┌──────────────────────
 │ [用户数据查询]
 ├──────────────────────
 │ !stats user    - 查询点歌记录
+│ !stats top [N] - 近7天热门歌曲
+│ !stats users [N] - 近7天点歌用户排行
+│ !stats hour    - 各时段点歌分布
+│ !stats skip [N] - 跳过率最高的歌曲
+
+│ !log tail [N]  - 查看最近N条点歌日志
+│ !log mem       - 查看控制台缓冲占用
+│ !log bus       - 查看事件总线订阅者状态
 
 ┌──────────────────────
 │ [时间查询]
@@ -267,976 +149,789 @@ class CommandHandler:
 ├──────────────────────
 │ !service           - 检查功能服务
 │ !reload            - 重新加载配置
+│ !cmdstats [N]      - 命令调用次数与耗时
 │ !help              - 显示本帮助
 
  点歌：song name / id  - 点播歌曲
-                """
-                return help_text.strip()
-            elif cmd == '!pause':
-                await self.player.pause()
-                return "已暂停播放"
-            elif cmd == '!resume':
-                await self.player.resume()
-                return "已恢复播放"
-            elif cmd == '!skip':
-                if self.player.current_mpv_process and self.player.current_mpv_process.returncode is None:
-                    # 取消计时器任务
-                    if self.player.current_timer_task and not self.player.current_timer_task.done():
-                        self.player.current_timer_task.cancel()
-                        try:
-                            await self.player.current_timer_task
-                        except asyncio.CancelledError:
-                            pass
-                    # 修复：检查skip方法是否是协程，如果不是则直接调用
-                    skip_result = self.player.skip()
-                    if skip_result and hasattr(skip_result, '__await__'):
-                        await skip_result
-                    else:
-                        # 如果skip方法不是协程，直接调用
-                        pass
-                    return "已跳过当前歌曲"
-                else:
-                    return "当前无播放中的歌曲"
-            elif cmd == '!vol':
-                if len(parts) < 2:
-                    # 查询当前音量
-                    return f"当前音量: {self.player.get_volume()}"
-                else:
-                    # 设置音量
-                    try:
-                        vol = int(parts[1])
-                        if 0 <= vol <= 100:
-                            self.player.set_volume(vol)
-                            return f"音量已设为 {vol}"
-                        else:
-                            return "音量范围必须是 0-100"
-                    except ValueError:
-                        return "音量必须是整数"
-            elif cmd == '!queue':
-                # 检查是否有子命令
-                if len(parts) < 2:
-                    # !queue 或 !queue ls
-                    return await self._get_queue_status()
-                else:
-                    sub_cmd = parts[1].lower()
-                    if sub_cmd == 'ls':
-                        # !queue ls
-                        return await self._get_queue_status()
-                    elif sub_cmd == 'add' and len(parts) >= 3:
-                        # !queue add 歌名或id
-                        query = ' '.join(parts[2:])
-                        return await self._queue_add(query)
-                    elif sub_cmd == 'del' and len(parts) == 3:
-                        # !queue del <1-5>
-                        try:
-                            index = int(parts[2])
-                            return await self._queue_del(index)
-                        except ValueError:
-                            return f"无效的歌曲序号，请输入1-{self.queue_maxsize}之间的数字"
-                    elif sub_cmd == 'clr':
-                        # !queue clr
-                        return await self._queue_clr()
-                    elif sub_cmd == 'uadd' and len(parts) >= 3:
-                        # !queue uadd 歌名或id (使用非正统音乐源)
-                        query = ' '.join(parts[2:])
-                        return await self._queue_unorthodox_add(query)
-                    else:
-                        return f"未知的 queue 子命令: {' '.join(parts[1:])}，使用 !help 查看帮助"
-            elif cmd == '!history':
-                try:
-                    # 修改这里：当没有传入参数时，默认为5
-                    num = int(parts[1]) if len(parts) > 1 else 5
-                    # 使用queue_manager的get_history_stack方法
-                    if self.queue_manager:
-                        history_items = self.queue_manager.get_history_stack(num)
-                    else:
-                        history_items = self.player.get_play_history(num)
-                    lines = ["最近播放:"]
-                    for item in reversed(history_items):
-                        if isinstance(item, tuple) and len(item) >= 3:
-                            sid, name, artist = item
-                            lines.append(f"{name} - {artist}")
-                        else:
-                            lines.append(f"{item}")
-                    return "\n".join(lines)
-                except (ValueError, IndexError):
-                    return "!history [数量]"
-            elif cmd == '!now':
-                current_playing = self.player.get_current_playing()
-                if current_playing:
-                    _, name, artist = current_playing
-                    return f"正在播放: {name} - {artist}"
-                else:
-                    return "当前无播放"
-            elif cmd == '!grant' and len(parts) == 1:
-                # !grant 无参数，允许所有人点歌
-                self.permission_manager.grant_temp_access("time", float('inf'))
-                return "Temporarily Grant Access"
-            elif cmd == '!grant' and len(parts) >= 3:
-                if parts[1] == '-t':
-                    try:
-                        sec = int(parts[2])
-                        self.permission_manager.grant_temp_access("time", sec)
-                        return f"Grant Access for {sec} s"
-                    except ValueError:
-                        return "时间必须为整数"
-                elif parts[1] == '-c':
-                    try:
-                        count = int(parts[2])
-                        if 0 <= count <= 100:
-                            self.permission_manager.grant_temp_access("count", count)
-                            return f"counts.add = {count}"
-                        else:
-                            return "次数范围 0-100"
-                    except ValueError:
-                        return "次数必须为整数"
-            elif cmd == '!revoke':
-                if len(parts) > 1:
-                    sub_cmd = parts[1].lower()
-                    if sub_cmd == '-c':
-                        self.permission_manager.revoke_temp_access("count")
-                        return "Revoke Permission C"
-                    elif sub_cmd == '-t':
-                        self.permission_manager.revoke_temp_access("time")
-                        return "Revoke Permission"
-                    elif sub_cmd in ['-ct', '-tc']:
-                        self.permission_manager.revoke_temp_access("all")
-                        return "Revoke Permission"
-                else:
-                    # !revoke 无参数，等同于 -ct
-                    self.permission_manager.revoke_temp_access("all")
-                    return "Revoke Permission"
-            elif cmd == '!stats' and len(parts) >= 2:
-                target = parts[1]
-                records = []
-                try:
-                    with open(self.log_file, 'r', encoding='utf-8') as f:
-                        for line in f:
-                            if f"[{target}]：" in line:
-                                try:
-                                    song_info = line.split(']： ', 1)[1].strip()
-                                    records.append(song_info)
-                                except:
-                                    continue
-                    if records:
-                        recent = records[-5:]  # 最近5条
-                        return f"{target} 点过 {len(records)} 首歌\n最近5首:\n" + "\n".join(recent)
-                    else:
-                        return f"{target} 没有点过歌"
-                except Exception as e:
-                    return f"查询失败: {e}"
-            elif cmd == '!clock':
-                # !clock 命令实现
-                if len(parts) == 1:
-                    # 查看当前 VIDEO_TIMEOUT_BUFFER
-                    return f"VIDEO_TIMEOUT_BUFFER: {self.video_timeout_buffer}"
-                elif len(parts) == 2:
-                    # 设置（已有逻辑）
-                    try:
-                        num = int(parts[1])
-                        if num < 0:
-                            return "Undefined Behavior"
-                        if num > 300:  # 限制最大值为300秒（5分钟）
-                            return "Undefined Behavior"
-                        
-                        # 更新全局变量
-                        self.video_timeout_buffer = num
-                        # 更新配置文件
-                        self.config["env_video_timeout_buffer"] = self.video_timeout_buffer
-                        import json
-                        with open("config/config.json", "w", encoding="utf-8") as f:
-                            json.dump(self.config, f, indent=4, ensure_ascii=False)
-                        
-                        return f"超时参数: {num} s"
-                    except ValueError:
-                        return "Invalid Literal"
-            elif cmd == '!env':
-                # !env 命令实现
-                if len(parts) == 1:
-                    # 查看所有环境变量
-                    env_vars = {
-                        "ROOM_ID": self.config.get("env_roomid", 1896163590),
-                        "POLL_INTERVAL": self.config.get("env_poll_interval", 5),
-                        "FALLBACK_PLAYLIST_ID": self.fallback_playlist_id,
-                        "QUEUE_MAXSIZE": self.queue_maxsize,
-                        "ENABLE_VIDEO_PLAYBACK": self.enable_video_playback,
-                        "VIDEO_TIMEOUT_BUFFER": self.video_timeout_buffer,
-                        "ENABLE_FALLBACK_PLAYLIST": self.enable_fallback_playlist,
-                        "ALPHA": self.config.get("env_alpha", 1.0),
-                        "UNORTHODOX": self.config.get("env_unorthodox", False)
-                    }
-                    result = []
-                    for var_name, var_value in env_vars.items():
-                        result.append(f"{var_name}: {var_value}")
-                    return "\n"+"\n".join(result)
-                elif len(parts) == 2:
-                    # 查询单个环境变量
-                    var_name = parts[1].upper()
-                    if var_name == "ROOM_ID":
-                        return f"ROOM_ID: {self.config.get('env_roomid', 1896163590)}"
-                    elif var_name == "POLL_INTERVAL":
-                        return f"POLL_INTERVAL: {self.config.get('env_poll_interval', 5)}"
-                    elif var_name == "FALLBACK_PLAYLIST_ID":
-                        return f"FALLBACK_PLAYLIST_ID: {self.fallback_playlist_id}"
-                    elif var_name == "QUEUE_MAXSIZE":
-                        return f"QUEUE_MAXSIZE: {self.queue_maxsize}"
-                    elif var_name == "ENABLE_VIDEO_PLAYBACK":
-                        return f"ENABLE_VIDEO_PLAYBACK: {self.enable_video_playback}"
-                    elif var_name == "VIDEO_TIMEOUT_BUFFER":
-                        return f"VIDEO_TIMEOUT_BUFFER: {self.video_timeout_buffer}"
-                    elif var_name == "ENABLE_FALLBACK_PLAYLIST":
-                        return f"ENABLE_FALLBACK_PLAYLIST: {self.enable_fallback_playlist}"
-                    elif var_name == "ALPHA":
-                        return f"ALPHA: {self.config.get('env_alpha', 1.0)}"  # 修改变量名为ALPHA
-                    elif var_name == "UNORTHODOX":  # 新增UNORTHODOX变量
-                        return f"UNORTHODOX: {self.config.get('env_unorthodox', False)}"
-                    else:
-                        return f"未知环境变量: {var_name}"
-                elif len(parts) == 3:
-                    # 设置环境变量
-                    var_name = parts[1].upper()
-                    var_value = parts[2]
-                    try:
-                        if var_name == "ROOM_ID":
-                            new_value = int(var_value)
-                            self.config["env_roomid"] = new_value
-                        elif var_name == "POLL_INTERVAL":
-                            new_value = int(var_value)
-                            self.config["env_poll_interval"] = new_value
-                        elif var_name == "FALLBACK_PLAYLIST_ID":
-                            new_value = int(var_value)
-                            self.config["env_playlist"] = new_value
-                            self.fallback_playlist_id = new_value
-                        elif var_name == "QUEUE_MAXSIZE":
-                            new_value = int(var_value)
-                            self.config["env_queue_maxsize"] = new_value
-                            self.queue_maxsize = new_value
-                        elif var_name == "ENABLE_VIDEO_PLAYBACK":
-                            new_value = var_value.lower() in ('true', '1', 'yes', 'on')
-                            self.config["enable_video_playback"] = new_value
-                            self.enable_video_playback = new_value
-                        elif var_name == "VIDEO_TIMEOUT_BUFFER":
-                            new_value = int(var_value)
-                            if new_value < 0 or new_value > 300:
-                                return "Undefined Behavior"
-                            self.config["env_video_timeout_buffer"] = new_value
-                            self.video_timeout_buffer = new_value
-                        elif var_name == "ENABLE_FALLBACK_PLAYLIST":
-                            new_value = var_value.lower() in ('true', '1', 'yes', 'on')
-                            self.config["enable_fallback_playlist"] = new_value
-                            self.enable_fallback_playlist = new_value
-                        elif var_name == "ALPHA":  # 修改变量名为ALPHA
-                            new_value = float(var_value)
-                            self.config["env_alpha"] = new_value  # 保留原始配置键名
-                            
-                            # 立即更新GUI透明度
-                            if self.gui_log:
-                                self.gui_log.set_alpha(new_value)
-                        elif var_name == "UNORTHODOX":  # 新增UNORTHODOX变量
-                            new_value = var_value.lower() in ('true', '1', 'yes', 'on', 't', 'y')
-                            self.config["env_unorthodox"] = new_value
-                            self.unorthodox_enabled = new_value
-                            
-                            # 保存配置到文件
-                            import json
-                            with open("config/config.json", "w", encoding="utf-8") as f:
-                                json.dump(self.config, f, indent=4, ensure_ascii=False)
-                            
-                            status = "已启用" if new_value else "已禁用"
-                            return f"UNORTHODOX {status}"
-                        else:
-                            return f"未知环境变量: {var_name}"
-                        
-                        # 保存配置到文件
-                        import json
-                        with open("config/config.json", "w", encoding="utf-8") as f:
-                            json.dump(self.config, f, indent=4, ensure_ascii=False)
-                        
-                        return f"{var_name} 已设置为: {var_value}"
-                    except ValueError:
-                        return "无效的值类型"
-                else:
-                    return "无效的env命令参数，使用 !help 查看帮助"
-            elif cmd == '!reload':
-                # !reload 命令：重新加载配置
-                try:
-                    # 重新加载配置
-                    from modules.config_loader import ConfigLoader
-                    config_loader = ConfigLoader()
-                    new_config = config_loader.load_config()
-                    
-                    # 更新当前配置
-                    self.config.update(new_config)
-                    
-                    # 更新相关模块的配置
-                    self.fallback_playlist_id = self.config.get("env_playlist", 9162892605)
-                    self.enable_video_playback = self.config.get("enable_video_playback", True)
-                    self.video_timeout_buffer = self.config.get("env_video_timeout_buffer", 3)
-                    self.enable_fallback_playlist = self.config.get("enable_fallback_playlist", True)
-                    self.queue_maxsize = self.config.get("env_queue_maxsize", 5)
-                    self.unorthodox_enabled = self.config.get("env_unorthodox", False)  # 更新unorthodox状态
-                    
-                    # 通知权限管理器重新生成密钥（基于当前时间）
-                    self.permission_manager.config = self.config
-                    self.permission_manager.admin_password = self.config.get("env_admin_password", "mysecret")
-                    
-                    # 重新加载词典映射
-                    self.dict_map = self.load_dict_map()
-                    
-                    # 更新GUI透明度
-                    if self.gui_log:
-                        alpha = self.config.get("env_alpha", 1.0)
-                        self.gui_log.set_alpha(alpha)
-                    
-                    return "配置已重新加载"
-                except Exception as e:
-                    return f"重载配置失败: {str(e)}"
-            elif cmd == '!service' and len(parts) >= 3:
-                # 处理 !service video start/stop 命令
-                if parts[1].lower() == 'video':
-                    if parts[2].lower() == 'start':
-                        return self._set_video_playback(True)
-                    elif parts[2].lower() == 'stop':
-                        return self._set_video_playback(False)
-                    else:
-                        return "无效的service命令参数，使用 !help 查看帮助"
-                elif parts[1].lower() == 'unorthodox':  # 处理 !service unorthodox start/stop 命令
-                    if parts[2].lower() == 'start':
-                        return self._set_unorthodox(True)
-                    elif parts[2].lower() == 'stop':
-                        return self._set_unorthodox(False)
-                    else:
-                        return "无效的service命令参数，使用 !help 查看帮助"
-                else:
-                    return "无效的service命令参数，使用 !help 查看帮助"
-            elif cmd == '!service' and len(parts) == 1:
-                # 处理 !service 命令，检查当前启用的功能服务
-                return self._get_service_status()
-            elif cmd == '!dict' and len(parts) == 1:
-                # !dict - 查看词典映射
-                if self.dict_map:
-                    dict_items = list(self.dict_map.items())[:10]  # 显示前10个
-                    dict_list = [f"{key} -> {value}" for key, value in dict_items]
-                    if len(self.dict_map) > 10:
-                        dict_list.append(f"... 等{len(self.dict_map)}个映射")
-                    return f"词典映射 ({len(self.dict_map)}个): " + ", ".join(dict_list)
-                else:
-                    return "词典映射为空"
-            elif cmd == '!dict' and len(parts) >= 3 and parts[1].lower() == 'add':
-                # !dict add key value - 添加词典映射
-                key = parts[2]
-                value = ' '.join(parts[3:])
-                self.dict_map[key] = value
-                self.save_dict_map()
-                return f"已添加词典映射: {key} -> {value}"
-            elif cmd == '!dict' and len(parts) == 3 and parts[1].lower() == 'rm':
-                # !dict rm key - 删除词典映射
-                key = parts[2]
-                if key in self.dict_map:
-                    del self.dict_map[key]
-                    self.save_dict_map()
-                    return f"已删除词典映射: {key}"
-                else:
-                    return f"词典中不存在关键字: {key}"
-            # 添加GUI命令处理
-            elif cmd == '!gui':
-                if len(parts) < 2:
-                    return "GUI命令参数不足，使用 !help 查看帮助"
-                
-                gui_cmd = parts[1].lower()
-                
-                if gui_cmd == 'info':
-                    # !gui info - 输出当前窗口的信息
-                    if self.gui_log:
-                        screen_w = self.gui_log.root.winfo_screenwidth()
-                        screen_h = self.gui_log.root.winfo_screenheight()
-                        w = self.gui_log.root.winfo_width()
-                        h = self.gui_log.root.winfo_height()
-                        x = self.gui_log.root.winfo_x()
-                        y = self.gui_log.root.winfo_y()
-                        alpha = self.config.get("env_alpha", 1.0)
-                        ignore_status = "穿透" if self.gui_ignore_state == 1 else "非穿透"
-                        hide_status = "隐藏" if self.gui_hide_state == 1 else "显示"
-                        direct_status = "无边框" if self.gui_direct_state == 1 else "有边框"
-                        
-                        info = f"显示器: {screen_w}x{screen_h}\n窗口: {w}x{h}+{x}+{y}\n透明度: {alpha}\n穿透: {ignore_status}\n隐藏: {hide_status}\n边框: {direct_status}"
-                        return info
-                    else:
-                        return "GUI未初始化"
-                        
-                elif gui_cmd == 'hide':
-                    if len(parts) == 2:
-                        # !gui hide - 切换隐藏状态
-                        if self.gui_log:
-                            if self.gui_hide_state == 0:
-                                # 隐藏窗口
-                                self.gui_log.root.withdraw()
-                                self.gui_hide_state = 1
-                                return "窗口已隐藏"
-                            else:
-                                # 显示窗口
-                                self.gui_log.root.deiconify()
-                                self.gui_hide_state = 0
-                                return "窗口已显示"
-                        else:
-                            return "GUI未初始化"
-                    elif len(parts) == 3:
-                        # !gui hide <bool> - 设置隐藏状态
-                        bool_val = parts[2].lower()
-                        if bool_val in ['true', '1', 'yes', 'on', 't', 'y']:
-                            if self.gui_log:
-                                self.gui_log.root.withdraw()
-                                self.gui_hide_state = 1
-                                return "窗口已隐藏"
-                            else:
-                                return "GUI未初始化"
-                        elif bool_val in ['false', '0', 'no', 'off', 'f', 'n']:
-                            if self.gui_log:
-                                self.gui_log.root.deiconify()
-                                self.gui_hide_state = 0
-                                return "窗口已显示"
-                            else:
-                                return "GUI未初始化"
-                        else:
-                            return "布尔值无效，使用true/false或1/0"
-                    else:
-                        return "GUI hide命令参数错误"
-                        
-                elif gui_cmd == 'ignore':
-                    if len(parts) == 2:
-                        # !gui ignore - 切换穿透状态
-                        if self.gui_log:
-                            if self.gui_ignore_state == 0:
-                                # 设置穿透
-                                try:
-                                    import platform
-                                    if platform.system() == "Windows":
-                                        import pywintypes
-                                        from ctypes import windll, c_int, c_ulong, byref
-                                        
-                                        # 获取窗口句柄
-                                        hwnd = windll.user32.GetParent(self.gui_log.root.winfo_id())
-                                        
-                                        # 设置窗口样式为穿透
-                                        ex_style = windll.user32.GetWindowLongW(hwnd, -20)  # GWL_EXSTYLE
-                                        ex_style |= 0x20  # WS_EX_TRANSPARENT
-                                        ex_style |= 0x80000  # WS_EX_LAYERED
-                                        windll.user32.SetWindowLongW(hwnd, -20, ex_style)
-                                        
-                                        # 设置透明度（使用配置中的透明度值）
-                                        alpha = self.config.get("env_alpha", 1.0)
-                                        alpha_val = int(alpha * 255)
-                                        windll.user32.SetLayeredWindowAttributes(hwnd, 0, alpha_val, 2)
-                                        
-                                        self.gui_ignore_state = 1
-                                        return "窗口穿透已启用"
-                                    else:
-                                        return "仅支持Windows系统设置穿透"
-                                except Exception as e:
-                                    return f"设置穿透失败: {e}"
-                            else:
-                                # 取消穿透
-                                try:
-                                    import platform
-                                    if platform.system() == "Windows":
-                                        import pywintypes
-                                        from ctypes import windll, c_int, c_ulong, byref
-                                        
-                                        # 获取窗口句柄
-                                        hwnd = windll.user32.GetParent(self.gui_log.root.winfo_id())
-                                        
-                                        # 移除窗口穿透样式
-                                        ex_style = windll.user32.GetWindowLongW(hwnd, -20)  # GWL_EXSTYLE
-                                        ex_style &= ~0x20  # 移除 WS_EX_TRANSPARENT
-                                        ex_style &= ~0x80000  # 移除 WS_EX_LAYERED
-                                        windll.user32.SetWindowLongW(hwnd, -20, ex_style)
-                                        
-                                        # 恢复透明度（使用配置中的透明度值）
-                                        alpha = self.config.get("env_alpha", 1.0)
-                                        alpha_val = int(alpha * 255)
-                                        windll.user32.SetLayeredWindowAttributes(hwnd, 0, alpha_val, 2)
-                                        
-                                        self.gui_ignore_state = 0
-                                        return "窗口穿透已禁用"
-                                    else:
-                                        return "仅支持Windows系统设置穿透"
-                                except Exception as e:
-                                    return f"取消穿透失败: {e}"
-                        else:
-                            return "GUI未初始化"
-                    elif len(parts) == 3:
-                        # !gui ignore <bool> - 设置穿透状态
-                        bool_val = parts[2].lower()
-                        if bool_val in ['true', '1', 'yes', 'on', 't', 'y']:
-                            if self.gui_log:
-                                try:
-                                    import platform
-                                    if platform.system() == "Windows":
-                                        import pywintypes
-                                        from ctypes import windll, c_int, c_ulong, byref
-                                        
-                                        # 获取窗口句柄
-                                        hwnd = windll.user32.GetParent(self.gui_log.root.winfo_id())
-                                        
-                                        # 设置窗口样式为穿透
-                                        ex_style = windll.user32.GetWindowLongW(hwnd, -20)  # GWL_EXSTYLE
-                                        ex_style |= 0x20  # WS_EX_TRANSPARENT
-                                        ex_style |= 0x80000  # WS_EX_LAYERED
-                                        windll.user32.SetWindowLongW(hwnd, -20, ex_style)
-                                        
-                                        # 设置透明度（使用配置中的透明度值）
-                                        alpha = self.config.get("env_alpha", 1.0)
-                                        alpha_val = int(alpha * 255)
-                                        windll.user32.SetLayeredWindowAttributes(hwnd, 0, alpha_val, 2)
-                                        
-                                        self.gui_ignore_state = 1
-                                        return "窗口穿透已启用"
-                                    else:
-                                        return "仅支持Windows系统设置穿透"
-                                except Exception as e:
-                                    return f"设置穿透失败: {e}"
-                            else:
-                                return "GUI未初始化"
-                        elif bool_val in ['false', '0', 'no', 'off', 'f', 'n']:
-                            if self.gui_log:
-                                try:
-                                    import platform
-                                    if platform.system() == "Windows":
-                                        import pywintypes
-                                        from ctypes import windll, c_int, c_ulong, byref
-                                        
-                                        # 获取窗口句柄
-                                        hwnd = windll.user32.GetParent(self.gui_log.root.winfo_id())
-                                        
-                                        # 移除窗口穿透样式
-                                        ex_style = windll.user32.GetWindowLongW(hwnd, -20)  # GWL_EXSTYLE
-                                        ex_style &= ~0x20  # 移除 WS_EX_TRANSPARENT
-                                        ex_style &= ~0x80000  # 移除 WS_EX_LAYERED
-                                        windll.user32.SetWindowLongW(hwnd, -20, ex_style)
-                                        
-                                        # 恢复透明度（使用配置中的透明度值）
-                                        alpha = self.config.get("env_alpha", 1.0)
-                                        alpha_val = int(alpha * 255)
-                                        windll.user32.SetLayeredWindowAttributes(hwnd, 0, alpha_val, 2)
-                                        
-                                        self.gui_ignore_state = 0
-                                        return "窗口穿透已禁用"
-                                    else:
-                                        return "仅支持Windows系统设置穿透"
-                                except Exception as e:
-                                    return f"取消穿透失败: {e}"
-                            else:
-                                return "GUI未初始化"
-                        else:
-                            return "布尔值无效，使用true/false或1/0"
-                    else:
-                        return "GUI ignore命令参数错误"
-                        
-                elif gui_cmd == 'direct':
-                    if len(parts) == 2:
-                        # !gui direct - 切换边框状态
-                        if self.gui_log:
-                            if self.gui_direct_state == 0:
-                                # 设置无边框
-                                try:
-                                    self.gui_log.root.overrideredirect(True)
-                                    self.gui_direct_state = 1
-                                    return "窗口边框已隐藏"
-                                except Exception as e:
-                                    return f"设置无边框失败: {e}"
-                            else:
-                                # 恢复边框
-                                try:
-                                    self.gui_log.root.overrideredirect(False)
-                                    self.gui_direct_state = 0
-                                    return "窗口边框已显示"
-                                except Exception as e:
-                                    return f"恢复边框失败: {e}"
-                        else:
-                            return "GUI未初始化"
-                    elif len(parts) == 3:
-                        # !gui direct <bool> - 设置边框状态
-                        bool_val = parts[2].lower()
-                        if bool_val in ['true', '1', 'yes', 'on', 't', 'y']:
-                            if self.gui_log:
-                                try:
-                                    self.gui_log.root.overrideredirect(True)
-                                    self.gui_direct_state = 1
-                                    return "窗口边框已隐藏"
-                                except Exception as e:
-                                    return f"设置无边框失败: {e}"
-                            else:
-                                return "GUI未初始化"
-                        elif bool_val in ['false', '0', 'no', 'off', 'f', 'n']:
-                            if self.gui_log:
-                                try:
-                                    self.gui_log.root.overrideredirect(False)
-                                    self.gui_direct_state = 0
-                                    return "窗口边框已显示"
-                                except Exception as e:
-                                    return f"恢复边框失败: {e}"
-                            else:
-                                return "GUI未初始化"
-                        else:
-                            return "布尔值无效，使用true/false或1/0"
-                    else:
-                        return "GUI direct命令参数错误"
-                        
-                elif gui_cmd == 'resize':
-                    if len(parts) == 3:
-                        # !gui resize <int>,<int> 或 !gui resize ~,<int> 或 !gui resize <int>,~ 或 !gui resize full,<int> 或 !gui resize <int>,full
-                        resize_params = parts[2].split(',')
-                        if len(resize_params) != 2:
-                            return "resize参数格式错误，应为 <int>,<int> 或 ~,<int> 或 <int>,~ 或 full,<int> 或 <int>,full"
-                        
-                        try:
-                            w_str = resize_params[0].strip()
-                            h_str = resize_params[1].strip()
-                            
-                            if self.gui_log:
-                                current_w = self.gui_log.root.winfo_width()
-                                current_h = self.gui_log.root.winfo_height()
-                                
-                                # 获取屏幕尺寸
-                                screen_w = self.gui_log.root.winfo_screenwidth()
-                                screen_h = self.gui_log.root.winfo_screenheight()
-                                
-                                # 解析宽度
-                                if w_str.lower() == 'full':
-                                    new_w = screen_w
-                                elif w_str == '~':
-                                    new_w = current_w
-                                else:
-                                    new_w = int(w_str)
-                                
-                                # 解析高度
-                                if h_str.lower() == 'full':
-                                    new_h = screen_h
-                                elif h_str == '~':
-                                    new_h = current_h
-                                else:
-                                    new_h = int(h_str)
-                                
-                                # 检查边界值
-                                if new_w < 100 or new_h < 100:
-                                    return "窗口尺寸不能小于100x100像素"
-                                
-                                if new_w > screen_w or new_h > screen_h:
-                                    return "窗口尺寸不能超过屏幕尺寸"
-                                
-                                self.gui_log.root.geometry(f"{new_w}x{new_h}")
-                                return f"窗口大小已调整为: {new_w}x{new_h}"
-                            else:
-                                return "GUI未初始化"
-                        except ValueError:
-                            return "resize参数必须为整数、~或full"
-                    else:
-                        return "GUI resize命令参数错误，格式: !gui resize <w>,<h>"
-                        
-                elif gui_cmd == 'origin':
-                    if len(parts) == 2:
-                        # !gui origin - 查询窗口坐标
-                        if self.gui_log:
-                            x = self.gui_log.root.winfo_x()
-                            y = self.gui_log.root.winfo_y()
-                            return f"窗口坐标: ({x}, {y})"
-                        else:
-                            return "GUI未初始化"
-                    elif len(parts) == 3:
-                        # !gui origin <int>,<int> - 设置窗口坐标
-                        origin_params = parts[2].split(',')
-                        if len(origin_params) != 2:
-                            return "origin参数格式错误，应为 <int>,<int>"
-                        
-                        try:
-                            x = int(origin_params[0].strip())
-                            y = int(origin_params[1].strip())
-                            
-                            if self.gui_log:
-                                # 检查边界值
-                                screen_w = self.gui_log.root.winfo_screenwidth()
-                                screen_h = self.gui_log.root.winfo_screenheight()
-                                
-                                if x < 0 or y < 0 or x > screen_w or y > screen_h:
-                                    return "窗口坐标超出屏幕范围"
-                                
-                                w = self.gui_log.root.winfo_width()
-                                h = self.gui_log.root.winfo_height()
-                                
-                                self.gui_log.root.geometry(f"{w}x{h}+{x}+{y}")
-                                return f"窗口坐标已设置为: ({x}, {y})"
-                            else:
-                                return "GUI未初始化"
-                        except ValueError:
-                            return "origin参数必须为整数"
-                    else:
-                        return "GUI origin命令参数错误，格式: !gui origin <x>,<y>"
-                        
-                elif gui_cmd == 'set':
-                    if len(parts) == 3:
-                        # !gui set <int> - 按照预设<int>更改窗口样式
-                        try:
-                            preset_num = int(parts[2])
-                            if preset_num <= 0:
-                                return "预设编号必须为正整数"
-                            
-                            # 加载预设配置
-                            import json
-                            import os
-                            preset_path = "./config/preset.json"
-                            
-                            if not os.path.exists(preset_path):
-                                return f"预设文件不存在: {preset_path}"
-                            
-                            with open(preset_path, 'r', encoding='utf-8') as f:
-                                presets = json.load(f)
-                            
-                            preset_key = f"env_windows_preset_{preset_num}"
-                            if preset_key not in presets:
-                                return f"预设 {preset_num} 不存在"
-                            
-                            preset_data = presets[preset_key]
-                            if len(preset_data) != 6:
-                                return f"预设 {preset_num} 数据格式错误，应包含6个参数"
-                            
-                            w_str, h_str, x_str, y_str, alpha_str, ignore_str = preset_data
-                            
-                            if self.gui_log:
-                                # 获取屏幕尺寸
-                                screen_w = self.gui_log.root.winfo_screenwidth()
-                                screen_h = self.gui_log.root.winfo_screenheight()
-                                
-                                # 解析尺寸参数
-                                w = screen_w if w_str.lower() == 'full' else int(w_str)
-                                h = screen_h if h_str.lower() == 'full' else int(h_str)
-                                x = int(x_str)
-                                y = int(y_str)
-                                alpha = float(alpha_str)
-                                
-                                # 检查参数有效性
-                                if alpha < 0 or alpha > 1:
-                                    return "透明度必须在0-1之间"
-                                
-                                # 设置窗口大小和位置
-                                self.gui_log.root.geometry(f"{w}x{h}+{x}+{y}")
-                                
-                                # 设置透明度
-                                self.gui_log.set_alpha(alpha)
-                                
-                                # 更新配置中的透明度
-                                self.config["env_alpha"] = alpha
-                                import json
-                                with open("config/config.json", "w", encoding="utf-8") as f:
-                                    json.dump(self.config, f, indent=4, ensure_ascii=False)
-                                
-                                # 设置穿透状态
-                                ignore_bool = ignore_str.lower() in ['true', '1', 'yes', 'on', 't', 'y']
-                                
-                                # 检查当前穿透状态，如果不同则切换
-                                if (self.gui_ignore_state == 1) != ignore_bool:
-                                    if ignore_bool:
-                                        # 启用穿透
-                                        try:
-                                            import platform
-                                            if platform.system() == "Windows":
-                                                import pywintypes
-                                                from ctypes import windll, c_int, c_ulong, byref
-                                                
-                                                # 获取窗口句柄
-                                                hwnd = windll.user32.GetParent(self.gui_log.root.winfo_id())
-                                                
-                                                # 设置窗口样式为穿透
-                                                ex_style = windll.user32.GetWindowLongW(hwnd, -20)  # GWL_EXSTYLE
-                                                ex_style |= 0x20  # WS_EX_TRANSPARENT
-                                                ex_style |= 0x80000  # WS_EX_LAYERED
-                                                windll.user32.SetWindowLongW(hwnd, -20, ex_style)
-                                                
-                                                # 设置透明度
-                                                alpha_val = int(alpha * 255)
-                                                windll.user32.SetLayeredWindowAttributes(hwnd, 0, alpha_val, 2)
-                                                
-                                                self.gui_ignore_state = 1
-                                            else:
-                                                return "仅支持Windows系统设置穿透"
-                                        except Exception as e:
-                                            return f"设置穿透失败: {e}"
-                                    else:
-                                        # 禁用穿透
-                                        try:
-                                            import platform
-                                            if platform.system() == "Windows":
-                                                import pywintypes
-                                                from ctypes import windll, c_int, c_ulong, byref
-                                                
-                                                # 获取窗口句柄
-                                                hwnd = windll.user32.GetParent(self.gui_log.root.winfo_id())
-                                                
-                                                # 移除窗口穿透样式
-                                                ex_style = windll.user32.GetWindowLongW(hwnd, -20)  # GWL_EXSTYLE
-                                                ex_style &= ~0x20  # 移除 WS_EX_TRANSPARENT
-                                                ex_style &= ~0x80000  # 移除 WS_EX_LAYERED
-                                                windll.user32.SetWindowLongW(hwnd, -20, ex_style)
-                                                
-                                                # 恢复透明度（使用配置中的透明度值）
-                                                alpha_val = int(alpha * 255)
-                                                windll.user32.SetLayeredWindowAttributes(hwnd, 0, alpha_val, 2)
-                                                
-                                                self.gui_ignore_state = 0
-                                            else:
-                                                return "仅支持Windows系统设置穿透"
-                                        except Exception as e:
-                                            return f"取消穿透失败: {e}"
-                                
-                                return f"预设 {preset_num} 已应用: {w}x{h}+{x}+{y}, 透明度:{alpha}, 穿透:{ignore_bool}"
-                            else:
-                                return "GUI未初始化"
-                        except ValueError:
-                            return "预设编号必须为整数"
-                        except json.JSONDecodeError:
-                            return "预设文件格式错误，不是有效的JSON文件"
-                        except Exception as e:
-                            return f"应用预设失败: {e}"
-                    else:
-                        return "GUI set命令参数错误，格式: !gui set <int>"
-                        
-                elif gui_cmd == 'sign':
-                    if len(parts) == 3:
-                        # !gui sign "<int>,<int>,<int>,<int>,<float>,<bool>" - 注册预设
-                        try:
-                            # 解析参数字符串
-                            params_str = parts[2].strip('"')
-                            params = params_str.split(',')
-                            
-                            if len(params) != 6:
-                                return "预设参数必须包含6个值: 宽度,高度,坐标X,坐标Y,透明度,穿透状态"
-                            
-                            w_str, h_str, x_str, y_str, alpha_str, ignore_str = [p.strip() for p in params]
-                            
-                            # 验证参数
-                            if w_str.lower() != 'full':
-                                w = int(w_str)
-                                if w < 0:
-                                    return "窗口宽度不能为负数"
-                            else:
-                                w = 'full'
-                            
-                            if h_str.lower() != 'full':
-                                h = int(h_str)
-                                if h < 0:
-                                    return "窗口高度不能为负数"
-                            else:
-                                h = 'full'
-                            
-                            x = int(x_str)
-                            y = int(y_str)
-                            alpha = float(alpha_str)
-                            
-                            if alpha < 0 or alpha > 1:
-                                return "透明度必须在0-1之间"
-                            
-                            # 解析布尔值
-                            if ignore_str.lower() in ['true', '1', 'yes', 'on', 't', 'y']:
-                                ignore = 'true'
-                            elif ignore_str.lower() in ['false', '0', 'no', 'off', 'f', 'n']:
-                                ignore = 'false'
-                            else:
-                                return "穿透状态必须为布尔值(0/1或true/false)"
-                            
-                            # 加载现有预设
-                            import json
-                            import os
-                            preset_path = "./config/preset.json"
-                            
-                            if os.path.exists(preset_path):
-                                with open(preset_path, 'r', encoding='utf-8') as f:
-                                    presets = json.load(f)
-                            else:
-                                presets = {}
-                            
-                            # 找到下一个可用的预设编号
-                            existing_nums = []
-                            for key in presets.keys():
-                                if key.startswith("env_windows_preset_"):
-                                    try:
-                                        num = int(key.replace("env_windows_preset_", ""))
-                                        existing_nums.append(num)
-                                    except ValueError:
-                                        continue
-                            
-                            next_num = 1
-                            if existing_nums:
-                                next_num = max(existing_nums) + 1
-                            
-                            # 创建新预设
-                            new_preset_key = f"env_windows_preset_{next_num}"
-                            presets[new_preset_key] = [str(w), str(h), str(x), str(y), str(alpha), ignore]
-                            
-                            # 保存预设
-                            os.makedirs(os.path.dirname(preset_path), exist_ok=True)
-                            with open(preset_path, 'w', encoding='utf-8') as f:
-                                json.dump(presets, f, ensure_ascii=False, indent=2)
-                            
-                            return f"已注册预设 {next_num}"
-                            
-                        except ValueError:
-                            return "参数格式错误，请使用: !gui sign \"w,h,x,y,alpha,ignore\""
-                        except Exception as e:
-                            return f"注册预设失败: {e}"
-                    else:
-                        return "GUI sign命令参数错误，格式: !gui sign \"w,h,x,y,alpha,ignore\""
-                        
-                elif gui_cmd == 'alpha':  # 新增 !gui alpha 命令
-                    if len(parts) == 3:
-                        try:
-                            alpha_value = float(parts[2])
-                            if alpha_value < 0 or alpha_value > 1:
-                                return "透明度必须在0-1之间"
-                            
-                            # 调用等效的 !env ALPHA 命令功能
-                            self.config["env_alpha"] = alpha_value
-                            
-                            # 立即更新GUI透明度
-                            if self.gui_log:
-                                self.gui_log.set_alpha(alpha_value)
-                            
-                            # 保存配置到文件
-                            import json
-                            with open("config/config.json", "w", encoding="utf-8") as f:
-                                json.dump(self.config, f, indent=4, ensure_ascii=False)
-                            
-                            return f"ALPHA 已设置为: {alpha_value}"
-                        except ValueError:
-                            return "透明度值必须为浮点数"
-                    else:
-                        return "GUI alpha命令参数错误，格式: !gui alpha <float>"
-                        
-                else:
-                    return f"未知的GUI命令: {gui_cmd}，使用 !help 查看帮助"
+""".strip()
+
+class CommandHandler:
+    def __init__(self, player, queue_manager, permission_manager, music_bot, config, gui_log=None, logger=None,
+                 analytics=None, config_loader=None, log_sink=None, bus=None):
+        self.player = player
+        self.queue_manager = queue_manager
+        self.permission_manager = permission_manager
+        self.music_bot = music_bot
+        self.config = config
+        self.config_loader = config_loader  # 配置存储（订阅变更、写入配置）
+        self.logger = logger  # 结构化点歌日志
+        self.analytics = analytics  # 增量统计
+        self.log_sink = log_sink  # 控制台输出汇聚点（环形缓冲区）
+        self.bus = bus  # 事件总线（查看订阅者状态）
+        self.fallback_playlist_id = config.get("env_playlist", 9162892605)
+        self.enable_video_playback = config.get("enable_video_playback", True)
+        self.video_timeout_buffer = config.get("env_video_timeout_buffer", 3)
+        self.enable_fallback_playlist = config.get("enable_fallback_playlist", True)
+        self.queue_maxsize = config.get("env_queue_maxsize", 5)
+        self.gui_log = gui_log  # 添加GUI引用
+        
+        # 从配置加载词典映射
+        self.dict_map = self.load_dict_map()
+        
+        # GUI相关状态变量
+        self.gui_hide_state = 0  # 0为未隐藏，1为隐藏
+        self.gui_ignore_state = 0  # 0为不穿透，1为穿透
+        self.gui_direct_state = 0  # 0为有边框，1为无边框
+
+        # 引入unorthodox功能
+        self.unorthodox_enabled = config.get("env_unorthodox", False)
+        self.unorthodox_pool_size = config.get("env_unorthodox_pool_size", 2)
+        self.unorthodox_idle_timeout = config.get("env_unorthodox_idle_timeout", 300)
+        self.unorthodox_cache_ttl = config.get("env_unorthodox_cache_ttl", 600)
+        self._unorthodox = None  # 备线点歌入口（缓存 + 直连解析 + 浏览器池），首次 uadd 时创建
+        
+        # 窗口预设缓存（按文件修改时间失效）
+        self._presets = None
+        self._presets_mtime = None
+        
+        if config_loader:
+            config_loader.subscribe(CONFIG_ATTRS.keys(), self.apply_config)
+        
+        # 命令注册表：参数、权限级别与冷却时间在各处理方法上声明
+        self.registry = CommandRegistry(is_admin=permission_manager.is_admin)
+        self.registry.register_object(self)
+        self.registry.describe_group("!gui", "GUI命令参数不足，使用 !help 查看帮助", "未知的GUI命令: {sub}，使用 !help 查看帮助")
+        self.registry.describe_group("!log", "!log tail [N] | !log mem | !log bus", "未知的 log 子命令: {sub}，使用 !help 查看帮助")
+        if gui_log is not None:
+            # GUI命令直接操作 Tk 控件，转交GUI线程执行；
+            # 协程形式的GUI命令（需要修改配置的）自行在事件循环中改配置，只把控件操作转交GUI线程
+            for entry in self.registry.commands():
+                if entry.name == "!gui" and not entry.is_async:
+                    entry.handler = self._on_gui_thread(entry.handler)
+                    entry.is_async = True
+    
+    def _on_gui_thread(self, func):
+        """包装命令处理方法：在GUI线程中执行并等待结果"""
+        async def wrapper(*args):
+            return await self._in_gui(func, *args)
+        return wrapper
+    
+    async def _in_gui(self, func, *args):
+        """在GUI线程中执行 func 并等待结果（无GUI时直接执行）"""
+        if self.gui_log is None:
+            return func(*args)
+        return await asyncio.wrap_future(self.gui_log.submit(func, *args))
+    
+    def apply_config(self, changes):
+        """配置变更回调：只同步发生变化的属性"""
+        for key in changes:
+            setattr(self, CONFIG_ATTRS[key], self.config_loader.get(key))
+
+    def load_dict_map(self):
+        """加载词典映射文件，编译为支持归一化/模糊查询的 AliasMap"""
+        return AliasMap(self._read_dict_file())
+
+    def _read_dict_file(self):
+        """读取词典映射文件（不存在时创建默认文件）"""
+        dict_path = "./config/dict.json"
+        default_dict = {
+            "lll": "473403182"
+        }
+        
+        if not os.path.exists(dict_path):
+            # 创建config目录
+            os.makedirs(os.path.dirname(dict_path), exist_ok=True)
+            with open(dict_path, 'w', encoding='utf-8') as f:
+                json.dump(default_dict, f, indent=4, ensure_ascii=False)
+            print(f"[SYS] 词典映射文件已创建: {dict_path}")
+            return default_dict
+        
+        with open(dict_path, 'r', encoding='utf-8') as f:
+            print(f"[SYS] {dict_path} 已加载")
+            return json.load(f)
+    
+    def reload_dict_map(self):
+        """重新读取词典映射文件，增量更新已编译的映射"""
+        changed = self.dict_map.sync(self._read_dict_file())
+        print(f"[SYS] 词典映射已更新 ({changed} 项变更)")
+        return changed
+    
+    def save_dict_map(self):
+        """保存词典映射到文件（合并短时间内的多次保存）"""
+        dict_path = "./config/dict.json"
+        persistence.write_json(dict_path, self.dict_map)
+        print(f"词典映射已保存到 {dict_path}")
+    
+    def _set_config(self, key, value):
+        """修改配置项并保存（经由配置存储分发给订阅者）"""
+        if self.config_loader:
+            self.config_loader.set(key, value)
+        else:
+            self.config[key] = value
+            persistence.write_json("config/config.json", self.config, indent=4)
+        if key in CONFIG_ATTRS:
+            setattr(self, CONFIG_ATTRS[key], value)
+    
+    def is_valid_bilibili_id(self, video_id):
+        """检查B站视频ID格式 (av号或BV号)"""
+        # 检查av号格式 (如 av123456789)
+        if video_id.lower().startswith('av'):
+            av_num = video_id[2:]
+            return av_num.isdigit()
+        
+        # 检查BV号格式 (如 BV1xx411c7mu)
+        if video_id.startswith('BV'):
+            # BV号应为12位字符，包含字母和数字
+            return len(video_id) == 12 and re.match(r'^[a-zA-Z0-9]+$', video_id)
+        
+        return False
+
+    def parse_bilibili_id(self, video_id):
+        """
+        解析B站视频ID，支持BV号_pN格式
+        返回 (bv号, 分p数) 元组，如果不符合格式则返回 (原ID, None)
+        """
+        # 检查是否是BV号_pN格式
+        match = re.match(r'^(BV[A-Za-z0-9]{10})_p(\d+)$', video_id)
+        if match:
+            bv_id = match.group(1)
+            p_number = int(match.group(2))
+            return bv_id, p_number
+        
+        # 检查是否是BV号?p=N格式
+        match = re.match(r'^(BV[A-Za-z0-9]{10}).*?\?p=(\d+)$', video_id)
+        if match:
+            bv_id = match.group(1)
+            p_number = int(match.group(2))
+            return bv_id, p_number
+        
+        # 如果不是特殊格式，返回原ID
+        return video_id, None
+    
+    async def handle_command(self, user_name, command_text, admin=None):
+        """处理命令（查表分发）；admin=True 用于本地控制端口等可信来源"""
+        if not command_text.startswith('!'):
+            return None
+        return await self.registry.dispatch(user_name, command_text, admin)
+
+    # ---------- 白名单管理 ----------
+
+    @command("!touch", args=(Arg("username"),), usage="!touch user")
+    def _cmd_touch(self, username):
+        if self.permission_manager.add_user_to_whitelist(username):
+            return f"已添加 '{username}' 到白名单"
+        return f" '{username}' 已在白名单中"
+
+    @command("!rm", args=(Arg("username"),), usage="!rm user")
+    def _cmd_rm(self, username):
+        if self.permission_manager.remove_user_from_whitelist(username):
+            return f"已从白名单移除  '{username}'"
+        return f" '{username}' 不在白名单中"
+
+    @command("!cat")
+    def _cmd_cat(self):
+        users = self.permission_manager.list_whitelist_users()
+        if not users:
+            return "白名单为空"
+        user_list = ", ".join(users[:10])
+        if len(users) > 10:
+            user_list += f" ... 等{len(users)}个用户"
+        return f"白名单用户 ({len(users)}人): {user_list}"
+
+    @command("!clr")
+    def _cmd_clr(self):
+        self.permission_manager.clear_whitelist()
+        return "白名单已清空，仅保留管理员"
+
+    # ---------- 时间与帮助 ----------
+
+    @command("!time", usage="无效的time命令参数，使用 !help 查看帮助")
+    def _cmd_time(self):
+        # !time 无参数，输出时间部分
+        return datetime.now().strftime('%y%m%d%H')
+
+    @command("!time", "-h", usage="无效的time命令参数，使用 !help 查看帮助")
+    def _cmd_time_readable(self):
+        # !time -h 输出人类可读形式
+        return f"当前时间: {datetime.now().strftime('%Y/%m/%d %H时')}"
+
+    @command("!help")
+    def _cmd_help(self):
+        return HELP_TEXT
+
+    @command("!cmdstats", args=(Arg("num", int, optional=True, default=10, error="数量必须为整数"),))
+    def _cmd_cmdstats(self, num):
+        rows = self.registry.stats(max(1, num))
+        if not rows:
+            return "暂无命令调用记录"
+        lines = [f"{label}: {calls}次 平均{avg_ms:.2f}ms 最大{max_ms:.2f}ms" for label, calls, avg_ms, max_ms in rows]
+        return "命令调用统计:\n" + "\n".join(lines)
+
+    # ---------- 音乐播放控制 ----------
+
+    @command("!pause")
+    async def _cmd_pause(self):
+        await self.player.pause()
+        return "已暂停播放"
+
+    @command("!resume")
+    async def _cmd_resume(self):
+        await self.player.resume()
+        return "已恢复播放"
+
+    @command("!skip", cooldown=1.0)
+    async def _cmd_skip(self):
+        if not (self.player.current_mpv_process and self.player.current_mpv_process.returncode is None):
+            return "当前无播放中的歌曲"
+        # 取消计时器任务
+        if self.player.current_timer_task and not self.player.current_timer_task.done():
+            self.player.current_timer_task.cancel()
+            try:
+                await self.player.current_timer_task
+            except asyncio.CancelledError:
+                pass
+        # skip 可能是协程也可能是普通方法
+        skip_result = self.player.skip()
+        if skip_result and hasattr(skip_result, '__await__'):
+            await skip_result
+        return "已跳过当前歌曲"
+
+    @command("!vol", args=(Arg("vol", int, optional=True, error="音量必须是整数"),))
+    def _cmd_vol(self, vol):
+        if vol is None:
+            return f"当前音量: {self.player.get_volume()}"
+        if not 0 <= vol <= 100:
+            return "音量范围必须是 0-100"
+        self.player.set_volume(vol)
+        return f"音量已设为 {vol}"
+
+    @command("!history", args=(Arg("num", int, optional=True, default=5, error="!history [数量]"),),
+             usage="!history [数量]")
+    def _cmd_history(self, num):
+        lines = ["最近播放:"]
+        for event in reversed(self.player.get_play_history(num)):
+            lines.append(event.item.display())
+        return "\n".join(lines)
+
+    @command("!now")
+    def _cmd_now(self):
+        current_playing = self.player.get_current_playing()
+        if current_playing:
+            return f"正在播放: {current_playing.display()}"
+        return "当前无播放"
+
+    # ---------- 播放队列管理 ----------
+
+    @command("!queue", usage="未知的 queue 子命令: {args}，使用 !help 查看帮助")
+    @command("!queue", "ls")
+    async def _cmd_queue_ls(self):
+        return await self._get_queue_status()
+
+    @command("!queue", "add", args=(Arg("query", rest=True),), usage="!queue add 歌名或id")
+    async def _cmd_queue_add(self, query):
+        if '|' in query:
+            return await self._queue_add_batch([q.strip() for q in query.split('|') if q.strip()])
+        return await self._queue_add(query)
+
+    @command("!queue", "pl", args=(Arg("playlist_id", int), Arg("num", int, optional=True)),
+             usage="!queue pl 歌单id [数量]")
+    async def _cmd_queue_pl(self, playlist_id, num):
+        return await self._queue_add_playlist(playlist_id, num)
+
+    @command("!queue", "uadd", args=(Arg("query", rest=True),), usage="!queue uadd 歌名或id")
+    async def _cmd_queue_uadd(self, query):
+        # 使用非正统音乐源
+        if '|' in query:
+            return await self._queue_unorthodox_batch([q.strip() for q in query.split('|') if q.strip()])
+        return await self._queue_unorthodox_add(query)
+
+    @command("!queue", "del", args=(Arg("index"),), usage="!queue del N")
+    async def _cmd_queue_del(self, index):
+        try:
+            return await self._queue_del(int(index))
+        except ValueError:
+            return f"无效的歌曲序号，请输入1-{self.queue_maxsize}之间的数字"
+
+    @command("!queue", "clr")
+    async def _cmd_queue_clr(self):
+        return await self._queue_clr()
+
+    # ---------- 点歌权限控制 ----------
+
+    @command("!grant", usage="!grant [-t SEC | -c NUM | -u USER SEC]")
+    def _cmd_grant(self):
+        # !grant 无参数，允许所有人点歌
+        self.permission_manager.grant_temp_access("time", float('inf'))
+        return "Temporarily Grant Access"
+
+    @command("!grant", "-t", args=(Arg("sec", int, error="时间必须为整数"),), usage="!grant -t SEC")
+    def _cmd_grant_time(self, sec):
+        self.permission_manager.grant_temp_access("time", sec)
+        return f"Grant Access for {sec} s"
+
+    @command("!grant", "-u", args=(Arg("username"), Arg("sec", int, error="时间必须为整数")), usage="!grant -u USER SEC")
+    def _cmd_grant_user(self, username, sec):
+        self.permission_manager.grant_temp_access("user", sec, username)
+        return f"Grant Access for {username} {sec} s"
+
+    @command("!grant", "-c", args=(Arg("count", int, error="次数必须为整数"),), usage="!grant -c NUM")
+    def _cmd_grant_count(self, count):
+        if not 0 <= count <= 100:
+            return "次数范围 0-100"
+        self.permission_manager.grant_temp_access("count", count)
+        return f"counts.add = {count}"
+
+    @command("!revoke", usage="!revoke [-c | -t | -u [USER] | -ct]")
+    @command("!revoke", "-ct")
+    @command("!revoke", "-tc")
+    def _cmd_revoke_all(self):
+        # !revoke 无参数，等同于 -ct
+        self.permission_manager.revoke_temp_access("all")
+        return "Revoke Permission"
+
+    @command("!revoke", "-c")
+    def _cmd_revoke_count(self):
+        self.permission_manager.revoke_temp_access("count")
+        return "Revoke Permission C"
+
+    @command("!revoke", "-t")
+    def _cmd_revoke_time(self):
+        self.permission_manager.revoke_temp_access("time")
+        return "Revoke Permission"
+
+    @command("!revoke", "-u", args=(Arg("username", optional=True),))
+    def _cmd_revoke_user(self, username):
+        if username is None:
+            self.permission_manager.revoke_temp_access("user")
+            return "Revoke Permission U"
+        if self.permission_manager.grants.revoke_user(username):
+            return f"Revoke Permission for {username}"
+        return f"{username} 没有限时授权"
+
+    # ---------- 用户数据查询 ----------
+
+    @command("!stats", args=(Arg("target"),), usage="!stats user | top [N] | users [N] | hour | skip [N]")
+    def _cmd_stats_user(self, target):
+        if not self.logger:
+            return "点歌日志未启用"
+        total = self.logger.get_total_user_requests(target)
+        if not total:
+            return f"{target} 没有点过歌"
+        recent = self.logger.get_user_requests(target, 5)  # 最近5条
+        return f"{target} 点过 {total} 首歌\n最近5首:\n" + "\n".join(recent)
+
+    @command("!stats", "top", args=(Arg("num", int, optional=True, default=5, error="数量必须为整数"),))
+    def _cmd_stats_top(self, num):
+        return self._get_analytics("top", num)
+
+    @command("!stats", "users", args=(Arg("num", int, optional=True, default=5, error="数量必须为整数"),))
+    def _cmd_stats_users(self, num):
+        return self._get_analytics("users", num)
+
+    @command("!stats", "hour")
+    def _cmd_stats_hour(self):
+        return self._get_analytics("hour")
+
+    @command("!stats", "skip", args=(Arg("num", int, optional=True, default=5, error="数量必须为整数"),))
+    def _cmd_stats_skip(self, num):
+        return self._get_analytics("skip", num)
+
+    @command("!log", "tail", args=(Arg("num", int, optional=True, default=10, error="数量必须为整数"),))
+    def _cmd_log_tail(self, num):
+        # !log tail [N] - 查看最近N条点歌日志
+        if not self.logger:
+            return "点歌日志未启用"
+        lines = self.logger.get_recent_requests(max(1, min(num, 50)))
+        return "\n".join(lines) if lines else "点歌日志为空"
+
+    @command("!log", "mem")
+    def _cmd_log_mem(self):
+        # !log mem - 查看控制台输出缓冲的行数与内存占用
+        if not self.log_sink:
+            return "控制台输出缓冲未启用"
+        count, capacity, total, size = self.log_sink.stats()
+        return f"控制台缓冲: {count}/{capacity} 行, 占用 {size / 1024:.1f} KiB, 累计输出 {total} 行"
+
+    @command("!log", "bus")
+    def _cmd_log_bus(self):
+        # !log bus - 查看事件总线各订阅者的排队、处理与丢弃数
+        if not self.bus:
+            return "事件总线未启用"
+        lines = [f"事件总线: 已发布 {self.bus.published} 条"]
+        for name, queued, maxsize, delivered, dropped, errors in self.bus.stats():
+            capacity = "不限" if maxsize is None else maxsize
+            lines.append(f"{name}: 排队 {queued}/{capacity}, 已处理 {delivered}, 丢弃 {dropped}, 出错 {errors}")
+        return "\n".join(lines)
+
+    # ---------- 视频播放与环境变量 ----------
+
+    @command("!clock", args=(Arg("num", int, optional=True, error="Invalid Literal"),))
+    def _cmd_clock(self, num):
+        if num is None:
+            # 查看当前 VIDEO_TIMEOUT_BUFFER
+            return f"VIDEO_TIMEOUT_BUFFER: {self.video_timeout_buffer}"
+        if num < 0 or num > 300:  # 限制最大值为300秒（5分钟）
+            return "Undefined Behavior"
+        self._set_config("env_video_timeout_buffer", num)
+        return f"超时参数: {num} s"
+
+    def _env_value(self, var_name):
+        key, _, default = ENV_VARS[var_name]
+        attr = CONFIG_ATTRS.get(key)
+        return getattr(self, attr) if attr else self.config.get(key, default)
+
+    @command("!env", args=(Arg("name", optional=True), Arg("value", optional=True)),
+             usage="无效的env命令参数，使用 !help 查看帮助")
+    def _cmd_env(self, name, value):
+        if name is None:
+            # 查看所有环境变量
+            return "\n" + "\n".join(f"{var_name}: {self._env_value(var_name)}" for var_name in ENV_VARS)
+        var_name = name.upper()
+        if var_name not in ENV_VARS:
+            return f"未知环境变量: {var_name}"
+        if value is None:
+            # 查询单个环境变量
+            return f"{var_name}: {self._env_value(var_name)}"
+
+        # 设置环境变量
+        key, parse, _ = ENV_VARS[var_name]
+        try:
+            new_value = parse(value)
+        except ValueError:
+            return "无效的值类型"
+        if var_name == "VIDEO_TIMEOUT_BUFFER" and not 0 <= new_value <= 300:
+            return "Undefined Behavior"
+        self._set_config(key, new_value)
+        if var_name == "ALPHA" and self.gui_log:
+            # 立即更新GUI透明度（在GUI线程中执行）
+            self.gui_log.submit(self.gui_log.set_alpha, new_value)
+        if var_name == "UNORTHODOX":
+            return f"UNORTHODOX {'已启用' if new_value else '已禁用'}"
+        return f"{var_name} 已设置为: {value}"
+
+    @command("!reload", cooldown=2.0)
+    def _cmd_reload(self):
+        # 重新加载配置，只分发发生变化的配置项
+        if not self.config_loader:
+            return "配置存储未启用"
+        try:
+            changes = self.config_loader.reload()
+            # 重新加载词典映射
+            self.reload_dict_map()
+        except Exception as e:
+            return f"重载配置失败: {str(e)}"
+        if not changes:
+            return "配置已重新加载（无变更）"
+        return "配置已重新加载: " + ", ".join(changes)
+
+    @command("!service")
+    def _cmd_service(self):
+        # 检查当前启用的功能服务
+        return self._get_service_status()
+
+    @command("!service", "video", args=(Arg("action"),), usage="无效的service命令参数，使用 !help 查看帮助")
+    def _cmd_service_video(self, action):
+        if action.lower() not in ('start', 'stop'):
+            return "无效的service命令参数，使用 !help 查看帮助"
+        return self._set_video_playback(action.lower() == 'start')
+
+    @command("!service", "unorthodox", args=(Arg("action"),), usage="无效的service命令参数，使用 !help 查看帮助")
+    def _cmd_service_unorthodox(self, action):
+        if action.lower() not in ('start', 'stop'):
+            return "无效的service命令参数，使用 !help 查看帮助"
+        return self._set_unorthodox(action.lower() == 'start')
+
+    # ---------- 词典管理 ----------
+
+    @command("!dict", usage="!dict | !dict add key value | !dict rm key")
+    def _cmd_dict(self):
+        if not self.dict_map:
+            return "词典映射为空"
+        dict_list = [f"{key} -> {value}" for key, value in list(self.dict_map.items())[:10]]  # 显示前10个
+        if len(self.dict_map) > 10:
+            dict_list.append(f"... 等{len(self.dict_map)}个映射")
+        return f"词典映射 ({len(self.dict_map)}个): " + ", ".join(dict_list)
+
+    @command("!dict", "add", args=(Arg("key"), Arg("value", rest=True, optional=True, default="")),
+             usage="!dict add key value")
+    def _cmd_dict_add(self, key, value):
+        self.dict_map[key] = value
+        self.save_dict_map()
+        return f"已添加词典映射: {key} -> {value}"
+
+    @command("!dict", "rm", args=(Arg("key"),), usage="!dict rm key")
+    def _cmd_dict_rm(self, key):
+        if key not in self.dict_map:
+            return f"词典中不存在关键字: {key}"
+        del self.dict_map[key]
+        self.save_dict_map()
+        return f"已删除词典映射: {key}"
+
+    # ---------- GUI窗口控制 ----------
+
+    def _set_click_through(self, enable, alpha=None):
+        """设置窗口鼠标穿透（仅Windows），返回提示文本"""
+        try:
+            if platform.system() != "Windows":
+                return "仅支持Windows系统设置穿透"
+            from ctypes import windll
+
+            # 获取窗口句柄
+            hwnd = windll.user32.GetParent(self.gui_log.root.winfo_id())
+            ex_style = windll.user32.GetWindowLongW(hwnd, -20)  # GWL_EXSTYLE
+            if enable:
+                ex_style |= 0x20 | 0x80000  # WS_EX_TRANSPARENT | WS_EX_LAYERED
             else:
-                return f"unknown command: {cmd}，使用 !help 查看帮助"
+                ex_style &= ~(0x20 | 0x80000)
+            windll.user32.SetWindowLongW(hwnd, -20, ex_style)
+
+            # 设置透明度（默认使用配置中的透明度值）
+            alpha = self.config.get("env_alpha", 1.0) if alpha is None else alpha
+            windll.user32.SetLayeredWindowAttributes(hwnd, 0, int(alpha * 255), 2)
+
+            self.gui_ignore_state = 1 if enable else 0
+            return None
+        except Exception as e:
+            return f"{'设置' if enable else '取消'}穿透失败: {e}"
+
+    @command("!gui", "info")
+    def _cmd_gui_info(self):
+        if not self.gui_log:
+            return "GUI未初始化"
+        root = self.gui_log.root
+        ignore_status = "穿透" if self.gui_ignore_state == 1 else "非穿透"
+        hide_status = "隐藏" if self.gui_hide_state == 1 else "显示"
+        direct_status = "无边框" if self.gui_direct_state == 1 else "有边框"
+        return (f"显示器: {root.winfo_screenwidth()}x{root.winfo_screenheight()}\n"
+                f"窗口: {root.winfo_width()}x{root.winfo_height()}+{root.winfo_x()}+{root.winfo_y()}\n"
+                f"透明度: {self.config.get('env_alpha', 1.0)}\n穿透: {ignore_status}\n隐藏: {hide_status}\n边框: {direct_status}")
+
+    @command("!gui", "hide", args=(Arg("value", parse_bool, optional=True, error="布尔值无效，使用true/false或1/0"),),
+             usage="GUI hide命令参数错误")
+    def _cmd_gui_hide(self, value):
+        if not self.gui_log:
+            return "GUI未初始化"
+        # 无参数时切换隐藏状态
+        hide = self.gui_hide_state == 0 if value is None else value
+        self.gui_log.set_hidden(hide)
+        self.gui_hide_state = 1 if hide else 0
+        return "窗口已隐藏" if hide else "窗口已显示"
+
+    @command("!gui", "ignore", args=(Arg("value", parse_bool, optional=True, error="布尔值无效，使用true/false或1/0"),),
+             usage="GUI ignore命令参数错误")
+    def _cmd_gui_ignore(self, value):
+        if not self.gui_log:
+            return "GUI未初始化"
+        # 无参数时切换穿透状态
+        enable = self.gui_ignore_state == 0 if value is None else value
+        error = self._set_click_through(enable)
+        if error:
+            return error
+        return "窗口穿透已启用" if enable else "窗口穿透已禁用"
+
+    @command("!gui", "direct", args=(Arg("value", parse_bool, optional=True, error="布尔值无效，使用true/false或1/0"),),
+             usage="GUI direct命令参数错误")
+    def _cmd_gui_direct(self, value):
+        if not self.gui_log:
+            return "GUI未初始化"
+        # 无参数时切换边框状态
+        borderless = self.gui_direct_state == 0 if value is None else value
+        try:
+            self.gui_log.root.overrideredirect(borderless)
+        except Exception as e:
+            return f"{'设置无边框' if borderless else '恢复边框'}失败: {e}"
+        self.gui_direct_state = 1 if borderless else 0
+        return "窗口边框已隐藏" if borderless else "窗口边框已显示"
+
+    @command("!gui", "resize", args=(Arg("size"),), usage="GUI resize命令参数错误，格式: !gui resize <w>,<h>")
+    def _cmd_gui_resize(self, size):
+        # 支持 <int>,<int> / ~,<int> / <int>,~ / full,<int> / <int>,full
+        resize_params = size.split(',')
+        if len(resize_params) != 2:
+            return "resize参数格式错误，应为 <int>,<int> 或 ~,<int> 或 <int>,~ 或 full,<int> 或 <int>,full"
+        if not self.gui_log:
+            return "GUI未初始化"
+        root = self.gui_log.root
+        screen_w = root.winfo_screenwidth()
+        screen_h = root.winfo_screenheight()
+
+        def parse_dimension(text, current, full):
+            text = text.strip()
+            if text.lower() == 'full':
+                return full
+            if text == '~':
+                return current
+            return int(text)
+
+        try:
+            new_w = parse_dimension(resize_params[0], root.winfo_width(), screen_w)
+            new_h = parse_dimension(resize_params[1], root.winfo_height(), screen_h)
+        except ValueError:
+            return "resize参数必须为整数、~或full"
+        # 检查边界值
+        if new_w < 100 or new_h < 100:
+            return "窗口尺寸不能小于100x100像素"
+        if new_w > screen_w or new_h > screen_h:
+            return "窗口尺寸不能超过屏幕尺寸"
+        root.geometry(f"{new_w}x{new_h}")
+        return f"窗口大小已调整为: {new_w}x{new_h}"
+
+    @command("!gui", "origin", args=(Arg("position", optional=True),), usage="GUI origin命令参数错误，格式: !gui origin <x>,<y>")
+    def _cmd_gui_origin(self, position):
+        if position is None:
+            # 查询窗口坐标
+            if not self.gui_log:
+                return "GUI未初始化"
+            return f"窗口坐标: ({self.gui_log.root.winfo_x()}, {self.gui_log.root.winfo_y()})"
+        origin_params = position.split(',')
+        if len(origin_params) != 2:
+            return "origin参数格式错误，应为 <int>,<int>"
+        try:
+            x = int(origin_params[0].strip())
+            y = int(origin_params[1].strip())
+        except ValueError:
+            return "origin参数必须为整数"
+        if not self.gui_log:
+            return "GUI未初始化"
+        root = self.gui_log.root
+        # 检查边界值
+        if x < 0 or y < 0 or x > root.winfo_screenwidth() or y > root.winfo_screenheight():
+            return "窗口坐标超出屏幕范围"
+        root.geometry(f"{root.winfo_width()}x{root.winfo_height()}+{x}+{y}")
+        return f"窗口坐标已设置为: ({x}, {y})"
+
+    def _load_presets(self):
+        """读取窗口预设（按文件修改时间缓存，文件不存在时返回None）"""
+        try:
+            mtime = os.stat(PRESET_PATH).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        if self._presets is None or mtime != self._presets_mtime:
+            with open(PRESET_PATH, 'r', encoding='utf-8') as f:
+                self._presets = json.load(f)
+            self._presets_mtime = mtime
+        return self._presets
+
+    @command("!gui", "set", args=(Arg("num", int, error="预设编号必须为整数"),), usage="GUI set命令参数错误，格式: !gui set <int>")
+    async def _cmd_gui_set(self, preset_num):
+        # 按照预设更改窗口样式
+        if preset_num <= 0:
+            return "预设编号必须为正整数"
+        try:
+            presets = self._load_presets()
+        except json.JSONDecodeError:
+            return "预设文件格式错误，不是有效的JSON文件"
+        if presets is None:
+            return f"预设文件不存在: {PRESET_PATH}"
+
+        preset_data = presets.get(f"env_windows_preset_{preset_num}")
+        if preset_data is None:
+            return f"预设 {preset_num} 不存在"
+        if len(preset_data) != 6:
+            return f"预设 {preset_num} 数据格式错误，应包含6个参数"
+        if not self.gui_log:
+            return "GUI未初始化"
+
+        w_str, h_str, x_str, y_str, alpha_str, ignore_str = preset_data
+        try:
+            x = int(x_str)
+            y = int(y_str)
+            alpha = float(alpha_str)
+            w = None if w_str.lower() == 'full' else int(w_str)
+            h = None if h_str.lower() == 'full' else int(h_str)
+        except ValueError:
+            return "预设编号必须为整数"
+        if alpha < 0 or alpha > 1:
+            return "透明度必须在0-1之间"
+        ignore_bool = ignore_str.lower() in TRUE_VALUES
+
+        def apply():
+            # 在GUI线程中设置窗口大小、位置、透明度与穿透状态，返回 (尺寸, 错误提示)
+            root = self.gui_log.root
+            width = root.winfo_screenwidth() if w is None else w
+            height = root.winfo_screenheight() if h is None else h
+            root.geometry(f"{width}x{height}+{x}+{y}")
+            self.gui_log.set_alpha(alpha)
+            # 穿透状态不同时切换
+            error = None
+            if (self.gui_ignore_state == 1) != ignore_bool:
+                error = self._set_click_through(ignore_bool, alpha)
+            return f"{width}x{height}", error
+
+        try:
+            size, error = await self._in_gui(apply)
+        except Exception as e:
+            return f"应用预设失败: {e}"
+        # 配置在事件循环中修改
+        self._set_config("env_alpha", alpha)
+        if error:
+            return error
+        return f"预设 {preset_num} 已应用: {size}+{x}+{y}, 透明度:{alpha}, 穿透:{ignore_bool}"
+
+    @command("!gui", "sign", args=(Arg("params"),), usage="GUI sign命令参数错误，格式: !gui sign \"w,h,x,y,alpha,ignore\"")
+    def _cmd_gui_sign(self, params_str):
+        # 注册预设 "<int>,<int>,<int>,<int>,<float>,<bool>"
+        params = params_str.strip('"').split(',')
+        if len(params) != 6:
+            return "预设参数必须包含6个值: 宽度,高度,坐标X,坐标Y,透明度,穿透状态"
+        w_str, h_str, x_str, y_str, alpha_str, ignore_str = [p.strip() for p in params]
+        try:
+            w = 'full' if w_str.lower() == 'full' else int(w_str)
+            h = 'full' if h_str.lower() == 'full' else int(h_str)
+            x = int(x_str)
+            y = int(y_str)
+            alpha = float(alpha_str)
+        except ValueError:
+            return "参数格式错误，请使用: !gui sign \"w,h,x,y,alpha,ignore\""
+        if w != 'full' and w < 0:
+            return "窗口宽度不能为负数"
+        if h != 'full' and h < 0:
+            return "窗口高度不能为负数"
+        if alpha < 0 or alpha > 1:
+            return "透明度必须在0-1之间"
+        try:
+            ignore = 'true' if parse_bool(ignore_str) else 'false'
+        except ValueError:
+            return "穿透状态必须为布尔值(0/1或true/false)"
+
+        try:
+            presets = dict(self._load_presets() or {})
+            # 找到下一个可用的预设编号
+            existing_nums = [int(key[len("env_windows_preset_"):]) for key in presets
+                             if key.startswith("env_windows_preset_") and key[len("env_windows_preset_"):].isdigit()]
+            next_num = max(existing_nums) + 1 if existing_nums else 1
+            presets[f"env_windows_preset_{next_num}"] = [str(w), str(h), str(x), str(y), str(alpha), ignore]
+            persistence.write_json_now(PRESET_PATH, presets)
+            self._presets = presets
+            self._presets_mtime = os.stat(PRESET_PATH).st_mtime_ns
         except Exception as e:
-            print(f"[SYS] 命令执行出错: {str(e)}")
-            return f"命令执行出错: {str(e)}"
+            return f"注册预设失败: {e}"
+        return f"已注册预设 {next_num}"
+
+    @command("!gui", "alpha", args=(Arg("alpha", float, error="透明度值必须为浮点数"),),
+             usage="GUI alpha命令参数错误，格式: !gui alpha <float>")
+    async def _cmd_gui_alpha(self, alpha_value):
+        # 等效于 !env ALPHA
+        if alpha_value < 0 or alpha_value > 1:
+            return "透明度必须在0-1之间"
+        # 配置在事件循环中修改，透明度在GUI线程中立即更新
+        self._set_config("env_alpha", alpha_value)
+        if self.gui_log:
+            await self._in_gui(self.gui_log.set_alpha, alpha_value)
+        return f"ALPHA 已设置为: {alpha_value}"
 
     def _set_video_playback(self, enable):
         """设置视频播放功能的启用状态"""
         self.enable_video_playback = enable
         # 更新配置文件
-        self.config["enable_video_playback"] = self.enable_video_playback
-        import json
-        with open("config/config.json", "w", encoding="utf-8") as f:
-            json.dump(self.config, f, indent=4, ensure_ascii=False)
+        self._set_config("enable_video_playback", self.enable_video_playback)
         return "启用视频播放" if enable else "禁用视频播放"
     
     def _set_unorthodox(self, enable):
         """设置非正统音乐源功能的启用状态，等效于 !env UNORTHODOX 命令"""
-        self.config["env_unorthodox"] = enable
+        self._set_config("env_unorthodox", enable)
         self.unorthodox_enabled = enable
         
-        # 保存配置到文件
-        import json
-        with open("config/config.json", "w", encoding="utf-8") as f:
-            json.dump(self.config, f, indent=4, ensure_ascii=False)
         
         status = "已启用" if enable else "已禁用"
         return f"UNORTHODOX {status}"
@@ -1256,6 +951,29 @@ class CommandHandler:
         else:
             return "功能服务: None"
 
+    def _get_analytics(self, sub_cmd, k=5):
+        """!stats top/users/hour/skip 统计查询"""
+        if not self.analytics:
+            return "统计功能未启用"
+        if sub_cmd == 'top':
+            rows = self.analytics.top_songs(k)
+            lines = [f"{i}. {name} ({count}次)" for i, (name, count) in enumerate(rows, 1)]
+            return "近7天热门歌曲:\n" + "\n".join(lines) if lines else "近7天没有点歌记录"
+        elif sub_cmd == 'users':
+            rows = self.analytics.top_requesters(k)
+            lines = [f"{i}. {user} ({count}首)" for i, (user, count) in enumerate(rows, 1)]
+            return "近7天点歌排行:\n" + "\n".join(lines) if lines else "近7天没有点歌记录"
+        elif sub_cmd == 'hour':
+            histogram = self.analytics.hourly_histogram()
+            peak = max(histogram) or 1
+            lines = [f"{hour:02d}时 {'#' * round(count * 10 / peak)} {count}"
+                     for hour, count in enumerate(histogram) if count]
+            return "各时段点歌分布:\n" + "\n".join(lines) if lines else "暂无点歌记录"
+        else:
+            rows = self.analytics.top_skipped(k)
+            lines = [f"{i}. {name} 跳过率 {rate:.0%} (播放{plays}次)" for i, (name, rate, plays) in enumerate(rows, 1)]
+            return "跳过率最高:\n" + "\n".join(lines) if lines else "暂无跳过记录"
+
     async def _get_queue_status(self):
         """获取队列状态"""
         if self.queue_manager.is_empty():
@@ -1267,16 +985,7 @@ class CommandHandler:
             # 生成队列详情字符串
             queue_details = [f"当前队列中有 {len(queue_list)} 首歌曲/视频:"]
             for i, item in enumerate(queue_list, 1):
-                if isinstance(item, tuple) and len(item) == 3:
-                    sid, name, artist = item
-                    queue_details.append(f"{i}. {name} - {artist}")
-                elif isinstance(item, tuple) and len(item) == 4:
-                    # 非正统音乐源
-                    song_id, name, artist, audio_url = item
-                    queue_details.append(f"{i}. {name} - {artist} (备线源)")
-                else:
-                    # 视频ID
-                    queue_details.append(f"{i}. 视频: {item}")
+                queue_details.append(f"{i}. {item.display()}")
             
             return "\n".join(queue_details)
 
@@ -1299,18 +1008,18 @@ class CommandHandler:
             else:
                 video_url = parsed_video_id
             
-            success, msg = await self.queue_manager.add_song(video_url)
+            success, msg = await self.queue_manager.add_song(QueueItem.video(video_url, requester="ADMIN"))
             if success:
                 return f"入队成功: {video_url} (添加者: ADMIN)"
             else:
                 return msg
         else:
-            # 尝试解析为歌曲
-            sid, name, artist = self.music_bot.get_song_info(query)
+            # 尝试解析为歌曲（网易云搜索会访问网络，放到线程中执行）
+            sid, name, artist = await asyncio.to_thread(self.music_bot.get_song_info, query)
             if sid:
                 if self.queue_manager.size() >= self.queue_maxsize:
                     return "点歌队列已满，无法加入"
-                success, msg = await self.queue_manager.add_song((sid, name, artist))
+                success, msg = await self.queue_manager.add_song(QueueItem.netease(sid, name, artist, requester="ADMIN"))
                 if success:
                     return f"入队成功: {name} (添加者: ADMIN)"
                 else:
@@ -1318,6 +1027,87 @@ class CommandHandler:
             else:
                 return "未找到歌曲或无效的视频ID"
 
+    async def _resolve_queries(self, queries):
+        """
+        并发解析一批点歌请求，保持原顺序
+        视频ID直接生成条目，纯数字ID合并为一次批量详情请求，关键词并发搜索
+        返回 (条目列表, 未找到的请求列表)
+        """
+        resolved = [None] * len(queries)
+        id_slots, keyword_slots = {}, []
+        for index, query in enumerate(queries):
+            parsed_video_id, p_number = self.parse_bilibili_id(query)
+            if self.is_valid_bilibili_id(query) or self.is_valid_bilibili_id(parsed_video_id):
+                video_url = f"{parsed_video_id}?p={p_number}" if p_number else parsed_video_id
+                resolved[index] = QueueItem.video(video_url, requester="ADMIN")
+            elif query.isdigit():
+                id_slots.setdefault(int(query), []).append(index)
+            else:
+                keyword_slots.append(index)
+
+        tasks = [asyncio.to_thread(self.music_bot.get_song_info, queries[i]) for i in keyword_slots]
+        if id_slots:
+            tasks.append(asyncio.to_thread(self.music_bot.get_songs_info, list(id_slots)))
+        results = await asyncio.gather(*tasks)
+
+        if id_slots:
+            details = results.pop()
+            for sid, indexes in id_slots.items():
+                if sid in details:
+                    for index in indexes:
+                        resolved[index] = QueueItem.netease(*details[sid], requester="ADMIN")
+        for index, (sid, name, artist) in zip(keyword_slots, results):
+            if sid:
+                resolved[index] = QueueItem.netease(sid, name, artist, requester="ADMIN")
+
+        items = [item for item in resolved if item is not None]
+        missing = [query for query, item in zip(queries, resolved) if item is None]
+        return items, missing
+
+    def _batch_summary(self, title, added, duplicates, overflow, missing):
+        """批量入队结果汇总为一条回复"""
+        lines = [f"{title}: 成功 {len(added)} 首"]
+        if added:
+            names = [item.display() for item in added[:5]]
+            if len(added) > 5:
+                names.append(f"... 等 {len(added)} 首")
+            lines.append("、".join(names))
+        if duplicates:
+            lines.append(f"已在队列中: {len(duplicates)} 首")
+        if overflow:
+            lines.append(f"队列已满未加入: {len(overflow)} 首")
+        if missing:
+            lines.append(f"未找到: {', '.join(missing[:5])}" + (" ..." if len(missing) > 5 else ""))
+        return "\n".join(lines)
+
+    async def _queue_add_batch(self, queries):
+        """队列批量增加歌曲（!queue add a | b | c）"""
+        print(f"[ADM] ADMIN: 收到批量添加请求: {len(queries)} 项")
+        if self.queue_manager.is_full():
+            return "点歌队列已满，无法加入"
+        items, missing = await self._resolve_queries(queries)
+        added, duplicates, overflow = await self.queue_manager.add_songs(items)
+        return self._batch_summary("批量入队", added, duplicates, overflow, missing)
+
+    async def _queue_add_playlist(self, playlist_id, num=None):
+        """导入网易云歌单（默认填满队列剩余空位）"""
+        print(f"[ADM] ADMIN: 收到歌单导入请求: {playlist_id}")
+        free = self.queue_maxsize - self.queue_manager.size()
+        if free <= 0:
+            return "点歌队列已满，无法加入"
+        limit = free if num is None else max(0, min(num, free))
+        track_ids = await asyncio.to_thread(self.music_bot.get_playlist_track_ids, playlist_id)
+        if not track_ids:
+            return f"歌单为空或获取失败: {playlist_id}"
+        # 先排除已在队列中的歌曲，只请求真正需要入队的歌曲详情
+        queued = self.queue_manager.queued_keys()
+        wanted = [sid for sid in dict.fromkeys(track_ids) if f"ncm:{sid}" not in queued][:limit]
+        details = await asyncio.to_thread(self.music_bot.get_songs_info, wanted)
+        items = [QueueItem.netease(*details[sid], requester="ADMIN") for sid in wanted if sid in details]
+        added, duplicates, overflow = await self.queue_manager.add_songs(items)
+        missing = [str(sid) for sid in wanted if sid not in details]
+        return self._batch_summary(f"歌单 {playlist_id} 导入", added, duplicates, overflow, missing)
+
     async def _queue_unorthodox_add(self, query):
         """队列增加歌曲（使用非正统音乐源）"""
         print(f"[ADM] ADMIN: 收到队列添加请求: {query}")
@@ -1330,18 +1120,14 @@ class CommandHandler:
         if self.queue_manager.size() >= self.queue_maxsize:
             return "点歌队列已满，无法加入"
         
-        # 尝试导入unorthodox模块并使用它搜索音乐
+        # 先查缓存与直连解析，失败时再用常驻浏览器池
         try:
-            from modules.unorthodox import UnorthodoxMusicPlayer
-            unorthodox_player = UnorthodoxMusicPlayer()
-            await unorthodox_player.initialize()
-            result = await unorthodox_player.search_and_get_first_song(query)
-            await unorthodox_player.close()
+            result = await self._unorthodox_source().search_and_get_first_song(query)
             
             if result:
                 song_id, song_name, song_artist, audio_url = result
-                # 创建一个包含音频URL的特殊对象，供播放器使用
-                unorthodox_item = (song_id, song_name, song_artist, audio_url)
+                # 备线源条目直接携带音频URL，供播放器使用
+                unorthodox_item = QueueItem.unorthodox(song_id, song_name, song_artist, audio_url, requester="ADMIN")
                 success, msg = await self.queue_manager.add_song(unorthodox_item)
                 if success:
                     return f"入队成功: {song_name} - {song_artist} (添加者: ADMIN)"
@@ -1355,6 +1141,45 @@ class CommandHandler:
             # print(f"[SYS] 搜索失败: {str(e)}")
             return f"搜索失败: {str(e)}"
 
+    def _unorthodox_source(self):
+        """获取备线点歌入口并同步当前配置"""
+        from modules.unorthodox import UnorthodoxSource
+        if self._unorthodox is None:
+            self._unorthodox = UnorthodoxSource(
+                self.unorthodox_pool_size, self.unorthodox_idle_timeout,
+                cache_size=self.config.get("env_unorthodox_cache_size", 256), cache_ttl=self.unorthodox_cache_ttl
+            )
+        self._unorthodox.configure(self.unorthodox_pool_size, self.unorthodox_idle_timeout, self.unorthodox_cache_ttl)
+        return self._unorthodox
+
+    async def close(self):
+        """退出时释放备线浏览器池"""
+        if self._unorthodox is not None:
+            await self._unorthodox.close()
+
+    async def _queue_unorthodox_batch(self, queries):
+        """备线批量入队（!queue uadd a | b | c），各项并发解析（需要浏览器时分摊到池中的页面）"""
+        print(f"[ADM] ADMIN: 收到备线批量添加请求: {len(queries)} 项")
+        if not self.unorthodox_enabled:
+            return "备线未启用"
+        if self.queue_manager.is_full():
+            return "点歌队列已满，无法加入"
+        try:
+            source = self._unorthodox_source()
+        except ImportError:
+            return "模块未找到，请确保unorthodox.py文件存在"
+        results = await asyncio.gather(*(source.search_and_get_first_song(q) for q in queries),
+                                       return_exceptions=True)
+        items, missing = [], []
+        for query, result in zip(queries, results):
+            if not result or isinstance(result, BaseException):
+                missing.append(query)
+                continue
+            song_id, song_name, song_artist, audio_url = result
+            items.append(QueueItem.unorthodox(song_id, song_name, song_artist, audio_url, requester="ADMIN"))
+        added, duplicates, overflow = await self.queue_manager.add_songs(items)
+        return self._batch_summary("备线批量入队", added, duplicates, overflow, missing)
+
     async def _queue_del(self, index):
         """删除队列指定位置的歌曲"""
         if index < 1 or index > self.queue_maxsize:
@@ -1370,15 +1195,7 @@ class CommandHandler:
         success, deleted_item = await self.queue_manager.remove_song_at_index(index - 1)
         
         if success:
-            if isinstance(deleted_item, tuple) and len(deleted_item) == 3:
-                sid, name, artist = deleted_item
-                return f"已删除第 {index} 首歌曲: {name} - {artist}"
-            elif isinstance(deleted_item, tuple) and len(deleted_item) == 4:
-                # 非正统音乐源项目
-                song_id, song_name, song_artist, audio_url = deleted_item
-                return f"已删除第 {index} 首歌曲: {song_name} - {song_artist} (备线源)"
-            else:
-                return f"已删除第 {index} 个视频: {deleted_item}"
+            return f"已删除第 {index} 项: {deleted_item.display()}"
         else:
             return "删除失败"
 
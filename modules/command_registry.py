@@ -0,0 +1,221 @@
+# modules/command_registry.py
+# 命令注册与分发模块
+
+import asyncio
+import inspect
+import time
+
+TRUE_VALUES = ('true', '1', 'yes', 'on', 't', 'y')
+FALSE_VALUES = ('false', '0', 'no', 'off', 'f', 'n')
+
+LEVEL_USER = "user"
+LEVEL_ADMIN = "admin"
+
+def parse_bool(text):
+    """解析布尔参数，无法识别时抛出 ValueError"""
+    value = text.lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise ValueError(text)
+
+class Arg:
+    """命令参数声明"""
+    __slots__ = ("name", "parse", "optional", "default", "rest", "error")
+
+    def __init__(self, name, parse=str, optional=False, default=None, rest=False, error=None):
+        self.name = name
+        self.parse = parse          # 类型转换函数，失败时抛出 ValueError
+        self.optional = optional
+        self.default = default
+        self.rest = rest            # 吞掉剩余全部参数（以空格拼接）
+        self.error = error          # 类型转换失败时的提示
+
+class Command:
+    """一条已注册的命令（命令名 + 可选子命令）"""
+    __slots__ = ("name", "sub", "handler", "args", "level", "cooldown", "usage",
+                 "is_async", "max_args", "min_args", "calls", "total_ns", "max_ns")
+
+    def __init__(self, name, sub, handler, args=(), level=LEVEL_ADMIN, cooldown=0, usage=None):
+        self.name = name
+        self.sub = sub
+        self.handler = handler
+        self.args = tuple(args)
+        self.level = level
+        self.cooldown = cooldown    # 同一用户两次调用的最小间隔（秒）
+        self.usage = usage          # 参数不符时的提示，可含 {args}
+        self.is_async = asyncio.iscoroutinefunction(handler)
+        self.min_args = sum(1 for arg in self.args if not arg.optional and not arg.rest)
+        self.max_args = None if any(arg.rest for arg in self.args) else len(self.args)
+        self.calls = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    @property
+    def label(self):
+        return f"{self.name} {self.sub}" if self.sub else self.name
+
+    def parse(self, tokens):
+        """按参数声明转换参数，返回参数列表或错误提示字符串"""
+        if len(tokens) < self.min_args or (self.max_args is not None and len(tokens) > self.max_args):
+            return None
+        values = []
+        for index, arg in enumerate(self.args):
+            if arg.rest:
+                if not tokens[index:] and not arg.optional:
+                    return None
+                values.append(' '.join(tokens[index:]) if tokens[index:] else arg.default)
+                break
+            if index >= len(tokens):
+                values.append(arg.default)
+                continue
+            try:
+                values.append(arg.parse(tokens[index]))
+            except ValueError:
+                return arg.error or None
+        return values
+
+def command(name, sub=None, args=(), level=LEVEL_ADMIN, cooldown=0, usage=None):
+    """声明命令处理方法（可叠加多次以注册多个入口）"""
+    def decorator(func):
+        specs = getattr(func, "__commands__", [])
+        specs.append((name, sub, args, level, cooldown, usage))
+        func.__commands__ = specs
+        return func
+    return decorator
+
+class CommandRegistry:
+    """
+    按 (命令, 子命令) 查表分发命令
+    每条命令的参数、权限级别与冷却时间在注册时声明一次，并记录调用次数与耗时
+    """
+
+    def __init__(self, is_admin=None):
+        self.is_admin = is_admin or (lambda username: False)
+        self._commands = {}     # 命令名 -> {子命令或None: Command}
+        self._groups = {}       # 命令名 -> (缺少子命令提示, 未知子命令提示)
+        self._last_used = {}    # (命令, 用户) -> 上次调用时间
+
+    def register(self, name, sub, handler, args=(), level=LEVEL_ADMIN, cooldown=0, usage=None):
+        entry = Command(name, sub, handler, args, level, cooldown, usage)
+        self._commands.setdefault(name, {})[sub] = entry
+        return entry
+
+    def register_object(self, obj):
+        """注册对象上所有用 @command 声明的方法"""
+        for attr in dir(type(obj)):
+            func = getattr(type(obj), attr, None)
+            for name, sub, args, level, cooldown, usage in getattr(func, "__commands__", ()):
+                self.register(name, sub, getattr(obj, attr), args, level, cooldown, usage)
+
+    def describe_group(self, name, missing, unknown):
+        """设置命令组的提示：缺少子命令 / 未知子命令（可含 {sub}）"""
+        self._groups[name] = (missing, unknown)
+
+    def commands(self):
+        for subs in self._commands.values():
+            yield from subs.values()
+
+    def lookup(self, parts):
+        """查找命令，返回 (Command或None, 剩余参数)"""
+        subs = self._commands.get(parts[0].lower())
+        if subs is None:
+            return None, parts[1:]
+        if len(parts) > 1:
+            entry = subs.get(parts[1].lower())
+            if entry is not None:
+                return entry, parts[2:]
+        return subs.get(None), parts[1:]
+
+    async def dispatch(self, username, text, admin=None):
+        """分发一条命令，返回回复文本（无权限时返回None）；admin 可覆盖按用户名判断的管理员身份"""
+        parts = text.split()
+        name = parts[0].lower()
+        entry, tokens = self.lookup(parts)
+        if admin is None:
+            admin = self.is_admin(username)
+        if entry is None:
+            if not admin:
+                print(f"[DNY] {username}: {text}")
+                return None
+            if name in self._groups:
+                missing, unknown = self._groups[name]
+                return unknown.format(sub=parts[1]) if len(parts) > 1 else missing
+            return f"unknown command: {name}，使用 !help 查看帮助"
+        if entry.level == LEVEL_ADMIN and not admin:
+            print(f"[DNY] {username}: {text}")
+            return None
+
+        values = entry.parse(tokens)
+        if values is None or isinstance(values, str):
+            if values:
+                return values
+            usage = entry.usage or f"{entry.label} 参数错误，使用 !help 查看帮助"
+            return usage.format(args=' '.join(tokens))
+
+        if entry.cooldown:
+            now = time.monotonic()
+            key = (entry.label, username)
+            remaining = self._last_used.get(key, 0) + entry.cooldown - now
+            if remaining > 0:
+                return f"命令冷却中，请 {remaining:.1f} 秒后再试"
+            self._last_used[key] = now
+
+        start = time.perf_counter_ns()
+        try:
+            result = entry.handler(*values)
+            if entry.is_async or inspect.isawaitable(result):
+                result = await result
+            return result
+        except Exception as e:
+            print(f"[SYS] 命令执行出错: {str(e)}")
+            return f"命令执行出错: {str(e)}"
+        finally:
+            elapsed = time.perf_counter_ns() - start
+            entry.calls += 1
+            entry.total_ns += elapsed
+            if elapsed > entry.max_ns:
+                entry.max_ns = elapsed
+
+    def stats(self, limit=10):
+        """按调用次数排序的命令统计 [(命令, 次数, 平均毫秒, 最大毫秒)]"""
+        used = sorted((c for c in self.commands() if c.calls), key=lambda c: c.calls, reverse=True)
+        return [(c.label, c.calls, c.total_ns / c.calls / 1e6, c.max_ns / 1e6) for c in used[:limit]]
+
+def _benchmark(count=100000):
+    """命令分发开销测试：查表 + 参数解析 + 统计，与直接调用处理函数对比"""
+    class Dummy:
+        @command("!vol", args=(Arg("vol", int, optional=True),))
+        def vol(self, vol):
+            return vol
+
+        @command("!queue", "del", args=(Arg("index", int),))
+        def queue_del(self, index):
+            return index
+
+    registry = CommandRegistry(is_admin=lambda username: True)
+    dummy = Dummy()
+    registry.register_object(dummy)
+    messages = ["!vol 50", "!queue del 2", "!vol"] * (count // 3)
+
+    async def run():
+        start = time.perf_counter()
+        for message in messages:
+            await registry.dispatch("ADMIN", message)
+        return time.perf_counter() - start
+
+    dispatch_time = asyncio.run(run())
+    start = time.perf_counter()
+    for message in messages:
+        parts = message.split()
+        dummy.vol(int(parts[1])) if parts[0] == "!vol" and len(parts) > 1 else dummy.queue_del(2)
+    direct_time = time.perf_counter() - start
+    print(f"{len(messages)} 条命令: 分发 {dispatch_time / len(messages) * 1e6:.2f} µs/条, "
+          f"直接调用 {direct_time / len(messages) * 1e6:.2f} µs/条")
+    for label, calls, avg_ms, max_ms in registry.stats():
+        print(f"{label}: {calls} 次, 平均 {avg_ms * 1000:.2f} µs, 最大 {max_ms * 1000:.2f} µs")
+
+if __name__ == "__main__":
+    # python -m modules.command_registry
+    _benchmark()
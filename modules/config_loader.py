@@ -3,8 +3,16 @@
 
 import json
 import os
+import threading
+import time
+from collections import deque
 from watchdog.events import FileSystemEventHandler
 
+from modules.command_registry import parse_bool
+from modules.persistence import persistence
+
+_TYPE_NAMES = {bool: "布尔值", int: "整数", (int, float): "数字", str: "字符串", list: "列表"}
+
 class ConfigLoader:
     def __init__(self, config_path="config/config.json"):
         self.config_path = config_path
@@ -19,15 +27,100 @@ class ConfigLoader:
             "env_default_admins": ["磕磕绊绊学语文", "琴吹炒面"],
             "env_queue_maxsize": 5,
             "env_log_file": "data/requests.log",
+            "env_log_flush_interval": 1.0,  # 日志刷盘间隔（秒）
+            "env_log_fsync": "flush",  # never / flush / close
+            "env_log_max_bytes": 10485760,  # 单个日志分段上限，超过后轮转并gzip压缩
+            "env_log_backups": 5,
+            "env_analytics_file": "data/analytics.json",
+            "env_analytics_interval": 300,  # 统计快照保存间隔（秒）
+            "env_history_capacity": 50,
+            "env_history_file": "data/history.jsonl",  # 播放历史落盘文件，留空则不落盘
             "env_admin_password": "mysecret",
+            "env_rate_user_capacity": 3,  # 每位用户可连续点歌次数（0 表示不限制）
+            "env_rate_user_interval": 20,  # 每位用户每隔多少秒恢复一次
+            "env_rate_global_capacity": 20,
+            "env_rate_global_interval": 3,
+            "env_rate_dup_window": 60,  # 同一用户重复内容的抑制时间（秒）
+            "env_index_threshold": 0.75,  # 本地歌曲索引的最低匹配分数，低于该值时搜索网易云
+            "env_console_lines": 2000,  # 控制台输出在内存中保留的行数
+            "env_console_log_file": "data/console.log",  # 控制台输出落盘文件，留空则不落盘
+            "env_console_log_max_bytes": 5242880,  # 控制台日志单个分段上限
+            "env_gui_max_lines": 1000,  # GUI窗口保留的最大行数
+            "env_gui_flush_ms": 50,  # GUI窗口合并刷新的间隔（毫秒）
+            "env_startup_budget": 5.0,  # 启动至首次轮询的耗时预算（秒），超出时提示
+            "env_control_host": "127.0.0.1",  # 无界面模式的管理控制端口
+            "env_control_port": 8765,  # 为0时不启动
             "env_alpha": 1.0,  # 保留原始键名，但对外显示为ALPHA
             "enable_video_playback": True,  
             "env_video_timeout_buffer": 3,  
             "enable_fallback_playlist": True,
-            "env_unorthodox": False  # 新增：启用非正统音乐源功能
+            "env_unorthodox": False,  # 新增：启用非正统音乐源功能
+            "env_unorthodox_pool_size": 2,  # 备线浏览器池的页面数（可并发处理的备线请求数）
+            "env_unorthodox_idle_timeout": 300,  # 备线浏览器空闲多少秒后关闭，为0时常驻
+            "env_unorthodox_cache_size": 256,  # 备线解析结果缓存条数
+            "env_unorthodox_cache_ttl": 600  # 备线解析结果缓存有效期（秒），音频链接可能过期
         }
+        # 配置项类型（由默认值推导，浮点项允许写成整数）
+        self.schema = {key: self._schema_type(value) for key, value in self.default_config.items()}
+        self._lock = threading.RLock()
+        self._subscribers = []  # [(关注的键集合或None, 回调)]
+        self.changes = deque(maxlen=100)  # 最近的配置变更 (时间, 键, 旧值, 新值)
         self.config = self.load_config()
     
+    @staticmethod
+    def _schema_type(value):
+        if isinstance(value, bool):
+            return bool
+        if isinstance(value, float):
+            return (int, float)
+        return type(value)
+    
+    @staticmethod
+    def _matches(value, expected):
+        # bool 是 int 的子类，需单独排除
+        return isinstance(value, expected) and (expected is bool or not isinstance(value, bool))
+
+    @staticmethod
+    def _coerce(value, expected):
+        """把兼容的值转换为目标类型（如数字字符串），无法转换时抛出 ValueError"""
+        if expected is bool:
+            if isinstance(value, str):
+                return parse_bool(value.strip())
+            if isinstance(value, int) and value in (0, 1):
+                return bool(value)
+        elif isinstance(value, bool):
+            pass
+        elif expected is int:
+            if isinstance(value, str):
+                return int(value.strip())
+            if isinstance(value, float) and value.is_integer():
+                return int(value)
+        elif expected == (int, float):
+            if isinstance(value, str):
+                return float(value.strip())
+        elif expected is str:
+            if isinstance(value, (int, float)):
+                return str(value)
+        raise ValueError(value)
+
+    def validate(self, raw):
+        """按类型校验配置；兼容的值（如数字字符串）自动转换，无法转换的项回退为默认值并提示"""
+        clean = {}
+        for key, value in raw.items():
+            expected = self.schema.get(key)
+            if expected is not None and not self._matches(value, expected):
+                type_name = _TYPE_NAMES.get(expected, getattr(expected, "__name__", str(expected)))
+                try:
+                    coerced = self._coerce(value, expected)
+                    print(f"[SYS] 配置项 {key} 应为{type_name}，已将 {value!r} 转换为 {coerced!r}")
+                    value = coerced
+                except (ValueError, OverflowError):
+                    default = self.default_config[key]
+                    print(f"[SYS] 警告: 配置项 {key} 应为{type_name}，{value!r} 无法转换，已回退为默认值 {default!r}")
+                    value = default
+            clean[key] = value
+        return clean
+    
     def load_config(self):
         """加载配置文件"""
         if not os.path.exists(self.config_path):
@@ -37,63 +130,129 @@ class ConfigLoader:
                 json.dump(self.default_config, f, indent=4, ensure_ascii=False)
             print(f"[SYS] 配置文件已创建: {self.config_path}")
             print("[SYS] 请修改配置文件后重新启动程序")
-            return self.default_config
+            return dict(self.default_config)
         
         with open(self.config_path, 'r', encoding='utf-8') as f:
             print(f"[SYS] {self.config_path} 已加载")
-            return json.load(f)
+            return self.validate(json.load(f))
     
     def get(self, key, default=None):
-        """获取配置值"""
-        return self.config.get(key, default)
+        """获取配置值；文件中没有该项时使用 default 或默认配置"""
+        if key in self.config:
+            return self.config[key]
+        return self.default_config.get(key) if default is None else default
+    
+    def subscribe(self, keys, callback):
+        """订阅配置变更；keys 为 None 时接收所有变更，回调参数为 {键: (旧值, 新值)}"""
+        self._subscribers.append((frozenset(keys) if keys is not None else None, callback))
+    
+    def apply(self, new_config):
+        """
+        以新配置替换当前配置：计算键级差异，原地修改配置字典并只通知关注变更键的订阅者
+        返回变更 {键: (旧值, 新值)}
+        """
+        with self._lock:
+            changes = {}
+            for key in self.config.keys() | new_config.keys():
+                old = self.config.get(key)
+                new = new_config.get(key)
+                if old != new or (key in self.config) != (key in new_config):
+                    changes[key] = (old, new)
+            for key, (old, new) in changes.items():
+                if key in new_config:
+                    self.config[key] = new
+                else:
+                    del self.config[key]
+                self.changes.append((time.time(), key, old, new))
+        self._dispatch(changes)
+        return changes
+    
+    def _dispatch(self, changes):
+        if not changes:
+            return
+        for keys, callback in list(self._subscribers):
+            relevant = changes if keys is None else {k: v for k, v in changes.items() if k in keys}
+            if not relevant:
+                continue
+            try:
+                callback(relevant)
+            except Exception as e:
+                print(f"[SYS] 配置变更回调出错: {e}")
+    
+    def reload(self):
+        """从文件重新加载配置并分发差异"""
+        with open(self.config_path, 'r', encoding='utf-8') as f:
+            new_config = self.validate(json.load(f))
+        return self.apply(new_config)
     
-    def set(self, key, value):
-        """设置配置值"""
-        self.config[key] = value
+    def set(self, key, value, save=True):
+        """设置单个配置值"""
+        return self.update_config({key: value}, save)
     
     def save_config(self):
-        """保存配置到文件"""
-        # 确保目录存在
-        os.makedirs(os.path.dirname(self.config_path), exist_ok=True)
-        with open(self.config_path, 'w', encoding='utf-8') as f:
-            json.dump(self.config, f, indent=4, ensure_ascii=False)
+        """保存配置到文件（合并短时间内的多次保存）"""
+        persistence.write_json(self.config_path, self.config, indent=4)
     
-    def update_config(self, updates):
+    def update_config(self, updates, save=True):
         """批量更新配置"""
-        self.config.update(updates)
-        self.save_config()
+        with self._lock:
+            new_config = dict(self.config)
+            new_config.update(self.validate(updates))
+            changes = self.apply(new_config)
+        if save and changes:
+            self.save_config()
+        return changes
 
-# 配置热重载处理器
-class ConfigReloadHandler(FileSystemEventHandler):
-    def __init__(self, config_loader, callback=None):
+# 通用文件热重载处理器
+class FileReloadHandler(FileSystemEventHandler):
+    def __init__(self, file_path, callback, reload_cooldown=1.0, dispatch=None):
         super().__init__()
-        self.config_loader = config_loader
+        self.file_path = file_path
         self.callback = callback
         self.last_reload_time = 0
-        self.reload_cooldown = 1.0
+        self.reload_cooldown = reload_cooldown
+        self.dispatch = dispatch  # 可选：把回调转交到其他线程执行（如 Runtime.call），默认在看门狗线程中执行
     
     def on_modified(self, event):
-        if event.src_path.endswith(self.config_loader.config_path):
-            import time
-            current_time = time.time()
-            # 检查是否在冷却时间内
-            if current_time - self.last_reload_time < self.reload_cooldown:
-                return
-            
-            # 重新加载配置
-            try:
-                with open(self.config_loader.config_path, 'r', encoding='utf-8') as f:
-                    new_config = json.load(f)
-                self.config_loader.config = new_config
-            except Exception as e:
-                print(f"[SYS] 重新加载配置失败: {e}")
-                return
-            
-            if self.callback:
-                self.callback(self.config_loader.config)
-            
-            print("[SYS] 配置已热重载")
-            self.last_reload_time = current_time
+        self.reload(event.src_path)
+    
+    def on_moved(self, event):
+        # 原子写入（临时文件重命名）表现为移动事件
+        self.reload(event.dest_path)
+    
+    def reload(self, path):
+        if not os.path.abspath(path) == os.path.abspath(self.file_path):
+            return
+        # 本进程自己写入的内容无需重新加载
+        if persistence.is_self_write(self.file_path):
+            return
+        current_time = time.time()
+        # 检查是否在冷却时间内
+        if current_time - self.last_reload_time < self.reload_cooldown:
+            return
+        self.last_reload_time = current_time
+        if self.dispatch is not None:
+            self.dispatch(self._invoke)
+        else:
+            self._invoke()
+    
+    def _invoke(self):
+        try:
+            self.callback()
+        except Exception as e:
+            print(f"[SYS] 重新加载 {self.file_path} 失败: {e}")
+            self.last_reload_time = 0  # 失败后允许立即重试
+
+# 配置热重载处理器
+class ConfigReloadHandler(FileReloadHandler):
+    def __init__(self, config_loader, dispatch=None):
+        super().__init__(config_loader.config_path, self._reload_config, dispatch=dispatch)
+        self.config_loader = config_loader
+    
+    def _reload_config(self):
+        # 只分发发生变化的配置项
+        changes = self.config_loader.reload()
+        print(f"[SYS] 配置已热重载 ({len(changes)} 项变更)")
 
 def load_preset_config(preset_path="config/preset.json"):
     """加载预设配置文件"""
@@ -112,7 +271,5 @@ def load_preset_config(preset_path="config/preset.json"):
 
 def save_preset_config(presets, preset_path="config/preset.json"):
     """保存预设配置到文件"""
-    os.makedirs(os.path.dirname(preset_path), exist_ok=True)
-    with open(preset_path, 'w', encoding='utf-8') as f:
-        json.dump(presets, f, indent=2, ensure_ascii=False)
+    persistence.write_json_now(preset_path, presets)
     print(f"[SYS] 预设配置已保存到 {preset_path}")
\ No newline at end of file
@@ -0,0 +1,134 @@
+# modules/control_server.py
+# 本地管理控制端口模块
+
+import asyncio
+import hmac
+
+# 回复以单独一行 "." 结束；以 "." 开头的行在发送时加倍（与SMTP相同）
+END_MARK = "."
+
+class ControlServer:
+    """
+    无界面模式下的本地管理入口
+    客户端先发送 "AUTH <管理员密码>"，之后每行一条命令，以管理员身份执行并返回结果
+    """
+
+    def __init__(self, command_handler, password, host="127.0.0.1", port=8765, max_failures=3):
+        self.command_handler = command_handler
+        self.password = password
+        self.host = host
+        self.port = port
+        self.max_failures = max_failures
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        print(f"[{'SYS':>3}] 管理控制端口已启动: {self.host}:{self.port}")
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    @staticmethod
+    async def _reply(writer, text):
+        lines = [("." + line) if line.startswith(".") else line for line in str(text).split("\n")]
+        writer.write(("\n".join(lines) + f"\n{END_MARK}\n").encode("utf-8"))
+        await writer.drain()
+
+    async def _handle_client(self, reader, writer):
+        peer = writer.get_extra_info("peername")
+        authed = False
+        failures = 0
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                text = line.decode("utf-8", "replace").strip()
+                if not text:
+                    continue
+                if text.lower() in ("quit", "exit"):
+                    await self._reply(writer, "bye")
+                    break
+                if not authed:
+                    given = text[5:] if text.startswith("AUTH ") else ""
+                    if self.password and hmac.compare_digest(given.encode(), str(self.password).encode()):
+                        authed = True
+                        await self._reply(writer, "OK")
+                        continue
+                    failures += 1
+                    print(f"[{'DNY':>3}] CONTROL {peer}: 认证失败")
+                    await self._reply(writer, "ERR 需要认证: AUTH <password>")
+                    if failures >= self.max_failures:
+                        break
+                    continue
+                print(f"[{'ADM':>3}] CONTROL: {text}")
+                result = await self.command_handler.handle_command("CONTROL", text, admin=True)
+                await self._reply(writer, result if result else "(无输出)")
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+async def send_commands(commands, password, host="127.0.0.1", port=8765):
+    """连接控制端口，依次执行命令并返回结果列表"""
+    reader, writer = await asyncio.open_connection(host, port)
+
+    async def request(text):
+        writer.write((text + "\n").encode("utf-8"))
+        await writer.drain()
+        lines = []
+        while True:
+            line = (await reader.readline()).decode("utf-8").rstrip("\n")
+            if line == END_MARK or not line and reader.at_eof():
+                return "\n".join(lines)
+            lines.append(line[1:] if line.startswith("..") else line)
+
+    try:
+        auth = await request(f"AUTH {password}")
+        if auth != "OK":
+            return [auth]
+        return [await request(text) for text in commands]
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+if __name__ == "__main__":
+    # python -m modules.control_server [--port 8765] [--password PW] "!queue ls" ...
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="向无界面模式运行的点歌机发送管理命令")
+    parser.add_argument("commands", nargs="*", help="要执行的命令，省略时进入交互模式")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=None)
+    parser.add_argument("--password", default=None)
+    args = parser.parse_args()
+
+    try:
+        with open("config/config.json", "r", encoding="utf-8") as f:
+            config = json.load(f)
+    except (OSError, ValueError):
+        config = {}
+    port = args.port or config.get("env_control_port", 8765)
+    password = args.password or config.get("env_admin_password", "")
+
+    if args.commands:
+        for output in asyncio.run(send_commands(args.commands, password, args.host, port)):
+            print(output)
+    else:
+        while True:
+            try:
+                text = input("> ").strip()
+            except (EOFError, KeyboardInterrupt):
+                break
+            if text:
+                print(asyncio.run(send_commands([text], password, args.host, port))[-1])
@@ -0,0 +1,247 @@
+# modules/event_bus.py
+# 进程内事件总线模块
+
+import asyncio
+import time
+from collections import deque
+
+# ---------- 事件 ----------
+
+class Event:
+    """事件基类；订阅基类即可收到全部事件"""
+    __slots__ = ("ts",)
+
+    def __init__(self):
+        self.ts = time.time()
+
+class MessageReceived(Event):
+    """收到一条弹幕；role 为 ADM / GRP / USR"""
+    __slots__ = ("user", "text", "role")
+
+    def __init__(self, user, text, role):
+        super().__init__()
+        self.user = user
+        self.text = text
+        self.role = role
+
+class RequestResolved(Event):
+    """点歌请求解析完成；item 为None表示未找到"""
+    __slots__ = ("user", "query", "item")
+
+    def __init__(self, user, query, item):
+        super().__init__()
+        self.user = user
+        self.query = query
+        self.item = item
+
+class Enqueued(Event):
+    """点歌请求成功入队"""
+    __slots__ = ("item",)
+
+    def __init__(self, item):
+        super().__init__()
+        self.item = item
+
+class TrackStarted(Event):
+    """开始播放（已启动MPV）"""
+    __slots__ = ("item",)
+
+    def __init__(self, item):
+        super().__init__()
+        self.item = item
+
+class TrackEnded(Event):
+    """播放结束；play 为 history.PlayEvent"""
+    __slots__ = ("play",)
+
+    def __init__(self, play):
+        super().__init__()
+        self.play = play
+
+# ---------- 总线 ----------
+
+DROP_OLDEST = "drop_oldest"   # 队列满时丢弃最早的事件（适合只关心最新状态的消费者，如GUI）
+DROP_NEWEST = "drop_newest"   # 队列满时丢弃新事件（保留已排队的事件顺序）
+UNBOUNDED = None              # maxsize 取此值时不限队列长度，用于日志、统计等不能丢事件的持久化消费者
+
+class Subscription:
+    """一个订阅者：有界（或不限长）队列 + 独立的消费任务"""
+
+    def __init__(self, name, event_types, handler, maxsize, policy):
+        self.name = name
+        self.event_types = tuple(event_types)
+        self.handler = handler
+        self.maxsize = None if maxsize is UNBOUNDED else max(1, maxsize)
+        self.policy = policy
+        self.is_async = asyncio.iscoroutinefunction(handler)
+        self._queue = deque()
+        self._wakeup = None     # asyncio.Event，消费任务启动时创建
+        self._task = None
+        self._busy = False      # 正在执行 handler
+        self.delivered = 0
+        self.dropped = 0
+        self.errors = 0
+        self._report_at = 1     # 下一次输出丢弃警告时的丢弃数
+
+    def offer(self, event):
+        """入队（不等待消费者）；队列满时按策略丢弃并记录"""
+        if self.maxsize is not None and len(self._queue) >= self.maxsize:
+            self.dropped += 1
+            # 丢弃数达到 1、10、100…… 时输出，避免突发时刷屏
+            if self.dropped >= self._report_at:
+                self._report_at *= 10
+                print(f"[{'SYS':>3}] 事件订阅者 {self.name} 队列已满，已丢弃 {self.dropped} 条事件")
+            if self.policy == DROP_NEWEST:
+                return
+            self._queue.popleft()
+        self._queue.append(event)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _consume(self):
+        while True:
+            if not self._queue:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            event = self._queue.popleft()
+            self._busy = True
+            try:
+                result = self.handler(event)
+                if self.is_async:
+                    await result
+                self.delivered += 1
+            except Exception as e:
+                self.errors += 1
+                print(f"[{'SYS':>3}] 事件订阅者 {self.name} 出错: {e!r}")
+            finally:
+                self._busy = False
+            # 连续处理多条事件时让出事件循环，避免占用请求处理
+            await asyncio.sleep(0)
+
+    def start(self):
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            if self._queue:
+                self._wakeup.set()
+            self._task = asyncio.get_running_loop().create_task(self._consume())
+
+    async def stop(self):
+        """处理完已排队的事件后停止"""
+        if self._task is None:
+            return
+        while (self._queue or self._busy) and not self._task.done():
+            await asyncio.sleep(0.01)
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+class EventBus:
+    """
+    进程内发布/订阅
+    发布方只把事件放入各订阅者的有界队列，不等待任何消费者；
+    每个订阅者由独立的任务按顺序消费，慢或出错的订阅者只影响自己
+    只在事件循环线程中发布（其他线程经 Runtime.call 转交）
+    """
+
+    def __init__(self):
+        self._subscriptions = []
+        self._routes = {}       # 事件类型 -> [Subscription]（按类型缓存的分发表）
+        self._running = False
+        self.published = 0
+
+    def subscribe(self, event_types, handler, maxsize=256, policy=DROP_NEWEST, name=None):
+        """
+        订阅一种或多种事件（含子类）；handler 可为普通函数或协程函数
+        maxsize=UNBOUNDED 时队列不限长，事件不会被丢弃
+        """
+        if isinstance(event_types, type):
+            event_types = (event_types,)
+        subscription = Subscription(name or getattr(handler, "__qualname__", repr(handler)),
+                                    event_types, handler, maxsize, policy)
+        self._subscriptions.append(subscription)
+        self._routes.clear()
+        if self._running:
+            subscription.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        self._subscriptions.remove(subscription)
+        self._routes.clear()
+        if subscription._task is not None:
+            subscription._task.cancel()
+            subscription._task = None
+
+    def publish(self, event):
+        """发布事件，O(订阅者数)，从不阻塞"""
+        self.published += 1
+        routes = self._routes.get(type(event))
+        if routes is None:
+            routes = self._routes[type(event)] = [
+                subscription for subscription in self._subscriptions
+                if isinstance(event, subscription.event_types)
+            ]
+        for subscription in routes:
+            subscription.offer(event)
+
+    def start(self):
+        """在事件循环中启动全部消费任务（之前发布的事件会在启动后处理）"""
+        self._running = True
+        for subscription in self._subscriptions:
+            subscription.start()
+
+    async def close(self):
+        """处理完已排队的事件后停止全部消费任务"""
+        self._running = False
+        for subscription in self._subscriptions:
+            await subscription.stop()
+
+    def drain(self):
+        """事件循环停止后同步处理剩余事件（退出前调用；协程订阅者的剩余事件被丢弃）"""
+        for subscription in self._subscriptions:
+            while subscription._queue:
+                event = subscription._queue.popleft()
+                if subscription.is_async:
+                    subscription.dropped += 1
+                    continue
+                try:
+                    subscription.handler(event)
+                    subscription.delivered += 1
+                except Exception as e:
+                    subscription.errors += 1
+                    print(f"[{'SYS':>3}] 事件订阅者 {subscription.name} 出错: {e!r}")
+
+    def stats(self):
+        """[(订阅者, 排队数, 容量, 已处理, 丢弃, 出错)]"""
+        return [(s.name, len(s._queue), s.maxsize, s.delivered, s.dropped, s.errors) for s in self._subscriptions]
+
+def _benchmark(count=200000):
+    """发布开销测试：3个订阅者（其中一个很慢）时发布方的耗时"""
+    async def run():
+        bus = EventBus()
+        received = []
+        bus.subscribe(Enqueued, received.append, maxsize=UNBOUNDED, name="fast")
+        bus.subscribe(Event, lambda event: None, maxsize=count, name="all")
+
+        async def slow(event):
+            await asyncio.sleep(0.01)
+        bus.subscribe(Enqueued, slow, maxsize=100, policy=DROP_OLDEST, name="slow")
+        bus.start()
+        start = time.perf_counter()
+        for i in range(count):
+            bus.publish(Enqueued(i))
+        elapsed = time.perf_counter() - start
+        await asyncio.sleep(0.5)
+        await bus.close()
+        print(f"{count} 条事件: 发布 {elapsed / count * 1e6:.2f} µs/条")
+        for name, queued, maxsize, delivered, dropped, errors in bus.stats():
+            print(f"  {name}: 已处理 {delivered}, 丢弃 {dropped}, 排队 {queued}/{maxsize or '不限'}")
+
+    asyncio.run(run())
+
+if __name__ == "__main__":
+    # python -m modules.event_bus
+    _benchmark()
@@ -0,0 +1,178 @@
+# modules/grant_store.py
+# 临时点歌授权存储模块
+
+import heapq
+import json
+import math
+import os
+import time
+
+from modules.persistence import persistence
+
+class GrantStore:
+    """
+    临时授权：全局限时授权、单用户限时授权与"每人N首"次数配额
+    单用户授权的到期时间存放在最小堆中，访问时惰性过期并定期压缩，内存只与有效授权数相关
+    次数配额随所属的 !grant -c 授权一起失效（撤销或被新授权替换），同一授权期间每人只能领取一次
+    """
+
+    def __init__(self, grants_file="data/grants.json"):
+        self.grants_file = grants_file
+        self.global_until = 0       # 全局限时授权截止时间
+        self.count_quota = 0        # 每人可领取的次数（由 !grant -c N 设置）
+        self._claims = {}           # 用户 -> 本次次数授权中的剩余次数
+        self._user_until = {}       # 用户 -> 单用户授权截止时间
+        self._deadlines = []        # 最小堆 (到期时间, 用户)
+        self.load()
+
+    def _push(self, expires_at, username):
+        heapq.heappush(self._deadlines, (expires_at, username))
+
+    def compact(self, now=None):
+        """弹出所有已到期的堆条目并删除对应授权"""
+        now = time.time() if now is None else now
+        changed = False
+        while self._deadlines and self._deadlines[0][0] <= now:
+            expires_at, username = heapq.heappop(self._deadlines)
+            # 堆中可能残留被覆盖的旧条目，只删除到期时间一致的授权
+            if self._user_until.get(username) == expires_at:
+                del self._user_until[username]
+                changed = True
+        # 旧条目过多时重建堆
+        if len(self._deadlines) > 2 * len(self._user_until) + 64:
+            self._rebuild_deadlines()
+        return changed
+
+    def _rebuild_deadlines(self):
+        """按当前授权重建到期时间堆"""
+        self._deadlines = [(until, user) for user, until in self._user_until.items()]
+        heapq.heapify(self._deadlines)
+
+    def grant_global(self, seconds):
+        """开放所有人点歌 seconds 秒（关闭次数模式）"""
+        self.global_until = time.time() + max(0, seconds)
+        self.count_quota = 0
+        self._claims.clear()
+        self.save()
+
+    def grant_count(self, count):
+        """开放每人 count 次点歌（关闭时间模式，所有人重新领取）"""
+        self.count_quota = count
+        self.global_until = 0
+        self._claims.clear()
+        self.save()
+
+    def grant_user(self, username, seconds):
+        """为单个用户开放 seconds 秒点歌权限"""
+        expires_at = time.time() + max(0, seconds)
+        self._user_until[username] = expires_at
+        self._push(expires_at, username)
+        self.save()
+
+    def revoke(self, grant_type):
+        """撤销授权: time / count / user / all"""
+        if grant_type in ("time", "all"):
+            self.global_until = 0
+        if grant_type in ("count", "all"):
+            self.count_quota = 0
+            self._claims.clear()
+        if grant_type in ("user", "all"):
+            self._user_until.clear()
+        self.compact()
+        self.save()
+
+    def revoke_user(self, username):
+        """撤销单个用户的限时授权"""
+        if self._user_until.pop(username, None) is None:
+            return False
+        self.save()
+        return True
+
+    def has_time_grant(self, username, now=None):
+        """全局或单用户限时授权是否有效"""
+        now = time.time() if now is None else now
+        if now < self.global_until:
+            return True
+        until = self._user_until.get(username)
+        if until is None:
+            return False
+        if until <= now:
+            del self._user_until[username]
+            return False
+        return True
+
+    def check(self, username):
+        """检查用户是否有临时授权；次数模式下首次检查时领取配额"""
+        now = time.time()
+        if self.compact(now):
+            self.save()
+        if self.has_time_grant(username, now):
+            return True
+        if self.count_quota <= 0:
+            return False
+        remaining = self._claims.get(username)
+        if remaining is None:
+            # 本次授权期间首次点歌时领取，用完后不再重新分配
+            remaining = self._claims[username] = self.count_quota
+            self.save()
+            print(f"为 {username} 分配 {self.count_quota} 次点歌权限")
+        return remaining > 0
+
+    def consume(self, username):
+        """扣减一次次数配额（限时授权有效时不扣减）"""
+        if self.has_time_grant(username):
+            return
+        if self._claims.get(username, 0) > 0:
+            self._claims[username] -= 1
+            self.save()
+
+    def remaining(self, username):
+        """用户剩余的次数配额"""
+        return self._claims.get(username, 0) if self.count_quota > 0 else 0
+
+    def __len__(self):
+        return len(self._claims) + len(self._user_until)
+
+    def _render(self):
+        # 永不过期（inf）写为 null，保持标准JSON
+        return json.dumps({
+            "global_until": _dump_time(self.global_until),
+            "count_quota": self.count_quota,
+            "claims": self._claims,
+            "users": {user: _dump_time(until) for user, until in self._user_until.items()}
+        }, ensure_ascii=False)
+
+    def save(self):
+        """保存授权状态（合并短时间内的多次修改）"""
+        if not self.grants_file:
+            return False
+        persistence.schedule(self.grants_file, self._render)
+        return True
+
+    def load(self):
+        """加载授权状态并丢弃已到期的授权"""
+        if not self.grants_file or not os.path.exists(self.grants_file):
+            return False
+        try:
+            with open(self.grants_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"[{'SYS':>3}] 加载授权状态失败: {e}")
+            return False
+        self.global_until = _load_time(data.get("global_until", 0))
+        self.count_quota = data.get("count_quota", 0)
+        # 旧格式的领取记录为 [剩余次数, 到期时间]，只取剩余次数
+        self._claims = {user: claim[0] if isinstance(claim, list) else claim
+                        for user, claim in data.get("claims", {}).items()} if self.count_quota > 0 else {}
+        self._user_until = {user: _load_time(until) for user, until in data.get("users", {}).items()}
+        # 重建到期时间堆，再删除停机期间已到期的授权
+        self._rebuild_deadlines()
+        if self.compact():
+            self.save()
+        return True
+
+def _dump_time(timestamp):
+    return None if math.isinf(timestamp) else timestamp
+
+def _load_time(value):
+    return math.inf if value is None else value
@@ -5,12 +5,17 @@ import tkinter as tk
 from tkinter import scrolledtext
 import threading
 import asyncio
+import concurrent.futures
+import queue
 import sys
 import os
+import time
+from collections import deque
 from datetime import datetime
 
 class LogWindow:
-    def __init__(self, config=None, title="Bilibili Live Music Player", geometry="600x400", alpha=1.0):
+    def __init__(self, config=None, title="Bilibili Live Music Player", geometry="600x400", alpha=1.0,
+                 max_lines=1000, flush_interval=50):
         if config is not None:
             self.config = config
         else:
@@ -18,14 +23,20 @@ class LogWindow:
         self.root = None
         self.text_area = None
         self.scroll_bar = None
-        self.log_queue = asyncio.Queue()
-        self.gui_thread = None
+        self.log_queue = queue.SimpleQueue()  # 多线程写入、GUI线程读取的日志通道
+        self.call_queue = queue.SimpleQueue()  # 其他线程转交给GUI线程执行的调用 (future, func, args)
         self.stop_event = threading.Event()
         self.title = title
         self.geometry = geometry
         self.alpha = alpha
         self.command_handler = None
         
+        # 批量渲染：GUI线程每 flush_interval 毫秒取出全部新日志，一次性插入
+        self.max_lines = max(1, max_lines)  # 文本框保留的最大行数
+        self.flush_interval = flush_interval
+        self._pending = deque(maxlen=self.max_lines)  # 仅由GUI线程访问
+        self.rendered_lines = 0
+        
         # GUI状态变量
         self.hide_state = 0  # 0为未隐藏，1为隐藏
         self.ignore_state = 0  # 0为不穿透，1为穿透
@@ -82,12 +93,9 @@ class LogWindow:
         # 不创建输入框和发送按钮，保持窗口简洁
 
     def on_closing(self):
-        """窗口关闭事件"""
+        """窗口关闭事件：结束主循环，由调用方执行退出清理（刷新日志、写入状态文件）"""
         self.stop_event.set()
-        if self.gui_thread:
-            self.gui_thread.join(timeout=1)
-        self.root.destroy()
-        os._exit(0)  # 强制退出程序
+        self.root.quit()
 
     def set_ignore(self, ignore):
         """设置窗口穿透状态"""
@@ -159,59 +167,119 @@ class LogWindow:
             print(f"[SYS] 设置边框状态失败: {e}")
 
     def add_log(self, message):
-        """添加日志到队列"""
-        # 如果队列满了，移除旧的日志
-        if self.log_queue.qsize() > 1000:  # 限制队列大小
+        """添加日志（任意线程均可调用，不阻塞）"""
+        self.log_queue.put(message)
+
+    def submit(self, func, *args):
+        """在GUI线程中执行 func（任意线程均可调用），返回 concurrent.futures.Future"""
+        future = concurrent.futures.Future()
+        if self.stop_event.is_set():
+            future.set_exception(RuntimeError("GUI已关闭"))
+            return future
+        self.call_queue.put((future, func, args))
+        return future
+
+    def _run_calls(self):
+        """执行其他线程转交的调用"""
+        try:
+            while True:
+                future, func, args = self.call_queue.get_nowait()
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    future.set_result(func(*args))
+                except Exception as e:
+                    # 失败交给等待方，避免 !gui 命令一直等待
+                    future.set_exception(e)
+        except queue.Empty:
+            pass
+
+    def _drain_log_queue(self):
+        """GUI线程定时任务：执行转交的调用，取出通道中的全部日志并批量渲染"""
+        if self.stop_event.is_set():
+            return
+        try:
+            self._run_calls()
             try:
-                self.log_queue.get_nowait()
-            except asyncio.QueueEmpty:
+                while True:
+                    # deque 自动丢弃超出上限的旧行
+                    self._pending.append(self.log_queue.get_nowait())
+            except queue.Empty:
                 pass
-        self.log_queue.put_nowait(message)
+            # 隐藏期间只保留待显示内容，显示时再渲染
+            if self._pending and not self.hide_state:
+                lines = list(self._pending)
+                self._pending.clear()
+                self._render(lines)
+        except Exception as e:
+            # 直接写到原始标准错误，避免经日志通道再次进入渲染
+            if sys.__stderr__ is not None:
+                sys.__stderr__.write(f"[SYS] 日志渲染出错: {e!r}\n")
+        finally:
+            # 无论本轮是否出错都继续定时刷新
+            self.root.after(self.flush_interval, self._drain_log_queue)
 
-    async def update_log_display(self):
-        """异步更新日志显示"""
-        while not self.stop_event.is_set():
-            try:
-                # 使用短超时时间，以便及时响应停止事件
-                message = await asyncio.wait_for(self.log_queue.get(), timeout=0.1)
-                timestamp = datetime.now().strftime('%H:%M:%S')
-                # formatted_message = f"[{timestamp}] {message}\n"
-                formatted_message = f"{message}\n"
-                
-                # 在GUI线程中更新文本区域
-                self.root.after(0, self._update_text_area, formatted_message)
-            except asyncio.TimeoutError:
-                continue  # 继续检查停止事件
+    def _render(self, lines):
+        """一次性插入多行，并裁剪超出上限的旧行"""
+        if not self.text_area:
+            return
+        self.text_area.configure(state='normal')
+        self.text_area.insert(tk.END, "\n".join(lines) + "\n")
+        # 末尾总有一个空行，因此实际行数为 index - 1
+        excess = int(self.text_area.index('end-1c').split('.')[0]) - 1 - self.max_lines
+        if excess > 0:
+            self.text_area.delete('1.0', f'{excess + 1}.0')
+        self.text_area.see(tk.END)  # 自动滚动到最新消息
+        self.text_area.configure(state='disabled')
+        self.rendered_lines += len(lines)
 
-    def _update_text_area(self, message):
-        """在GUI线程中更新文本区域"""
-        if self.text_area:
-            self.text_area.configure(state='normal')
-            self.text_area.insert(tk.END, message)
-            self.text_area.see(tk.END)  # 自动滚动到最新消息
-            self.text_area.configure(state='disabled')
+    def set_status(self, text=None):
+        """在窗口标题中显示状态（如正在播放），None 恢复原标题；须在GUI线程中调用"""
+        if self.root:
+            self.root.title(f"{self.title} | {text}" if text else self.title)
+
+    def set_hidden(self, hidden):
+        """隐藏/显示窗口；隐藏期间不渲染日志，显示后下一次刷新补上保留的内容"""
+        self.hide_state = 1 if hidden else 0
+        if hidden:
+            self.root.withdraw()
+        else:
+            self.root.deiconify()
+
+    def set_max_lines(self, max_lines):
+        """调整文本框保留的最大行数（下次刷新时生效）"""
+        self.max_lines = max(1, max_lines)
+        self._pending = deque(self._pending, maxlen=self.max_lines)
 
     def run(self):
         """运行GUI"""
         if not self.root:
             self.create_window()
         
-        # 启动异步日志更新任务
-        async def run_async_tasks():
-            await self.update_log_display()
-        
-        # 在独立线程中运行异步任务
-        def async_thread():
-            asyncio.run(run_async_tasks())
-        
-        self.gui_thread = threading.Thread(target=async_thread, daemon=True)
-        self.gui_thread.start()
+        # 日志由GUI线程自身定时取出，无需额外线程
+        self.root.after(self.flush_interval, self._drain_log_queue)
         
         # 启动GUI主循环
         try:
             self.root.mainloop()
         except KeyboardInterrupt:
-            self.on_closing()
+            self.stop_event.set()
+        finally:
+            self._close()
+
+    def _close(self):
+        """主循环结束后销毁窗口，并让尚未执行的转交调用失败，避免等待方挂起"""
+        try:
+            while True:
+                future, func, args = self.call_queue.get_nowait()
+                if future.set_running_or_notify_cancel():
+                    future.set_exception(RuntimeError("GUI已关闭"))
+        except queue.Empty:
+            pass
+        try:
+            self.root.destroy()
+        except tk.TclError:
+            pass
 
     def get_window_info(self):
         """获取窗口信息"""
@@ -240,25 +308,11 @@ class LogWindow:
             return info
         return None
 
-def setup_gui_logging(gui_log_instance):
-    """设置GUI日志记录系统"""
-    import sys
-    import io
+def setup_gui_logging(gui_log_instance, capacity=2000, log_file=None, max_bytes=5 * 1024 * 1024):
+    """设置GUI日志记录系统：stdout/stderr 重定向到固定容量的输出汇聚点，返回该汇聚点"""
+    from modules.log_sink import install_log_sink
     
-    class GUILogger(io.StringIO):
-        def __init__(self, gui_log):
-            super().__init__()
-            self.gui_log = gui_log
-
-        def write(self, s):
-            if s.strip():  # 只记录非空内容
-                self.gui_log.add_log(s.strip())
-            return super().write(s)
-
-    # 创建GUI记录器并重定向stdout
-    gui_logger = GUILogger(gui_log_instance)
-    sys.stdout = gui_logger
-    sys.stderr = gui_logger
+    return install_log_sink(gui_log_instance, capacity=capacity, log_file=log_file or None, max_bytes=max_bytes)
 
 # 保留原有的GUILog类作为备用实现
 class GUILog:
@@ -478,4 +532,37 @@ class GUILog:
                 "direct_status": self.direct_state
             }
             return info
-        return None
\ No newline at end of file
+        return None
+
+def _benchmark(total=100000, producers=4):
+    """GUI可持续渲染的行数/秒：多个线程并发写入，统计全部渲染完成的耗时（需要图形界面）"""
+    window = LogWindow(title="benchmark", max_lines=1000)
+    window.create_window()
+    per_thread = total // producers
+
+    def produce(index):
+        for i in range(per_thread):
+            window.add_log(f"[SYS] 线程{index} 第{i}行 " + "弹幕" * 10)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=produce, args=(i,), daemon=True) for i in range(producers)]
+    for thread in threads:
+        thread.start()
+
+    def check_done():
+        if any(thread.is_alive() for thread in threads) or not window.log_queue.empty() or window._pending:
+            window.root.after(10, check_done)
+            return
+        elapsed = time.perf_counter() - start
+        lines = int(window.text_area.index('end-1c').split('.')[0]) - 1
+        print(f"{per_thread * producers} 行: {elapsed:.2f}s, {per_thread * producers / elapsed:.0f} 行/秒, "
+              f"实际渲染 {window.rendered_lines} 行, 文本框保留 {lines} 行")
+        window.root.destroy()
+
+    window.root.after(window.flush_interval, window._drain_log_queue)
+    window.root.after(10, check_done)
+    window.root.mainloop()
+
+if __name__ == "__main__":
+    # python -m modules.gui
+    _benchmark()
@@ -0,0 +1,109 @@
+# modules/history.py
+# 播放历史模块
+
+import json
+import time
+
+from modules.queue_item import QueueItem
+from modules.log_writer import BufferedLogWriter
+
+class PlayEvent:
+    """一次播放记录"""
+    __slots__ = ("item", "requester", "started_at", "ended_at", "skipped")
+
+    def __init__(self, item, started_at, ended_at=None, skipped=False):
+        self.item = item
+        self.requester = item.requester
+        self.started_at = started_at
+        self.ended_at = ended_at
+        self.skipped = skipped
+
+    def to_json(self):
+        return {
+            "item": self.item.to_json(),
+            "start": self.started_at,
+            "end": self.ended_at,
+            "skip": self.skipped
+        }
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(QueueItem.from_json(data["item"]), data["start"], data.get("end"), data.get("skip", False))
+
+class HistoryManager:
+    """固定容量环形缓冲区实现的播放历史"""
+
+    def __init__(self, capacity=50, spill_file=None, analytics=None, song_index=None):
+        self.capacity = max(1, capacity)
+        self.analytics = analytics  # 可选：增量统计
+        self.song_index = song_index  # 可选：播放过的歌曲加入本地模糊索引
+        self.spill_file = spill_file  # 可选：长期统计用的落盘文件(JSONL)
+        self._spill_writer = BufferedLogWriter(spill_file) if spill_file else None
+        self._buffer = [None] * self.capacity
+        self._next = 0   # 下一个写入位置
+        self._count = 0
+        self._latest_by_key = {}  # 去重键 -> 该条目最近一次的播放记录
+
+    def record(self, event):
+        """追加一条播放记录，O(1)"""
+        evicted = self._buffer[self._next]
+        if evicted is not None and self._latest_by_key.get(evicted.item.key) is evicted:
+            del self._latest_by_key[evicted.item.key]
+
+        self._buffer[self._next] = event
+        self._latest_by_key[event.item.key] = event
+        self._next = (self._next + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+        if self._spill_writer:
+            self._spill_writer.write(json.dumps(event.to_json(), ensure_ascii=False) + "\n")
+        if self.analytics:
+            self.analytics.record_play(event)
+        if self.song_index is not None:
+            self.song_index.add_item(event.item)
+
+    def last(self, num=5):
+        """获取最近 num 条记录（按时间先后排列），O(num)"""
+        num = max(0, min(num, self._count))
+        return [self._buffer[(self._next - num + i) % self.capacity] for i in range(num)]
+
+    def pop_last(self):
+        """移除并返回最近一条记录"""
+        if not self._count:
+            return None
+        self._next = (self._next - 1) % self.capacity
+        event = self._buffer[self._next]
+        self._buffer[self._next] = None
+        self._count -= 1
+        key = event.item.key
+        if self._latest_by_key.get(key) is event:
+            # 缓冲区中仍有同一条目的较早记录时改为指向它，O(容量)
+            previous = next((older for older in reversed(self.last(self._count)) if older.item.key == key), None)
+            if previous is None:
+                del self._latest_by_key[key]
+            else:
+                self._latest_by_key[key] = previous
+        return event
+
+    def was_played_within(self, key, seconds, now=None):
+        """检查去重键对应的条目是否在最近 seconds 秒内播放过，O(1)"""
+        event = self._latest_by_key.get(key)
+        if event is None:
+            return False
+        now = time.time() if now is None else now
+        return now - (event.ended_at or event.started_at) <= seconds
+
+    def clear(self):
+        """清空播放历史"""
+        self._buffer = [None] * self.capacity
+        self._next = 0
+        self._count = 0
+        self._latest_by_key.clear()
+
+    def close(self):
+        """刷盘并关闭落盘写入器"""
+        if self._spill_writer:
+            self._spill_writer.close()
+
+    def __len__(self):
+        return self._count
@@ -2,14 +2,15 @@ import keyboard
 import json
 import os
 import time
-import threading
 import asyncio
 from pynput import mouse
 
 class HotkeyManager:
-    def __init__(self, player, queue_manager):
+    def __init__(self, player, queue_manager, history=None, runtime=None):
         self.player = player
         self.queue_manager = queue_manager
+        self.history = history
+        self.runtime = runtime  # 播放器与队列所在的事件循环（Runtime）
         self.config_path = "config/hotkeys.json"
         self.config = self.load_config()
         self.is_paused = False  # 播放暂停状态
@@ -38,101 +39,54 @@ class HotkeyManager:
             print("[KEY] 请修改配置文件后重新启动程序")
             return default_config
     
-    def skip_track(self):
+    async def skip_track(self):
         """跳过当前歌曲"""
         print("[KEY] 跳过当前歌曲")
         if self.player:
-            # 在新线程中运行异步函数
-            thread = threading.Thread(target=self._run_async_skip)
-            thread.daemon = True
-            thread.start()
-    
-    def _run_async_skip(self):
-        """在新线程中运行跳过操作"""
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            loop.run_until_complete(self.player.skip())
-        finally:
-            loop.close()
+            await self.player.skip()
     
     def prev_track(self):
         """切换上一首（从历史中恢复）"""
         print("[KEY] 切换上一首")
-        if self.queue_manager:
-            history = self.queue_manager.get_history(1)
-            if history:
-                # 获取历史中的第一首歌（最近播放的）
-                prev_song = history[0]
-                # 将当前播放的歌曲加入历史
-                current_playing = self.player.get_current_playing()
-                if current_playing:
-                    self.queue_manager.add_to_history(current_playing)
-                
+        if self.queue_manager and self.history is not None:
+            prev_event = self.history.pop_last()
+            if prev_event:
                 # 将上一首歌曲重新加入队列
-                self.queue_manager.song_queue.put_nowait(prev_song)
-                # 从历史中移除该歌曲
-                if self.queue_manager.history:
-                    self.queue_manager.history.pop()  # 移除最后一个元素
-                
-                print(f"[KEY] 已将 '{prev_song[1]}' 重新加入播放队列")
+                self.queue_manager.song_queue.put_nowait(prev_event.item)
+                print(f"[KEY] 已将 '{prev_event.item.name}' 重新加入播放队列")
             else:
                 print("[KEY] 没有历史记录可以退回")
     
-    def toggle_play_pause(self):
+    async def toggle_play_pause(self):
         """切换播放/暂停状态"""
         # print(f"[KEY] 切换播放/暂停状态 (当前状态: {'暂停' if self.is_paused else '播放'})")
         if self.player:
-            # 在新线程中运行异步函数
+            self.is_paused = not self.is_paused
             if self.is_paused:
-                thread = threading.Thread(target=self._run_async_resume)
-                thread.daemon = True
-                thread.start()
+                await self.player.pause()
+                print("[KEY] 暂停播放")
             else:
-                thread = threading.Thread(target=self._run_async_pause)
-                thread.daemon = True
-                thread.start()
-            self.is_paused = not self.is_paused
+                await self.player.resume()
+                print("[KEY] 恢复播放")
     
-    def _run_async_pause(self):
-        """在新线程中运行暂停操作"""
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            loop.run_until_complete(self.player.pause())
-            print("[KEY] 暂停播放")
-        finally:
-            loop.close()
-    
-    def _run_async_resume(self):
-        """在新线程中运行恢复操作"""
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            loop.run_until_complete(self.player.resume())
-            print("[KEY] 恢复播放")
-        finally:
-            loop.close()
-    
-    def adjust_volume(self, delta):
+    async def adjust_volume(self, delta):
         """调整音量"""
         if self.player:
             current_volume = self.player.get_volume()
             new_volume = max(0, min(100, current_volume + delta))
-            # 在新线程中运行异步函数
-            thread = threading.Thread(target=self._run_async_set_volume, args=(new_volume,))
-            thread.daemon = True
-            thread.start()
             print(f"[KEY] 音量调整: {current_volume} -> {new_volume}")
+            await self.player.set_volume_async(new_volume)
     
-    def _run_async_set_volume(self, volume):
-        """在新线程中运行设置音量操作"""
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            loop.run_until_complete(self.player.set_volume_async(volume))
-        finally:
-            loop.close()
+    def _bridge(self, func):
+        """快捷键回调在 keyboard 的钩子线程中触发，转交到运行时的事件循环执行"""
+        if self.runtime is not None:
+            return self.runtime.bridge(func)
+        # 独立测试模式：没有事件循环，直接在钩子线程中执行
+        def run(*args):
+            result = func(*args)
+            if asyncio.iscoroutine(result):
+                asyncio.run(result)
+        return run
     
     def setup_hotkeys(self):
         """设置快捷键"""
@@ -144,11 +98,11 @@ class HotkeyManager:
         volume_down_key = self.config.get("hotkey_volume_down", "alt+down")
         
         # 注册快捷键
-        keyboard.add_hotkey(skip_key, self.skip_track)
-        # keyboard.add_hotkey(prev_key, self.prev_track)
-        keyboard.add_hotkey(play_pause_key, self.toggle_play_pause)
-        keyboard.add_hotkey(volume_up_key, lambda: self.adjust_volume(5))
-        keyboard.add_hotkey(volume_down_key, lambda: self.adjust_volume(-5))
+        keyboard.add_hotkey(skip_key, self._bridge(self.skip_track))
+        # keyboard.add_hotkey(prev_key, self._bridge(self.prev_track))
+        keyboard.add_hotkey(play_pause_key, self._bridge(self.toggle_play_pause))
+        keyboard.add_hotkey(volume_up_key, self._bridge(self.adjust_volume), args=(5,))
+        keyboard.add_hotkey(volume_down_key, self._bridge(self.adjust_volume), args=(-5,))
         
         print(f"[KEY] 已注册快捷键:")
         print(f"  - {skip_key}: 跳过当前歌曲")
@@ -0,0 +1,73 @@
+# modules/http_client.py
+# 共享HTTP连接池与结果缓存模块
+
+import asyncio
+import time
+from collections import OrderedDict
+
+import aiohttp
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+_sessions = {}  # 事件循环 -> ClientSession
+
+def get_session():
+    """当前事件循环共享的 ClientSession（弹幕轮询与备线解析复用同一连接池）"""
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(loop)
+    if session is None or session.closed:
+        session = _sessions[loop] = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=32, ttl_dns_cache=300),
+            headers={'User-Agent': USER_AGENT}
+        )
+    return session
+
+async def close_session():
+    """关闭当前事件循环的共享会话"""
+    session = _sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None and not session.closed:
+        await session.close()
+
+async def fetch_text(url, timeout=8, session=None):
+    """GET 并返回文本；非200状态返回None"""
+    session = session or get_session()
+    async with session.get(url, timeout=aiohttp.ClientTimeout(total=timeout)) as resp:
+        if resp.status != 200:
+            return None
+        return await resp.text(errors="replace")
+
+class TTLCache:
+    """
+    容量有限的LRU缓存，条目写入 ttl 秒后失效
+    只在事件循环线程中使用，不加锁
+    """
+
+    def __init__(self, maxsize=256, ttl=600):
+        self.maxsize = max(1, maxsize)
+        self.ttl = ttl
+        self._data = OrderedDict()  # 键 -> (过期时间, 值)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        entry = self._data.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key, value):
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
@@ -1,14 +1,16 @@
 # modules/listener.py
 # B站直播间监听模块
 
-import aiohttp
 from datetime import datetime
 import asyncio
 import html
 
+from modules.http_client import close_session, get_session
+
 class BilibiliListener:
-    def __init__(self, room_id, callback, poll_interval=5):
+    def __init__(self, room_id, callback, poll_interval=5, on_first_poll=None):
         self.room_id = room_id
+        self.on_first_poll = on_first_poll  # 可选：首次轮询完成后调用一次（用于统计启动耗时）
         self.api_url = 'http://api.live.bilibili.com/ajax/msg'
         self.interval = poll_interval
         self.callback = callback
@@ -20,10 +22,17 @@ class BilibiliListener:
         """开始监听B站直播间"""
         self.isRunning = True
         print(f"[{'SYS':>3}] 监听直播间: {self.room_id}")
-        async with aiohttp.ClientSession() as session:
+        # 与同一事件循环中的其他请求（如备线解析）共用连接池
+        session = get_session()
+        try:
             while self.isRunning:
                 await self.fetch_barrage(session)
+                if self.on_first_poll:
+                    callback, self.on_first_poll = self.on_first_poll, None
+                    callback()
                 await asyncio.sleep(self.interval)
+        finally:
+            await close_session()
     
     async def fetch_barrage(self, session):
         """获取直播间弹幕"""
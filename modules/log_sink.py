@@ -0,0 +1,141 @@
+# modules/log_sink.py
+# 控制台输出汇聚模块
+
+import sys
+import threading
+import time
+from datetime import datetime
+
+from modules.log_writer import BufferedLogWriter
+
+class LogSink:
+    """
+    替代 sys.stdout/sys.stderr 的输出汇聚点
+    按行切分后写入固定容量的环形缓冲区，并分发到GUI、轮转日志文件与原始控制台
+    无论运行多久，内存占用只与行数上限相关
+    """
+
+    def __init__(self, capacity=2000, gui=None, console=None, log_file=None,
+                 max_bytes=5 * 1024 * 1024, backup_count=3):
+        self.capacity = max(1, capacity)
+        self.gui = gui              # 可选：提供 add_log(line) 的GUI窗口
+        self.console = console      # 可选：原始控制台流
+        self._writer = BufferedLogWriter(log_file, max_bytes=max_bytes, backup_count=backup_count,
+                                         fsync="never") if log_file else None
+        self._lock = threading.Lock()
+        self._lines = [None] * self.capacity
+        self._next = 0
+        self._count = 0
+        self._partial = ""          # 尚未遇到换行符的输出
+        self.total_lines = 0
+        self.started_at = time.time()
+
+    # ---------- 文件对象接口 ----------
+
+    def write(self, s):
+        if not s:
+            return 0
+        if self.console is not None:
+            try:
+                self.console.write(s)
+            except Exception:
+                pass
+        with self._lock:
+            text = self._partial + s
+            lines = text.split("\n")
+            self._partial = lines.pop()
+            for line in lines:
+                self._append(line)
+        return len(s)
+
+    def flush(self):
+        if self.console is not None:
+            try:
+                self.console.flush()
+            except Exception:
+                pass
+
+    def isatty(self):
+        return False
+
+    @property
+    def encoding(self):
+        return getattr(self.console, "encoding", None) or "utf-8"
+
+    # ---------- 分发与缓冲 ----------
+
+    def _append(self, line):
+        line = line.rstrip("\r")
+        self._lines[self._next] = line
+        self._next = (self._next + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+        self.total_lines += 1
+        if self._writer is not None:
+            try:
+                self._writer.write(f"[{datetime.now().strftime('%m-%d %H:%M:%S')}] {line}\n")
+            except ValueError:
+                # 写入器已关闭
+                self._writer = None
+        if self.gui is not None and line.strip():
+            self.gui.add_log(line.strip())
+
+    def tail(self, num=20):
+        """最近 num 行（按时间先后排列）"""
+        with self._lock:
+            num = max(0, min(num, self._count))
+            return [self._lines[(self._next - num + i) % self.capacity] for i in range(num)]
+
+    def resize(self, capacity):
+        """调整行数上限，保留最近的内容"""
+        capacity = max(1, capacity)
+        with self._lock:
+            num = min(self._count, capacity)
+            recent = [self._lines[(self._next - num + i) % self.capacity] for i in range(num)]
+            self.capacity = capacity
+            self._lines = recent + [None] * (capacity - num)
+            self._next = num % capacity
+            self._count = num
+
+    def memory_usage(self):
+        """缓冲区占用的字节数（行对象 + 槽位数组）"""
+        with self._lock:
+            size = sys.getsizeof(self._lines) + sys.getsizeof(self._partial)
+            return size + sum(sys.getsizeof(line) for line in self._lines if line is not None)
+
+    def stats(self):
+        """(缓冲行数, 行数上限, 累计行数, 占用字节)"""
+        return self._count, self.capacity, self.total_lines, self.memory_usage()
+
+    def close(self):
+        """写出未结束的行并关闭日志文件"""
+        with self._lock:
+            if self._partial:
+                self._append(self._partial)
+                self._partial = ""
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            writer.close()
+
+def install_log_sink(gui=None, **options):
+    """创建输出汇聚点并接管 stdout/stderr，返回该汇聚点"""
+    sink = LogSink(gui=gui, console=sys.__stdout__, **options)  # 无控制台（pythonw）时 console 为None
+    sys.stdout = sink
+    sys.stderr = sink
+    return sink
+
+def _benchmark(lines=500000, capacity=2000):
+    """长时间运行模拟：写入大量行后内存占用应保持不变"""
+    sink = LogSink(capacity=capacity)
+    start = time.perf_counter()
+    for i in range(lines):
+        sink.write(f"[SYS] 入队成功: 测试歌曲 {i} (点歌者: user{i % 100})")
+        sink.write("\n")
+        if i == capacity:
+            baseline = sink.memory_usage()
+    elapsed = time.perf_counter() - start
+    print(f"{lines} 行: {elapsed / lines * 1e6:.2f} µs/行, 缓冲 {sink.memory_usage() / 1024:.0f} KiB "
+          f"(写满时 {baseline / 1024:.0f} KiB)")
+
+if __name__ == "__main__":
+    # python -m modules.log_sink
+    _benchmark()
@@ -0,0 +1,128 @@
+# modules/log_writer.py
+# 缓冲式后台日志写入模块
+
+import gzip
+import os
+import shutil
+import threading
+
+class BufferedLogWriter:
+    """
+    后台线程批量写入的追加日志
+    write() 只写入内存缓冲区，由后台线程按大小或时间刷盘，并支持按大小轮转与gzip压缩
+    """
+
+    FSYNC_POLICIES = ("never", "flush", "close")
+
+    def __init__(self, path, flush_bytes=64 * 1024, flush_interval=1.0, fsync="flush",
+                 max_bytes=10 * 1024 * 1024, backup_count=5):
+        if fsync not in self.FSYNC_POLICIES:
+            raise ValueError(f"fsync 策略必须是 {self.FSYNC_POLICIES} 之一")
+        self.path = path
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.fsync = fsync          # never: 交给系统; flush: 每次刷盘后fsync; close: 仅关闭时fsync
+        self.max_bytes = max_bytes  # 0 表示不轮转
+        self.backup_count = backup_count
+
+        self._buffer = []
+        self._buffer_size = 0
+        self._cond = threading.Condition()
+        self._io_lock = threading.Lock()
+        self._closed = False
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name=f"log-writer:{os.path.basename(path)}", daemon=True)
+        self._thread.start()
+
+    def write(self, text):
+        """写入缓冲区（线程安全，不阻塞磁盘IO）"""
+        with self._cond:
+            if self._closed:
+                raise ValueError("日志写入器已关闭")
+            self._buffer.append(text)
+            self._buffer_size += len(text)
+            if self._buffer_size >= self.flush_bytes:
+                self._cond.notify()
+
+    def _run(self):
+        """后台刷盘循环"""
+        while True:
+            with self._cond:
+                if not self._closed and self._buffer_size < self.flush_bytes:
+                    self._cond.wait(self.flush_interval)
+                closed = self._closed
+            if closed:
+                break
+            self._drain()
+
+    def _drain(self, final=False):
+        """将缓冲内容写入文件；取缓冲与写入在同一把锁内，保证顺序"""
+        with self._io_lock:
+            with self._cond:
+                chunks = self._buffer
+                self._buffer = []
+                self._buffer_size = 0
+            fsync = self.fsync == "flush" or (final and self.fsync == "close")
+            if not chunks and not final:
+                return
+            try:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write("".join(chunks))
+                    if fsync:
+                        f.flush()
+                        os.fsync(f.fileno())
+                    size = f.tell()
+                if self.max_bytes and size >= self.max_bytes:
+                    self._rotate()
+            except Exception as e:
+                print(f"[{'SYS':>3}] 写入日志失败({self.path}): {e}")
+
+    def segment_paths(self):
+        """按时间先后返回所有日志分段（已轮转的gzip分段 + 当前文件）"""
+        paths = [f"{self.path}.{i}.gz" for i in range(self.backup_count, 0, -1)]
+        return [p for p in paths if os.path.exists(p)] + [self.path]
+
+    def _rotate(self):
+        """轮转当前日志：path -> path.1.gz，旧分段依次后移"""
+        if self.backup_count <= 0:
+            open(self.path, 'w').close()
+            return
+        oldest = f"{self.path}.{self.backup_count}.gz"
+        if os.path.exists(oldest):
+            os.remove(oldest)
+        for i in range(self.backup_count - 1, 0, -1):
+            src = f"{self.path}.{i}.gz"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}.gz")
+        rotated = self.path + ".1"
+        os.replace(self.path, rotated)
+        with open(rotated, 'rb') as src, gzip.open(rotated + ".gz", 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(rotated)
+        # 立即创建新的空分段，保证当前文件始终存在
+        open(self.path, 'a').close()
+
+    def clear(self):
+        """丢弃缓冲区，删除已轮转的分段并清空当前文件"""
+        with self._io_lock:
+            with self._cond:
+                self._buffer = []
+                self._buffer_size = 0
+            for path in self.segment_paths()[:-1]:
+                os.remove(path)
+            open(self.path, 'w').close()
+
+    def flush(self):
+        """立即将缓冲区写入磁盘（同步）"""
+        self._drain()
+
+    def close(self):
+        """刷盘并停止后台线程"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+        self._drain(final=True)
@@ -2,108 +2,189 @@
 # 日志记录系统模块
 
 import os
+import gzip
 import json
+import time
+from collections import deque
 from datetime import datetime
 
+from modules.queue_item import QueueItem, QueueItemKind
+from modules.log_writer import BufferedLogWriter
+from modules.tail import tail_lines
+
 class Logger:
-    def __init__(self, log_file="data/requests.log"):
-        self.log_file = log_file
+    """结构化点歌日志（JSONL），并在内存中维护按用户/按歌曲的索引"""
+
+    RECENT_PER_USER = 20  # 每个用户在内存中保留的最近记录数
+
+    def __init__(self, log_file="data/requests.log", flush_interval=1.0, fsync="flush",
+                 max_bytes=10 * 1024 * 1024, backup_count=5, analytics=None, consumers=()):
+        self.log_file = log_file  # 旧版文本日志路径
+        self.analytics = analytics  # 可选：增量统计
+        self.record_file = os.path.splitext(log_file)[0] + ".jsonl"
+        self._user_counts = {}   # 用户 -> 点歌总数
+        self._user_recent = {}   # 用户 -> 最近记录文本
+        self._song_counts = {}   # 歌曲键 -> 被点次数
         self.ensure_log_directory()
-    
+        self.writer = BufferedLogWriter(
+            self.record_file,
+            flush_interval=flush_interval,
+            fsync=fsync,
+            max_bytes=max_bytes,
+            backup_count=backup_count
+        )
+        if not os.path.exists(self.record_file) and os.path.exists(self.log_file):
+            imported = self.import_legacy_log(self.log_file)
+            self.writer.flush()
+            print(f"[{'SYS':>3}] 已导入旧版点歌日志 {imported} 条: {self.log_file}")
+        # 启动时只扫描一遍日志：同时交给其他需要历史记录的模块（歌曲索引、统计）
+        self.rebuild_index(consumers)
+
     def ensure_log_directory(self):
         """确保日志文件目录存在"""
-        os.makedirs(os.path.dirname(self.log_file), exist_ok=True)
-    
-    def log_request(self, username, song_name, artist):
-        """记录点歌请求"""
-        timestamp = datetime.now().strftime('%Y:%m:%d][%H:%M:%S')
-        log_entry = f"[{timestamp}] [{username}]： {song_name} - {artist}\n"
-        with open(self.log_file, 'a', encoding='utf-8') as f:
-            f.write(log_entry)
-    
-    def log_video_request(self, username, video_id):
-        """记录视频请求"""
-        timestamp = datetime.now().strftime('%Y:%m:%d][%H:%M:%S')
-        log_entry = f"[{timestamp}] [{username}]： 视频 - {video_id}\n"
-        with open(self.log_file, 'a', encoding='utf-8') as f:
-            f.write(log_entry)
-    
-    def get_user_requests(self, username, limit=5):
-        """获取指定用户的历史请求"""
-        records = []
-        try:
-            with open(self.log_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    if f"[{username}]：" in line:
+        os.makedirs(os.path.dirname(self.record_file) or ".", exist_ok=True)
+
+    @staticmethod
+    def song_key(item):
+        """按歌曲统计用的键；旧日志导入的条目没有ID，按歌名归并"""
+        if item.item_id is None:
+            return f"name:{item.name}-{item.artist}"
+        return item.key
+
+    @staticmethod
+    def format_record(record):
+        """将结构化记录格式化为旧版文本日志的形式"""
+        timestamp = datetime.fromtimestamp(record["ts"]).strftime('%Y:%m:%d][%H:%M:%S')
+        return f"[{timestamp}] [{record['user']}]： {Logger.record_text(record)}"
+
+    @staticmethod
+    def record_text(record, item=None):
+        """记录对应的歌曲/视频描述"""
+        item = QueueItem.from_json(record["item"]) if item is None else item
+        if item.is_video:
+            return f"视频 - {item.item_id}"
+        return f"{item.name} - {item.artist}"
+
+    def _index(self, record, item=None):
+        """将一条记录加入内存索引"""
+        item = QueueItem.from_json(record["item"]) if item is None else item
+        user = record["user"]
+        self._user_counts[user] = self._user_counts.get(user, 0) + 1
+        recent = self._user_recent.get(user)
+        if recent is None:
+            recent = self._user_recent[user] = deque(maxlen=self.RECENT_PER_USER)
+        recent.append(self.record_text(record, item))
+        key = self.song_key(item)
+        self._song_counts[key] = self._song_counts.get(key, 0) + 1
+
+    def iter_records(self):
+        """按时间顺序遍历所有结构化记录（含已轮转的分段）"""
+        for path in self.writer.segment_paths():
+            opener = gzip.open if path.endswith(".gz") else open
+            try:
+                with opener(path, 'rt', encoding='utf-8') as f:
+                    for line in f:
                         try:
-                            song_info = line.split(']： ', 1)[1].strip()
-                            records.append(song_info)
-                        except:
+                            yield json.loads(line)
+                        except ValueError:
                             continue
-            return records[-limit:] if records else []
-        except Exception as e:
-            print(f"查询用户请求失败: {e}")
+            except FileNotFoundError:
+                continue
+
+    def rebuild_index(self, consumers=()):
+        """从日志文件重建内存索引；consumers 为同一遍扫描中额外接收 (记录, 条目) 的回调"""
+        self._user_counts.clear()
+        self._user_recent.clear()
+        self._song_counts.clear()
+        for record in self.iter_records():
+            item = QueueItem.from_json(record["item"])
+            self._index(record, item)
+            for consumer in consumers:
+                consumer(record, item)
+
+    def _append(self, records):
+        """追加结构化记录并更新索引（磁盘写入由后台线程完成）"""
+        self.writer.write("".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records))
+        for record in records:
+            self._index(record)
+
+    def log_request(self, username, item):
+        """记录点歌/视频请求"""
+        ts = time.time()
+        self._append([{"ts": ts, "user": username, "item": item.to_json()}])
+        if self.analytics:
+            self.analytics.record_request(username, item, ts)
+
+    def import_legacy_log(self, legacy_file):
+        """导入旧版文本日志 [Y:m:d][H:M:S] [用户]： 歌名 - 歌手"""
+        records = []
+        with open(legacy_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    head, text = line.rstrip("\n").split(']： ', 1)
+                    timestamp, user = head.split('] [', 1)
+                    ts = datetime.strptime(timestamp.lstrip('['), '%Y:%m:%d][%H:%M:%S').timestamp()
+                except ValueError:
+                    continue
+                if text.startswith("视频 - "):
+                    item = QueueItem.video(text[len("视频 - "):])
+                else:
+                    name, _, artist = text.rpartition(' - ')
+                    item = QueueItem(QueueItemKind.NETEASE, None, name or artist, artist if name else "")
+                records.append({"ts": ts, "user": user, "item": item.to_json()})
+        self._append(records)
+        return len(records)
+
+    def get_user_requests(self, username, limit=5):
+        """获取指定用户的历史请求，O(limit)"""
+        recent = self._user_recent.get(username)
+        if not recent:
             return []
-    
+        return list(recent)[-limit:]
+
     def get_total_user_requests(self, username):
-        """获取指定用户的总请求数"""
-        count = 0
-        try:
-            with open(self.log_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    if f"[{username}]：" in line:
-                        count += 1
-            return count
-        except Exception as e:
-            print(f"查询用户请求数失败: {e}")
-            return 0
-    
+        """获取指定用户的总请求数，O(1)"""
+        return self._user_counts.get(username, 0)
+
+    def get_song_request_count(self, item):
+        """获取歌曲被点次数，O(1)"""
+        return self._song_counts.get(self.song_key(item), 0)
+
     def get_recent_requests(self, limit=10):
-        """获取最近的请求记录"""
+        """获取最近的请求记录（当前分段不足时从最近的已轮转分段补足）"""
         try:
-            with open(self.log_file, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-                return lines[-limit:] if lines else []
+            self.writer.flush()
+            lines = tail_lines(self.record_file, limit)
+            # 已轮转的gzip分段无法反向读取，只在刚轮转后才需要顺序读一遍
+            for path in reversed(self.writer.segment_paths()[:-1]):
+                if len(lines) >= limit:
+                    break
+                with gzip.open(path, 'rt', encoding='utf-8') as f:
+                    lines = list(deque(f, maxlen=limit - len(lines))) + lines
+            return [self.format_record(json.loads(line)) for line in lines]
         except Exception as e:
             print(f"获取最近请求失败: {e}")
             return []
-    
+
     def clear_log(self):
-        """清空日志文件"""
+        """清空日志（含已轮转的分段）、内存索引与点歌统计"""
         try:
-            with open(self.log_file, 'w', encoding='utf-8') as f:
-                f.write('')
+            self.writer.clear()
+            self.rebuild_index()
+            if self.analytics:
+                self.analytics.clear_requests()
             return True
         except Exception as e:
             print(f"清空日志失败: {e}")
             return False
-    
+
+    def close(self):
+        """刷盘并关闭日志写入器"""
+        self.writer.close()
+
     def get_log_size(self):
         """获取日志文件大小"""
         try:
-            return os.path.getsize(self.log_file)
+            return os.path.getsize(self.record_file)
         except:
             return 0
-
-class HistoryManager:
-    def __init__(self, max_history=50):
-        self.max_history = max_history
-        self.play_history = []  # [(sid, name, artist, timestamp), ...]
-    
-    def add_to_history(self, sid, name, artist):
-        """添加播放记录到历史"""
-        self.play_history.append((sid, name, artist, datetime.now().isoformat()))
-        if len(self.play_history) > self.max_history:
-            self.play_history.pop(0)  # FIFO
-    
-    def get_history(self, num=5):
-        """获取播放历史"""
-        return self.play_history[-num:] if self.play_history else []
-    
-    def clear_history(self):
-        """清空播放历史"""
-        self.play_history.clear()
-    
-    def get_history_count(self):
-        """获取历史记录总数"""
-        return len(self.play_history)
\ No newline at end of file
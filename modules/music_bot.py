@@ -3,17 +3,37 @@
 
 import pyncm
 from pyncm.apis import cloudsearch, track, playlist
-import qrcode
 import os
 import time
 import sys
+import threading
 from datetime import datetime
 
 class MusicBot:
-    def __init__(self, session_file="data/session.ncm", fallback_playlist_id=9162892605):
+    def __init__(self, session_file="data/session.ncm", fallback_playlist_id=9162892605, song_index=None,
+                 background_login=False):
         self.session_file = session_file
         self.fallback_playlist_id = fallback_playlist_id
-        self.login_netease()
+        self.song_index = song_index  # 可选：本地模糊索引，命中时跳过网络搜索
+        self.ready = threading.Event()  # 登录流程结束后置位
+        if background_login:
+            # 登录与监听器等其他模块的启动并行进行
+            threading.Thread(target=self._login_worker, name="netease-login", daemon=True).start()
+        else:
+            self.login_netease()
+            self.ready.set()
+    
+    def _login_worker(self):
+        try:
+            self.login_netease()
+        except SystemExit:
+            # 与前台登录失败时一致：结束整个程序
+            os._exit(1)
+        self.ready.set()
+    
+    def wait_ready(self, timeout=None):
+        """等待登录完成（需要登录态的接口调用前使用）"""
+        return self.ready.wait(timeout)
     
     def login_netease(self):
         """登录网易云音乐"""
@@ -38,6 +58,7 @@ class MusicBot:
         try:
             # 确保data目录存在
             os.makedirs(os.path.dirname(self.session_file), exist_ok=True)
+            import qrcode  # 仅扫码登录时需要
             uuid = pyncm.apis.login.LoginQrcodeUnikey()['unikey']
             login_url = f"https://music.163.com/login?codekey={uuid}"
             qr = qrcode.QRCode(border=1)
@@ -70,23 +91,76 @@ class MusicBot:
     
     def get_song_info(self, keyword_or_id):
         """获取歌曲信息"""
+        if self.song_index is not None and not keyword_or_id.isdigit():
+            hit = self.song_index.lookup(keyword_or_id)
+            if hit:
+                print(f"[{'SYS':>3}] 本地索引命中: {keyword_or_id} -> {hit[1]} - {hit[2]}")
+                return hit
         try:
             if keyword_or_id.isdigit():
                 res = track.GetTrackDetail(song_ids=[int(keyword_or_id)])
                 if res.get('songs'):
                     s = res['songs'][0]
+                    if self.song_index is not None:
+                        self.song_index.add(s['id'], s['name'], s['ar'][0]['name'])
                     return s['id'], s['name'], s['ar'][0]['name']
             else:
                 res = cloudsearch.GetSearchResult(keyword_or_id, limit=1)
                 if res.get('result') and res['result'].get('songs'):
                     s = res['result']['songs'][0]
+                    if self.song_index is not None:
+                        # 记住本次关键词，下次相同请求直接命中
+                        self.song_index.add(s['id'], s['name'], s['ar'][0]['name'], aliases=(keyword_or_id,))
                     return s['id'], s['name'], s['ar'][0]['name']
         except Exception as e:
             print(f"[{'SYS':>3}] 搜索失败: {e}")
         return None, None, None
     
+    def get_songs_info(self, song_ids, batch_size=500):
+        """批量获取歌曲信息，返回 {id: (id, 歌名, 歌手)}；每批只发一次 GetTrackDetail 请求"""
+        found = {}
+        song_ids = [int(sid) for sid in song_ids]
+        for start in range(0, len(song_ids), batch_size):
+            try:
+                res = track.GetTrackDetail(song_ids=song_ids[start:start + batch_size])
+                for s in res.get('songs') or []:
+                    found[s['id']] = (s['id'], s['name'], s['ar'][0]['name'])
+            except Exception as e:
+                print(f"[{'SYS':>3}] 批量获取歌曲信息失败: {e}")
+        return found
+    
+    def get_playlist_track_ids(self, playlist_id):
+        """获取歌单中的全部歌曲ID"""
+        try:
+            res = playlist.GetPlaylistInfo(playlist_id)
+            if res and res.get('code') == 200:
+                return [t['id'] for t in res['playlist']['trackIds']]
+            print(f"[{'SYS':>3}] 获取歌单失败 Code: {res.get('code', 'Unknown') if res else 'Unknown'}")
+        except Exception as e:
+            print(f"[{'SYS':>3}] 获取歌单出错: {e}")
+        return []
+    
+    def build_song_index(self, aliases=None):
+        """
+        用随机歌单的全部歌曲填充本地索引（耗时较长，应在后台线程调用）
+        aliases: {别名: 歌曲ID}，如词典映射中指向歌曲ID的条目
+        """
+        if self.song_index is None:
+            return 0
+        self.wait_ready()
+        aliases = aliases or {}
+        by_id = {}
+        for alias, sid in aliases.items():
+            by_id.setdefault(sid, []).append(alias)
+        track_ids = self.get_playlist_track_ids(self.fallback_playlist_id)
+        details = self.get_songs_info(list(dict.fromkeys(track_ids + list(by_id))))
+        for sid, name, artist in details.values():
+            self.song_index.add(sid, name, artist, aliases=by_id.get(sid, ()))
+        return len(details)
+    
     def get_song_url(self, song_id):
         """获取歌曲播放链接"""
+        self.wait_ready()
         try:
             res = track.GetTrackAudio(song_ids=[song_id], bitrate=320000)
             if res.get('data') and res['data'][0]['url']:
@@ -99,6 +173,7 @@ class MusicBot:
     
     def get_random_fallback_song(self):
         """获取随机播放歌单中的歌曲"""
+        self.wait_ready()
         try:
             print(f"[{'SYS':>3}] 获取歌单 {self.fallback_playlist_id} ...")
             res = playlist.GetPlaylistInfo(self.fallback_playlist_id)
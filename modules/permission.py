@@ -3,12 +3,91 @@
 
 import json
 import os
+import re
+import time
 import hashlib
+from collections import OrderedDict
 from datetime import datetime
-from watchdog.events import FileSystemEventHandler
+
+from modules.config_loader import FileReloadHandler
+from modules.grant_store import GrantStore
+from modules.persistence import persistence
+
+ADMIN_KEY_LENGTH = 10  # 管理员密钥长度（SHA-256十六进制前10位）
+_NON_ALPHANUMERIC = re.compile(r'[^a-zA-Z0-9]')
+_KEY_MISMATCH = (False, "密钥不匹配")
+
+class TokenBucketLimiter:
+    """
+    按键（用户）划分的令牌桶，惰性补充令牌
+    补满的桶通过时间轮过期删除，内存只与活跃用户数相关
+    容量或补充间隔不大于0时不限制
+    """
+
+    def __init__(self, capacity, refill_interval, wheel_slots=64):
+        self.enabled = capacity > 0 and refill_interval > 0
+        self.capacity = max(1, capacity)        # 至少能放行一次，不足1的容量按1处理
+        self.refill_interval = refill_interval if self.enabled else 1  # 每补充一个令牌所需秒数
+        self._buckets = {}  # 键 -> [剩余令牌, 上次补充时间, 补满时间]
+        self._wheel = [set() for _ in range(wheel_slots)]
+        # 时间轮总跨度需覆盖从空桶到补满的最长时间
+        self._slot_seconds = max(1.0, capacity * refill_interval / (wheel_slots - 2))
+        self._tick = int(time.time() // self._slot_seconds)
+
+    def _advance(self, now):
+        """推进时间轮，删除已补满的桶"""
+        current = int(now // self._slot_seconds)
+        steps = min(current - self._tick, len(self._wheel))
+        for offset in range(1, steps + 1):
+            slot = self._wheel[(self._tick + offset) % len(self._wheel)]
+            for key in slot:
+                bucket = self._buckets.get(key)
+                if bucket is not None and bucket[2] <= now:
+                    del self._buckets[key]
+            slot.clear()
+        self._tick = max(self._tick, current)
+
+    def allow(self, key, now=None):
+        """尝试消耗一个令牌"""
+        if not self.enabled:
+            return True
+        now = time.time() if now is None else now
+        self._advance(now)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            tokens = self.capacity
+        else:
+            tokens = min(self.capacity, bucket[0] + (now - bucket[1]) / self.refill_interval)
+        if tokens < 1:
+            bucket[0], bucket[1] = tokens, now
+            return False
+        tokens -= 1
+        full_at = now + (self.capacity - tokens) * self.refill_interval
+        self._buckets[key] = [tokens, now, full_at]
+        # 放入补满时刻之后的格子，该格被处理时桶一定已补满
+        self._wheel[(int(full_at // self._slot_seconds) + 1) % len(self._wheel)].add(key)
+        return True
+
+    def refund(self, key, now=None):
+        """退还一个令牌（已放行的请求最终未被处理时调用），不超过容量"""
+        if not self.enabled:
+            return
+        now = time.time() if now is None else now
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            return  # 桶已补满并被删除
+        tokens = min(self.capacity, bucket[0] + (now - bucket[1]) / self.refill_interval + 1)
+        full_at = now + (self.capacity - tokens) * self.refill_interval
+        self._buckets[key] = [tokens, now, full_at]
+        # 补满时刻提前，放入新的格子；原格子处理时桶已补满，同样会被删除
+        self._wheel[(int(full_at // self._slot_seconds) + 1) % len(self._wheel)].add(key)
+
+    def __len__(self):
+        return len(self._buckets)
 
 class PermissionManager:
-    def __init__(self, config, whitelist_file="config/whitelist.json", fused_keys_file="data/fused_keys.json"):
+    def __init__(self, config, whitelist_file="config/whitelist.json", fused_keys_file="data/fused_keys.json",
+                 grants_file="data/grants.json"):
         self.config = config
         self.whitelist_file = whitelist_file
         self.fused_keys_file = fused_keys_file
@@ -18,13 +97,28 @@ class PermissionManager:
         self.admins = self.default_admins.copy()
         self.allowed_users = set()
         
-        # 限时开放点歌时间
-        self.grant_until_time = 0  # Unix timestamp
+        # 临时授权（全局限时 / 单用户限时 / 每人N首），持久化保存
+        self.grants = GrantStore(grants_file)
+        
+        # 当前小时的管理员密钥缓存，整点后失效
+        self._daily_key = None
+        self._daily_key_password = None
+        self._daily_key_expires = 0
         
-        # 临时点歌次数 - 每人最多N首相关变量
-        self.global_temp_grant_per_user = 0  # 每人可领取的次数（由 !grant -c N 设置）
-        self.user_already_granted = set()    # 记录已领取过配额的用户名
-        self.temp_grant_counts = {}          # 当前每个用户的剩余次数
+        # 点歌频率限制：每用户令牌桶 + 全局令牌桶 + 短时间重复内容抑制
+        self.user_limiter = TokenBucketLimiter(
+            config.get("env_rate_user_capacity", 3),
+            config.get("env_rate_user_interval", 20)
+        )
+        self.global_limiter = TokenBucketLimiter(
+            config.get("env_rate_global_capacity", 20),
+            config.get("env_rate_global_interval", 3)
+        )
+        self.duplicate_window = config.get("env_rate_dup_window", 60)
+        self._recent_texts = OrderedDict()  # (用户, 内容) -> 时间，按时间先后排列
+        
+        # 已熔断的密钥（内存集合，写入时同步落盘）
+        self.fused_keys = self.load_fused_keys()
         
         # 加载白名单
         self.load_whitelist()
@@ -50,22 +144,18 @@ class PermissionManager:
             self.allowed_users = self.default_allowed_users.copy()
             return False
     
+    def _render_whitelist(self):
+        data = {
+            'allowed_users': sorted(self.allowed_users),
+            'last_updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }
+        return json.dumps(data, ensure_ascii=False, indent=2)
+    
     def save_whitelist(self):
-        """保存白名单到文件"""
-        try:
-            data = {
-                'allowed_users': list(self.allowed_users),
-                'last_updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            }
-            # 确保config目录存在
-            os.makedirs(os.path.dirname(self.whitelist_file), exist_ok=True)
-            with open(self.whitelist_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            print(f"白名单已保存到 {self.whitelist_file}")
-            return True
-        except Exception as e:
-            print(f"保存白名单失败: {e}")
-            return False
+        """保存白名单到文件（连续的 !touch / !rm 合并为一次写入）"""
+        persistence.schedule(self.whitelist_file, self._render_whitelist)
+        print(f"白名单已保存到 {self.whitelist_file}")
+        return True
     
     def add_user_to_whitelist(self, username):
         """添加用户到白名单"""
@@ -109,11 +199,21 @@ class PermissionManager:
     
     def generate_daily_key(self):
         """生成每日密钥"""
-        import time
         today_date = time.strftime('%y%m%d%H', time.localtime())
         key_input = today_date + self.admin_password
         sha256_hash = hashlib.sha256(key_input.encode('utf-8')).hexdigest()
-        return sha256_hash[:10]
+        return sha256_hash[:ADMIN_KEY_LENGTH]
+    
+    def current_daily_key(self):
+        """获取当前小时的密钥（缓存到整点或密码变更）"""
+        now = time.time()
+        if now >= self._daily_key_expires or self.admin_password != self._daily_key_password:
+            local = time.localtime(now)
+            self._daily_key = self.generate_daily_key()
+            self._daily_key_password = self.admin_password
+            # 下一个整点
+            self._daily_key_expires = int(now) - local.tm_min * 60 - local.tm_sec + 3600
+        return self._daily_key
     
     def load_fused_keys(self):
         """加载已使用的密钥"""
@@ -125,31 +225,66 @@ class PermissionManager:
     
     def save_fused_key(self, key):
         """保存已使用的密钥"""
-        fused_keys = self.load_fused_keys()
-        fused_keys.add(key)
-        # 确保data目录存在
-        os.makedirs(os.path.dirname(self.fused_keys_file), exist_ok=True)
-        with open(self.fused_keys_file, 'w', encoding='utf-8') as f:
-            json.dump({'fused_keys': list(fused_keys)}, f, ensure_ascii=False, indent=2)
+        self.fused_keys.add(key)
+        # 熔断必须立即落盘，不做合并
+        persistence.write_json_now(self.fused_keys_file, {'fused_keys': list(self.fused_keys)})
     
     def extract_alphanumeric(self, text):
         """提取字母数字字符"""
-        import re
-        return re.sub(r'[^a-zA-Z0-9]', '', text)
+        return _NON_ALPHANUMERIC.sub('', text)
     
     def is_valid_admin_key(self, content):
         """验证管理员密钥"""
-        alphanumeric_content = self.extract_alphanumeric(content)
-        
-        daily_key = self.generate_daily_key()
+        # 快速预筛：长度不足，或不含密钥首尾字符的消息直接拒绝（无额外分配）
+        if len(content) < ADMIN_KEY_LENGTH:
+            return _KEY_MISMATCH
+        daily_key = self.current_daily_key()
+        if daily_key[0] not in content or daily_key[-1] not in content:
+            return _KEY_MISMATCH
         
-        if alphanumeric_content == daily_key:
-            fused_keys = self.load_fused_keys()
-            if daily_key in fused_keys:
+        if self.extract_alphanumeric(content) == daily_key:
+            if daily_key in self.fused_keys:
                 return False, "密钥已被使用过"
             return True, daily_key
         
-        return False, "密钥不匹配"
+        return _KEY_MISMATCH
+    
+    def check_rate_limit(self, username, text):
+        """检查点歌频率，返回 (是否放行, 拒绝原因)；管理员不受限制"""
+        if self.is_admin(username):
+            return True, None
+        now = time.time()
+        
+        # 清理窗口外的重复内容记录
+        while self._recent_texts:
+            oldest_key, oldest_time = next(iter(self._recent_texts.items()))
+            if now - oldest_time < self.duplicate_window:
+                break
+            self._recent_texts.popitem(last=False)
+        dedup_key = (username, text.strip().lower())
+        if dedup_key in self._recent_texts:
+            return False, "重复点歌，请稍后再试"
+        
+        if not self.user_limiter.allow(username, now):
+            return False, "点歌过于频繁，请稍后再试"
+        if not self.global_limiter.allow(None, now):
+            # 被全局限制拒绝的请求不占用该用户的次数
+            self.user_limiter.refund(username, now)
+            return False, "点歌请求过多，请稍后再试"
+        self._recent_texts[dedup_key] = now
+        return True, None
+    
+    def refund_rate_limit(self, username, text):
+        """
+        退还 check_rate_limit 消耗的令牌并撤销重复内容记录
+        用于已放行但最终未找到歌曲（或解析出错）的请求，输错歌名不应占用点歌次数
+        """
+        if self.is_admin(username):
+            return
+        now = time.time()
+        self.user_limiter.refund(username, now)
+        self.global_limiter.refund(None, now)
+        self._recent_texts.pop((username, text.strip().lower()), None)
     
     def add_admin(self, username):
         """添加管理员"""
@@ -166,83 +301,59 @@ class PermissionManager:
         """获取管理员列表"""
         return list(self.admins)
     
-    def grant_temp_access(self, grant_type, value):
+    def grant_temp_access(self, grant_type, value, username=None):
         """授予临时访问权限"""
         if grant_type == "time":
-            import time
-            self.grant_until_time = time.time() + max(0, value)
-            self.global_temp_grant_per_user = 0
-            self.temp_grant_counts.clear()
-            self.user_already_granted.clear()
+            self.grants.grant_global(value)
         elif grant_type == "count":
-            self.global_temp_grant_per_user = value
-            self.grant_until_time = 0  # 关闭时间模式
-            self.temp_grant_counts.clear()
-            self.user_already_granted.clear()  # 重置，让所有人可以重新领取
+            self.grants.grant_count(value)
+        elif grant_type == "user":
+            self.grants.grant_user(username, value)
     
     def revoke_temp_access(self, grant_type):
         """撤销临时访问权限"""
-        if grant_type == "time":
-            self.grant_until_time = 0
-        elif grant_type == "count":
-            self.global_temp_grant_per_user = 0
-            self.temp_grant_counts.clear()
-            self.user_already_granted.clear()
-        elif grant_type == "all":
-            self.grant_until_time = 0
-            self.global_temp_grant_per_user = 0
-            self.temp_grant_counts.clear()
-            self.user_already_granted.clear()
+        self.grants.revoke(grant_type)
     
     def check_user_temp_grant(self, username):
         """检查用户临时权限"""
-        import time
-        
-        # 检查用户权限
-        has_perm = (
-            self.has_permission(username) or
-            time.time() < self.grant_until_time
-        )
-        
-        # 如果没有直接权限，尝试使用"每人最多N首"临时配额
-        if not has_perm and self.global_temp_grant_per_user > 0:
-            if username not in self.user_already_granted:
-                # 首次领取：分配 N 次
-                self.temp_grant_counts[username] = self.global_temp_grant_per_user
-                self.user_already_granted.add(username)
-                print(f"为 {username} 分配 {self.global_temp_grant_per_user} 次点歌权限")
-            
-            # 检查当前剩余次数
-            if self.temp_grant_counts.get(username, 0) > 0:
-                has_perm = True
-        
-        return has_perm
+        return self.has_permission(username) or self.grants.check(username)
     
     def use_temp_grant(self, username):
-        """使用临时权限（扣减次数）"""
-        import time
-        if (not self.has_permission(username) and
-            self.grant_until_time <= time.time() and
-            username in self.temp_grant_counts):
-            self.temp_grant_counts[username] -= 1
+        """使用临时权限（扣减次数，仅对非白名单、非限时授权用户）"""
+        if not self.has_permission(username):
+            self.grants.consume(username)
 
 # 白名单热重载处理器
-class WhitelistReloadHandler(FileSystemEventHandler):
-    def __init__(self, permission_manager):
-        super().__init__()
+class WhitelistReloadHandler(FileReloadHandler):
+    def __init__(self, permission_manager, dispatch=None):
+        super().__init__(permission_manager.whitelist_file, self._reload_whitelist, dispatch=dispatch)
         self.permission_manager = permission_manager
-        self.last_reload_time = 0
-        self.reload_cooldown = 1.0
-    
-    def on_modified(self, event):
-        if event.src_path.endswith(self.permission_manager.whitelist_file):
-            import time
-            current_time = time.time()
-            # 检查是否在冷却时间内
-            if current_time - self.last_reload_time < self.reload_cooldown:
-                return
-            
-            print("[SYS] Reloaded")
-            self.permission_manager.load_whitelist()
-            print(f"[SYS] 白名单用户数: {len(self.permission_manager.allowed_users)}")
-            self.last_reload_time = current_time
\ No newline at end of file
+    
+    def _reload_whitelist(self):
+        print("[SYS] Reloaded")
+        self.permission_manager.load_whitelist()
+        print(f"[SYS] 白名单用户数: {len(self.permission_manager.allowed_users)}")
+
+def _benchmark(count=200000):
+    """管理员密钥判定的吞吐量测试（条/秒）"""
+    import random
+    import string
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = PermissionManager(
+            {"env_admin_password": "benchmark"},
+            whitelist_file=os.path.join(tmp, "whitelist.json"),
+            fused_keys_file=os.path.join(tmp, "fused_keys.json")
+        )
+        samples = ["点歌：晴天", "哈哈哈哈", "主播好", "666666", "!queue", "点歌:BV1xx411c7mu",
+                   "".join(random.choices(string.ascii_letters + string.digits, k=12))]
+        messages = [random.choice(samples) for _ in range(count)]
+        messages[::1000] = [manager.current_daily_key()] * len(messages[::1000])
+        start = time.perf_counter()
+        matched = sum(1 for message in messages if manager.is_valid_admin_key(message)[0])
+        elapsed = time.perf_counter() - start
+        print(f"{count} 条消息, 命中 {matched}, 耗时 {elapsed:.3f}s, {count / elapsed:,.0f} 条/秒")
+
+if __name__ == "__main__":
+    # python -m modules.permission
+    _benchmark()
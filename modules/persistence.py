@@ -0,0 +1,116 @@
+# modules/persistence.py
+# 配置/状态文件持久化模块
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+class PersistenceService:
+    """
+    合并短时间内对同一文件的多次写入，以临时文件+重命名的方式原子写入
+    并记录自身写入内容的哈希，供热重载处理器识别并跳过
+    """
+
+    def __init__(self, delay=0.5):
+        self.delay = delay          # 合并写入的等待时间（秒）
+        self._lock = threading.Lock()
+        self._pending = {}          # 路径 -> 生成文件内容的函数
+        self._timers = {}           # 路径 -> 等待中的定时器
+        self._written = {}          # 路径 -> 最近一次自身写入内容的哈希
+
+    @staticmethod
+    def _key(path):
+        return os.path.abspath(path)
+
+    @staticmethod
+    def _digest(data):
+        return hashlib.sha1(data).hexdigest()
+
+    def write_text_now(self, path, text):
+        """立即原子写入文本"""
+        data = text.encode('utf-8')
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # 先登记哈希再替换，避免监听器先于登记收到事件
+        with self._lock:
+            self._written[self._key(path)] = self._digest(data)
+        fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def write_json_now(self, path, data, indent=2):
+        """立即原子写入JSON"""
+        self.write_text_now(path, json.dumps(data, ensure_ascii=False, indent=indent))
+
+    def schedule(self, path, render):
+        """
+        登记一次延迟写入；render 在真正写入时才调用，
+        因此等待期间的多次修改只会产生一次写入（内容为最新状态）
+        """
+        key = self._key(path)
+        with self._lock:
+            self._pending[key] = (path, render)
+            if key in self._timers:
+                return
+            timer = threading.Timer(self.delay, self._flush_key, args=(key,))
+            timer.daemon = True
+            self._timers[key] = timer
+        timer.start()
+
+    def write_json(self, path, data, indent=2):
+        """延迟合并写入JSON（data 为可变对象时，写入的是到期时的内容）"""
+        self.schedule(path, lambda: json.dumps(data, ensure_ascii=False, indent=indent))
+
+    def _flush_key(self, key):
+        with self._lock:
+            self._timers.pop(key, None)
+            entry = self._pending.pop(key, None)
+        if entry is None:
+            return
+        path, render = entry
+        try:
+            text = render()
+        except RuntimeError:
+            # 渲染时数据正被其他线程修改，稍后重试
+            self.schedule(path, render)
+            return
+        try:
+            self.write_text_now(path, text)
+        except Exception as e:
+            print(f"[{'SYS':>3}] 保存文件失败({path}): {e}")
+
+    def flush(self, path=None):
+        """立即执行等待中的写入（不指定路径时全部执行）"""
+        with self._lock:
+            keys = [self._key(path)] if path else list(self._pending)
+            for key in keys:
+                timer = self._timers.pop(key, None)
+                if timer:
+                    timer.cancel()
+        for key in keys:
+            self._flush_key(key)
+
+    def is_self_write(self, path):
+        """文件当前内容是否就是本进程最近一次写入的内容"""
+        with self._lock:
+            expected = self._written.get(self._key(path))
+        if expected is None:
+            return False
+        try:
+            with open(path, 'rb') as f:
+                return self._digest(f.read()) == expected
+        except OSError:
+            return False
+
+# 进程内共享的持久化服务
+persistence = PersistenceService()
@@ -0,0 +1,141 @@
+# modules/pipeline.py
+# 弹幕消息处理流程模块
+
+import asyncio
+
+from modules.event_bus import Enqueued, MessageReceived, RequestResolved
+from modules.queue_item import QueueItem
+from modules.utils import (format_system_output, format_admin_output, format_group_output, format_user_output,
+                           is_valid_bilibili_id, parse_bilibili_id)
+
+class RequestPipeline:
+    """
+    弹幕消息的处理流程：管理员密钥、命令、撤销与点歌
+    只负责请求路径本身（权限、限流、解析、入队），结果以事件发布到总线，
+    日志、统计、GUI等消费者各自订阅
+    """
+
+    def __init__(self, bus, permission_manager, queue_manager, music_bot, command_handler, config):
+        self.bus = bus
+        self.permission_manager = permission_manager
+        self.queue_manager = queue_manager
+        self.music_bot = music_bot
+        self.command_handler = command_handler
+        self.config = config
+
+    async def handle_message(self, msg_data):
+        """监听器回调：处理一条弹幕"""
+        content = msg_data.get('text', '').strip()
+        user_name = msg_data.get('nickname', '未知')
+        permission_manager = self.permission_manager
+
+        # 确定用户类型
+        if permission_manager.is_admin(user_name):
+            role = "ADM"
+            print(format_admin_output(user_name, content))
+        elif permission_manager.has_permission(user_name):
+            role = "GRP"
+            print(format_group_output(user_name, content))
+        else:
+            role = "USR"
+            print(format_user_output(user_name, content))
+        self.bus.publish(MessageReceived(user_name, content, role))
+
+        # 检查管理员密钥
+        is_valid, result = permission_manager.is_valid_admin_key(content)
+        if is_valid:
+            admin_key = result
+            if user_name not in permission_manager.admins:
+                permission_manager.add_admin(user_name)
+                print(format_system_output(f"{user_name} 成为管理员"))
+                permission_manager.save_fused_key(admin_key)
+                print(format_system_output(f"{admin_key} 熔断"))
+            else:
+                print(format_system_output(f"{user_name} 已经是管理员"))
+            return
+
+        # 检查是否是命令
+        if content.startswith('!'):
+            result = await self.command_handler.handle_command(user_name, content)
+            if result:
+                print(format_system_output(result))
+            return
+
+        # 检查是否包含"撤销"关键词
+        if "撤销" in content:
+            removed_count = self.queue_manager.remove_user_songs(user_name)
+            if removed_count > 0:
+                print(format_system_output(f"{user_name} 撤销了 {removed_count} 首歌曲"))
+            return
+
+        # 统一处理点歌请求（包括音乐和视频）
+        if content.startswith(("点歌：", "点歌:")):
+            query = content.replace("点歌：", "").replace("点歌:", "").strip()
+            if query:
+                await self.handle_request(user_name, query)
+
+    async def handle_request(self, user_name, query):
+        """处理一条点歌请求"""
+        permission_manager = self.permission_manager
+        print(format_system_output(f"收到点歌请求: {query} (来自: {user_name})"))
+
+        # 检查词典映射
+        mapping = self.command_handler.dict_map.resolve(query)
+        if mapping:
+            alias, target = mapping
+            note = "" if alias == query else f" (匹配词条: {alias})"
+            print(format_system_output(f"完成映射: {query} -> {target}{note}"))
+            query = target
+
+        # 检查用户权限
+        if not permission_manager.check_user_temp_grant(user_name):
+            print(format_system_output(f"{user_name} 's request aborted: Permission denied"))
+            return
+
+        # 队列已满或超出频率限制的请求不再访问上游接口
+        if self.queue_manager.is_full():
+            print(format_system_output("点歌队列已满，无法加入"))
+            return
+        allowed, reason = permission_manager.check_rate_limit(user_name, query)
+        if not allowed:
+            print(format_system_output(f"{user_name} 's request aborted: {reason}"))
+            return
+
+        # 令牌在访问上游前扣除；解析失败时退还，输错歌名不占用点歌次数
+        try:
+            item = await self.resolve(user_name, query)
+        except Exception:
+            permission_manager.refund_rate_limit(user_name, query)
+            raise
+        self.bus.publish(RequestResolved(user_name, query, item))
+        if item is None:
+            permission_manager.refund_rate_limit(user_name, query)
+            print(format_system_output("未找到歌曲或无效的视频ID"))
+            return
+
+        success, msg = await self.queue_manager.add_song(item)
+        if not success:
+            print(format_system_output(msg))  # 输出查重或队列满的错误信息
+            return
+        print(format_system_output(f"入队成功: {item.name} (点歌者: {user_name})"))
+        # 扣减临时次数（仅对非白名单、非时间许可用户）
+        permission_manager.use_temp_grant(user_name)
+        # 点歌日志、统计等由订阅者记录
+        self.bus.publish(Enqueued(item))
+
+    async def resolve(self, user_name, query):
+        """把点歌内容解析为队列条目（B站视频或网易云歌曲），未找到返回None"""
+        parsed_video_id, p_number = parse_bilibili_id(query)
+        if is_valid_bilibili_id(parsed_video_id) and self.config.get("enable_video_playback", True):
+            # 如果有分p信息，构建完整的URL
+            if p_number:
+                video_url = f"{parsed_video_id}?p={p_number}"
+                print(format_system_output(f"解析分p视频: {video_url}"))
+            else:
+                video_url = parsed_video_id
+            return QueueItem.video(video_url, requester=user_name)
+        # 网易云搜索会访问网络，放到线程中执行，不阻塞事件循环
+        sid, name, artist = await asyncio.to_thread(self.music_bot.get_song_info, query)
+        if not sid:
+            return None
+        return QueueItem.netease(sid, name, artist, requester=user_name)
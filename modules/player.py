@@ -7,10 +7,48 @@ import os
 import platform
 import tempfile
 import time
-import yt_dlp
+from modules.queue_item import QueueItem, QueueItemKind
+from modules.history import PlayEvent
+from modules.event_bus import TrackEnded, TrackStarted
+
+# 各类型条目追加的 MPV 参数
+MPV_EXTRA_ARGS = {
+    QueueItemKind.NETEASE: ('--idle=no',),
+    QueueItemKind.UNORTHODOX: ('--idle=no',),
+    QueueItemKind.VIDEO: (
+        '--idle=yes',  # 保持播放器空闲状态，直到计时器结束
+        '--ytdl=yes',  # 启用youtube-dl支持，用于处理B站视频
+        '--cache=yes',  # 启用缓存
+        '--demuxer-max-bytes=50MiB',  # 增加缓冲区大小
+        '--demuxer-max-back-bytes=25MiB',  # 增加回退缓冲区
+    ),
+}
+
+def _kill_process_tree(pid, timeout=3):
+    """终止进程及其子进程，超时未退出则强制杀死（阻塞，须在线程中调用）"""
+    import psutil
+    try:
+        parent = psutil.Process(pid)
+        children = parent.children(recursive=True)
+        for child in children:
+            try:
+                child.terminate()
+            except psutil.NoSuchProcess:
+                pass
+        parent.terminate()
+        
+        # 等待进程结束，超时则强制杀死
+        gone, alive = psutil.wait_procs([parent] + children, timeout=timeout)
+        for p in alive:
+            try:
+                p.kill()
+            except psutil.NoSuchProcess:
+                pass
+    except psutil.NoSuchProcess:
+        pass
 
 class Player:
-    def __init__(self, mpv_path="mpv", video_timeout_buffer=3):
+    def __init__(self, mpv_path="mpv", video_timeout_buffer=3, history=None, bus=None):
         self.mpv_path = mpv_path
         self.video_timeout_buffer = video_timeout_buffer
         self.current_mpv_process = None
@@ -18,8 +56,14 @@ class Player:
         self.current_volume = 100
         self.current_playing = None
         self.current_timer_task = None
-        self.play_history = []
-        self.max_history = 50
+        self.history = history  # HistoryManager，可为None
+        self.bus = bus  # 可选：事件总线（发布开始/结束播放事件，由订阅者记录历史）
+        self.skip_requested = False
+        self._resolvers = {
+            QueueItemKind.NETEASE: self._resolve_netease,
+            QueueItemKind.UNORTHODOX: self._resolve_unorthodox,
+            QueueItemKind.VIDEO: self._resolve_video,
+        }
     
     def get_mpv_path(self):
         """
@@ -95,45 +139,26 @@ class Player:
             print(f"[{'SYS':>3}] 发送 MPV 命令出错: {e}")
             return False
 
-    def terminate_mpv_process(self, process):
-        """终止MPV进程及其子进程"""
+    async def terminate_mpv_process(self, process):
+        """终止MPV进程及其子进程（等待进程退出期间不阻塞事件循环）"""
         if process is None or process.returncode is not None:
             return
             
         try:
             if platform.system() == "Windows":
                 # Windows: 使用taskkill终止进程树
-                subprocess.run(['taskkill', '/F', '/T', '/PID', str(process.pid)], 
-                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                await asyncio.to_thread(subprocess.run, ['taskkill', '/F', '/T', '/PID', str(process.pid)],
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
             else:
-                # Unix-like: 使用psutil终止进程树
-                import psutil
-                try:
-                    parent = psutil.Process(process.pid)
-                    children = parent.children(recursive=True)
-                    for child in children:
-                        try:
-                            child.terminate()
-                        except psutil.NoSuchProcess:
-                            pass
-                    parent.terminate()
-                    
-                    # 等待进程结束，超时则强制杀死
-                    gone, alive = psutil.wait_procs([parent] + children, timeout=3)
-                    for p in alive:
-                        try:
-                            p.kill()
-                        except psutil.NoSuchProcess:
-                            pass
-                except psutil.NoSuchProcess:
-                    pass
+                # Unix-like: 使用psutil终止进程树（wait_procs 会阻塞，放到线程中执行）
+                await asyncio.to_thread(_kill_process_tree, process.pid)
         except ImportError:
             # 如果没有psutil，使用标准方法
             try:
                 process.terminate()
                 try:
-                    process.wait(timeout=3)
-                except subprocess.TimeoutExpired:
+                    await asyncio.wait_for(process.wait(), 3)
+                except asyncio.TimeoutError:
                     process.kill()
             except ProcessLookupError:
                 pass  # 进程已经结束
@@ -143,6 +168,7 @@ class Player:
     def get_video_duration(self, video_url):
         """使用yt-dlp获取视频时长"""
         try:
+            import yt_dlp  # 首次播放视频时才导入
             ydl_opts = {
                 'quiet': True,
                 'no_warnings': True,
@@ -182,10 +208,29 @@ class Player:
             print(f"[{'SYS':>3}] exit(1)")
             await self.send_mpv_command('quit')
             await asyncio.sleep(0.5)
-            self.terminate_mpv_process(self.current_mpv_process)
+            await self.terminate_mpv_process(self.current_mpv_process)
         else:
             print(f"[{'SYS':>3}] exit(0)")
 
+    async def _resolve_netease(self, song_item, music_bot):
+        """解析网易云音乐播放链接"""
+        if not song_item.url and music_bot:
+            song_item.url = await asyncio.to_thread(music_bot.get_song_url, song_item.item_id)
+        return song_item.url
+
+    async def _resolve_unorthodox(self, song_item, music_bot):
+        """备线源入队时已带有音频链接"""
+        return song_item.url
+
+    async def _resolve_video(self, song_item, music_bot):
+        """构建B站视频链接并获取时长"""
+        video_url = f"https://www.bilibili.com/video/{song_item.item_id}"
+        if song_item.duration is None:
+            song_item.duration = await asyncio.to_thread(self.get_video_duration, video_url)
+        # 启动计时器任务
+        self.current_timer_task = asyncio.create_task(self.video_timer(song_item.duration, song_item.item_id))
+        return video_url
+
     async def play_audio(self, song_item, music_bot=None):
         """播放音频或视频"""
         # 取消之前的计时器任务
@@ -196,112 +241,43 @@ class Player:
             except asyncio.CancelledError:
                 pass
 
-        # 检查是否是视频ID
-        if isinstance(song_item, tuple) and len(song_item) == 3:
-            # 普通网易云音乐
-            sid, name, artist = song_item
-            self.current_playing = (sid, name, artist)  # 更新当前播放
-            print(f"[{'SYS':>3}] 正在解析: {name} - {artist}")
-            
-            if music_bot:
-                mp3_url = music_bot.get_song_url(sid)
-                if not mp3_url:
-                    print(f"[{'SYS':>3}] 解析失败 跳过")
-                    self.current_playing = None
-                    return
-
-                print(f"[{'SYS':>3}] 启动 MPV: {name}")
-
-                # 构建 MPV 参数
-                mpv_args = [
-                    self.mpv_path,
-                    '--no-video',  # 仅播放音频
-                    '--idle=no',
-                    f'--input-ipc-server={self.mpv_ipc_path}',
-                    f'--volume={self.current_volume}',  # 设置当前音量
-                    '--msg-level=all=no',  # 减少日志
-                    mp3_url
-                ]
-
-                creationflags = 0
-                if platform.system() == 'win32':
-                    creationflags = subprocess.CREATE_NO_WINDOW
-
-                self.current_mpv_process = await asyncio.create_subprocess_exec(
-                    *mpv_args,
-                    stdout=subprocess.DEVNULL,
-                    stderr=subprocess.DEVNULL,
-                    creationflags=creationflags
-                )
-        elif isinstance(song_item, tuple) and len(song_item) == 4:
-            # 非正统音乐源
-            song_id, name, artist, audio_url = song_item
-            self.current_playing = (song_id, name, artist)  # 更新当前播放
-            print(f"[{'SYS':>3}] 正在解析: {name} - {artist}")
-            
-            print(f"[{'SYS':>3}] 启动 MPV: {name}")
-
-            # 构建 MPV 参数 - 直接播放音频URL
-            mpv_args = [
-                self.mpv_path,
-                '--no-video',  # 仅播放音频
-                '--idle=no',
-                f'--input-ipc-server={self.mpv_ipc_path}',
-                f'--volume={self.current_volume}',  # 设置当前音量
-                '--msg-level=all=no',  # 减少日志
-                audio_url
-            ]
-
-            creationflags = 0
-            if platform.system() == 'win32':
-                creationflags = subprocess.CREATE_NO_WINDOW
-
-            self.current_mpv_process = await asyncio.create_subprocess_exec(
-                *mpv_args,
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL,
-                creationflags=creationflags
-            )
-        else:
-            # 处理视频ID
-            video_id = song_item
-            self.current_playing = (None, f"{video_id}", "")  # 更新当前播放
-            print(f"[{'SYS':>3}] 正在播放: {video_id}")
+        self.current_playing = song_item  # 更新当前播放
+        self.skip_requested = False
+        started_at = time.time()
+        print(f"[{'SYS':>3}] 正在解析: {song_item.display()}")
 
-            # 构建视频播放URL
-            video_url = f"https://www.bilibili.com/video/{video_id}"
-            
-            # 获取视频时长
-            duration = self.get_video_duration(video_url)
-            
-            # 启动计时器任务
-            self.current_timer_task = asyncio.create_task(self.video_timer(duration, video_id))
-            
-            # 构建 MPV 参数 - 播放视频，但仅提取音频
-            mpv_args = [
-                self.mpv_path,
-                '--no-video',  # 仅播放音频，忽略画面
-                '--idle=yes',  # 保持播放器空闲状态，直到播放完成
-                f'--input-ipc-server={self.mpv_ipc_path}',
-                f'--volume={self.current_volume}',  # 设置当前音量
-                '--msg-level=all=no',  # 减少日志
-                '--ytdl=yes',  # 启用youtube-dl支持，用于处理B站视频
-                '--cache=yes',  # 启用缓存
-                '--demuxer-max-bytes=50MiB',  # 增加缓冲区大小
-                '--demuxer-max-back-bytes=25MiB',  # 增加回退缓冲区
-                video_url
-            ]
-
-            creationflags = 0
-            if platform.system() == 'win32':
-                creationflags = subprocess.CREATE_NO_WINDOW
+        resolver = self._resolvers[song_item.kind]
+        media_url = await resolver(song_item, music_bot)
+        if not media_url:
+            print(f"[{'SYS':>3}] 解析失败 跳过")
+            self.current_playing = None
+            return
 
-            self.current_mpv_process = await asyncio.create_subprocess_exec(
-                *mpv_args,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                creationflags=creationflags
-            )
+        print(f"[{'SYS':>3}] 启动 MPV: {song_item.name}")
+
+        # 构建 MPV 参数（仅播放音频）
+        mpv_args = [
+            self.mpv_path,
+            '--no-video',  # 仅播放音频
+            f'--input-ipc-server={self.mpv_ipc_path}',
+            f'--volume={self.current_volume}',  # 设置当前音量
+            '--msg-level=all=no',  # 减少日志
+            *MPV_EXTRA_ARGS[song_item.kind],
+            media_url
+        ]
+
+        creationflags = 0
+        if platform.system() == 'win32':
+            creationflags = subprocess.CREATE_NO_WINDOW
+
+        self.current_mpv_process = await asyncio.create_subprocess_exec(
+            *mpv_args,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            creationflags=creationflags
+        )
+        if self.bus is not None:
+            self.bus.publish(TrackStarted(song_item))
 
         # 等待播放完成
         try:
@@ -317,31 +293,17 @@ class Player:
             except asyncio.CancelledError:
                 pass
         
-        # 获取播放完成的标题
-        if isinstance(song_item, tuple) and len(song_item) == 3:
-            sid, name, artist = song_item
-            print(f"[{'SYS':>3}] 播放结束: {name}")
-            # 记录到历史
-            from datetime import datetime
-            self.play_history.append((sid, name, artist, datetime.now().isoformat()))
-            if len(self.play_history) > self.max_history:
-                self.play_history.pop(0)  # FIFO
-        elif isinstance(song_item, tuple) and len(song_item) == 4:
-            # 非正统音乐源
-            song_id, name, artist, audio_url = song_item
-            print(f"[{'SYS':>3}] 播放结束: {name}")
-            # 记录到历史
-            from datetime import datetime
-            self.play_history.append((song_id, name, artist, datetime.now().isoformat()))
-            if len(self.play_history) > self.max_history:
-                self.play_history.pop(0)  # FIFO
-        else:
-            video_id = song_item
-            print(f"[{'SYS':>3}] 视频播放结束: {video_id}")
+        print(f"[{'SYS':>3}] 播放结束: {song_item.name}")
+        # 记录到历史（有事件总线时由订阅者记录）
+        play = PlayEvent(song_item, started_at, time.time(), self.skip_requested)
+        if self.bus is not None:
+            self.bus.publish(TrackEnded(play))
+        elif self.history is not None:
+            self.history.record(play)
 
         # 确保进程完全终止
         if self.current_mpv_process:
-            self.terminate_mpv_process(self.current_mpv_process)
+            await self.terminate_mpv_process(self.current_mpv_process)
         
         self.current_mpv_process = None
         self.current_playing = None
@@ -365,11 +327,12 @@ class Player:
                     if enable_fallback_playlist:  # 检查是否启用随机播放歌单功能
                         print(f"[{'SYS':>3}] 无请求，随机播放歌单...")
                         if music_bot:
-                            song_item = music_bot.get_random_fallback_song()
-                            if not song_item or not song_item[0]:
+                            sid, name, artist = await asyncio.to_thread(music_bot.get_random_fallback_song)
+                            if not sid:
                                 print(f"[{'SYS':>3}] 获取失败，10秒后重试...")
                                 await asyncio.sleep(10)
                                 continue
+                            song_item = QueueItem.netease(sid, name, artist)
                     else:
                         print(f"[{'SYS':>3}] 空队列...")
                         await asyncio.sleep(5)
@@ -398,7 +361,7 @@ class Player:
                     asyncio.create_task(cancel_task())
                 # 确保进程完全终止
                 if self.current_mpv_process:
-                    self.terminate_mpv_process(self.current_mpv_process)
+                    await self.terminate_mpv_process(self.current_mpv_process)
                 self.current_mpv_process = None
                 self.current_playing = None
                 self.current_timer_task = None
@@ -410,29 +373,18 @@ class Player:
 
     def get_play_history(self, num=5):
         """获取播放历史"""
-        return self.play_history[-num:] if self.play_history else []
+        return self.history.last(num) if self.history is not None else []
 
     def set_volume(self, volume):
         """设置音量"""
         if 0 <= volume <= 100:
             self.current_volume = volume
             if self.current_mpv_process and self.current_mpv_process.returncode is None:
-                # 创建一个线程来运行异步任务
-                thread = threading.Thread(target=self._run_async_set_volume, args=(volume,))
-                thread.daemon = True
-                thread.start()
+                # 在播放器所在的事件循环中发送，不另起线程
+                asyncio.get_running_loop().create_task(self.send_mpv_command(f'set volume {volume}'))
             return True
         return False
 
-    def _run_async_set_volume(self, volume):
-        """在新线程中运行异步设置音量操作"""
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            loop.run_until_complete(self.send_mpv_command(f'set volume {volume}'))
-        finally:
-            loop.close()
-
     async def set_volume_async(self, volume):
         """异步设置音量（用于快捷键）"""
         if 0 <= volume <= 100:
@@ -475,6 +427,7 @@ class Player:
                     except asyncio.CancelledError:
                         pass
                 asyncio.create_task(cancel_task())
+            self.skip_requested = True
             # 发送quit命令终止当前播放
             result = await self.send_mpv_command('quit')
             print(f"[{'SYS':>3}] 已跳过当前歌曲")
@@ -0,0 +1,86 @@
+# modules/queue_item.py
+# 播放队列条目模型
+
+from enum import IntEnum
+
+class QueueItemKind(IntEnum):
+    NETEASE = 0     # 网易云音乐
+    UNORTHODOX = 1  # 备线音乐源（直接音频URL）
+    VIDEO = 2       # B站视频
+
+# 各类型在去重键中的前缀
+_KEY_PREFIX = {
+    QueueItemKind.NETEASE: "ncm",
+    QueueItemKind.UNORTHODOX: "uno",
+    QueueItemKind.VIDEO: "bv",
+}
+
+class QueueItem:
+    """播放队列中的一个条目（歌曲或视频）"""
+    __slots__ = ("kind", "item_id", "name", "artist", "requester", "url", "duration")
+
+    def __init__(self, kind, item_id, name="", artist="", requester=None, url=None, duration=None):
+        self.kind = kind
+        self.item_id = item_id
+        self.name = name
+        self.artist = artist
+        self.requester = requester  # 点歌者，随机歌单为None
+        self.url = url              # 已解析的播放链接（缓存）
+        self.duration = duration    # 时长（秒），未知为None
+
+    @classmethod
+    def netease(cls, sid, name, artist, requester=None):
+        """创建网易云音乐条目"""
+        return cls(QueueItemKind.NETEASE, sid, name, artist, requester)
+
+    @classmethod
+    def unorthodox(cls, song_id, name, artist, audio_url, requester=None):
+        """创建备线音乐源条目"""
+        return cls(QueueItemKind.UNORTHODOX, song_id, name, artist, requester, audio_url)
+
+    @classmethod
+    def video(cls, video_id, requester=None):
+        """创建B站视频条目"""
+        return cls(QueueItemKind.VIDEO, video_id, str(video_id), "", requester)
+
+    @property
+    def key(self):
+        """稳定的去重键"""
+        if self.kind == QueueItemKind.UNORTHODOX:
+            # 备线源的序号不唯一，按歌名+歌手去重
+            return f"uno:{self.name}-{self.artist}"
+        return f"{_KEY_PREFIX[self.kind]}:{self.item_id}"
+
+    @property
+    def is_video(self):
+        return self.kind == QueueItemKind.VIDEO
+
+    def display(self):
+        """用于队列/历史展示的文本"""
+        if self.kind == QueueItemKind.VIDEO:
+            return f"视频: {self.item_id}"
+        if self.kind == QueueItemKind.UNORTHODOX:
+            return f"{self.name} - {self.artist} (备线源)"
+        return f"{self.name} - {self.artist}"
+
+    def to_json(self):
+        """紧凑的JSON编码（列表形式，省略末尾空字段）"""
+        data = [int(self.kind), self.item_id, self.name, self.artist,
+                self.requester, self.url, self.duration]
+        while data[-1] is None:
+            data.pop()
+        return data
+
+    @classmethod
+    def from_json(cls, data):
+        """从 to_json 的结果还原"""
+        return cls(QueueItemKind(data[0]), *data[1:])
+
+    def __eq__(self, other):
+        return isinstance(other, QueueItem) and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __repr__(self):
+        return f"QueueItem({self.kind.name}, {self.item_id!r}, {self.name!r}, {self.artist!r}, requester={self.requester!r})"
@@ -7,17 +7,11 @@ class QueueManager:
     def __init__(self, maxsize=5):
         self.maxsize = maxsize
         self.song_queue = asyncio.Queue(maxsize=maxsize)
-        self.history = []  # 播放历史
-        self.max_history = 50
     
     async def add_song(self, song_item):
-        """添加歌曲到队列，对网易云音乐进行ID查重"""
-        # 检查是否为网易云音乐项目（3元组格式：sid, name, artist）
-        if isinstance(song_item, tuple) and len(song_item) == 3:
-            sid, name, artist = song_item
-            # 对网易云音乐进行查重
-            if self._is_song_duplicate(sid):
-                return False, f"歌曲 '{name}' 已在队列中，无法重复添加"
+        """添加条目到队列，按去重键查重"""
+        if self._is_song_duplicate(song_item.key):
+            return False, f"'{song_item.name}' 已在队列中，无法重复添加"
         
         if self.song_queue.full():
             return False, "点歌队列已满，无法加入"
@@ -25,29 +19,31 @@ class QueueManager:
         await self.song_queue.put(song_item)
         return True, "入队成功"
     
-    def _is_song_duplicate(self, song_id):
-        """检查网易云音乐ID是否已在队列中"""
-        # 创建一个临时队列来复制内容并检查
-        temp_queue = asyncio.Queue()
-        is_duplicate = False
-        
-        # 将原队列内容复制到临时队列并检查
-        while not self.song_queue.empty():
-            item = self.song_queue.get_nowait()
-            # 检查是否为网易云音乐项目且ID相同
-            if isinstance(item, tuple) and len(item) == 3:
-                existing_sid, existing_name, existing_artist = item
-                if existing_sid == song_id:
-                    is_duplicate = True
-                    break
-            temp_queue.put_nowait(item)
-        
-        # 将临时队列内容复制回原队列
-        while not temp_queue.empty():
-            item = temp_queue.get_nowait()
-            self.song_queue.put_nowait(item)
-        
-        return is_duplicate
+    async def add_songs(self, items):
+        """
+        批量添加条目：一次遍历完成去重（队列内与批次内），并在不让出事件循环的情况下整体入队
+        返回 (已添加, 重复, 因队列已满未添加)
+        """
+        seen = {item.key for item in self.get_queue_list()}
+        added, duplicates, overflow = [], [], []
+        for item in items:
+            if item.key in seen:
+                duplicates.append(item)
+            elif self.song_queue.full():
+                overflow.append(item)
+            else:
+                seen.add(item.key)
+                self.song_queue.put_nowait(item)
+                added.append(item)
+        return added, duplicates, overflow
+    
+    def queued_keys(self):
+        """队列中所有条目的去重键"""
+        return {item.key for item in self.get_queue_list()}
+    
+    def _is_song_duplicate(self, key):
+        """检查去重键是否已在队列中"""
+        return any(item.key == key for item in self.get_queue_list())
 
     async def get_next_song(self):
         """获取下一首歌曲"""
@@ -117,62 +113,20 @@ class QueueManager:
             cleared_count += 1
         return cleared_count
     
-    def add_to_history(self, song_info):
-        """添加到播放历史"""
-        self.history.append(song_info)
-        if len(self.history) > self.max_history:
-            self.history.pop(0)  # FIFO
-    
-    def get_history(self, num=5):
-        """获取播放历史"""
-        return self.history[-num:] if self.history else []
-    
-    def remove_user_songs(self, username, log_file="data/requests.log"):
+    def remove_user_songs(self, username):
         """移除指定用户在队列中的所有歌曲"""
         queue_list = self.get_queue_list()
-        user_songs_indices = []
-        
-        # 找到该用户在队列中的歌曲
-        for i, item in enumerate(queue_list):
-            if isinstance(item, tuple) and len(item) == 3:
-                # 这是一个音乐项
-                sid, name, artist = item
-                # 通过日志判断这首歌是否是该用户点的
-                try:
-                    with open(log_file, 'r', encoding='utf-8') as f:
-                        for line in f:
-                            if f"[{username}]：" in line and name in line:
-                                user_songs_indices.append(i)
-                                break
-                except:
-                    pass
-            else:
-                # 这是一个视频项
-                video_id = item
-                try:
-                    with open(log_file, 'r', encoding='utf-8') as f:
-                        for line in f:
-                            if f"[{username}]：" in line and str(video_id) in line:
-                                user_songs_indices.append(i)
-                                break
-                except:
-                    pass
+        kept_items = [item for item in queue_list if item.requester != username]
+        removed_count = len(queue_list) - len(kept_items)
         
         # 从队列中删除该用户的所有歌曲
-        if user_songs_indices:
-            new_queue_items = []
-            for i, item in enumerate(queue_list):
-                if i not in user_songs_indices:
-                    new_queue_items.append(item)
-            
+        if removed_count:
             # 清空原队列
             while not self.song_queue.empty():
                 self.song_queue.get_nowait()
             
             # 重新放入非该用户的歌曲
-            for item in new_queue_items:
+            for item in kept_items:
                 self.song_queue.put_nowait(item)
-            
-            return len(user_songs_indices)
         
-        return 0
\ No newline at end of file
+        return removed_count
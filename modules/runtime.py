@@ -0,0 +1,139 @@
+# modules/runtime.py
+# 单事件循环运行时模块
+
+import asyncio
+import threading
+import time
+
+class Runtime:
+    """
+    进程内唯一的 asyncio 事件循环：监听、播放、命令处理与计时器都在这里执行
+    图形界面模式下运行在工作线程中（主线程留给 Tk），无界面模式下直接占用当前线程
+    Tk、快捷键与看门狗等其他线程只能经 call / submit / bridge 把工作交给它，
+    共享状态（播放器进程、点歌队列、权限表）因此只在一个线程中被访问
+    """
+
+    def __init__(self, name="runtime"):
+        self.name = name
+        self.loop = asyncio.new_event_loop()
+        self._thread = None
+        self._thread_id = None
+        self._tasks = set()     # 持有后台任务的强引用，防止被回收
+
+    # ---------- 运行与停止 ----------
+
+    def start(self, coro=None):
+        """在工作线程中运行事件循环，可同时提交主协程"""
+        self._thread = threading.Thread(target=self._run_forever, args=(coro,), name=self.name, daemon=True)
+        self._thread.start()
+
+    def _run_forever(self, coro):
+        self._thread_id = threading.get_ident()
+        asyncio.set_event_loop(self.loop)
+        if coro is not None:
+            self.spawn(coro)
+        try:
+            self.loop.run_forever()
+        finally:
+            self._close()
+
+    def run(self, coro):
+        """在当前线程运行事件循环直至 coro 结束（无界面模式）"""
+        self._thread_id = threading.get_ident()
+        asyncio.set_event_loop(self.loop)
+        try:
+            return self.loop.run_until_complete(coro)
+        finally:
+            self._close()
+
+    def stop(self, timeout=5):
+        """停止工作线程中的事件循环并等待其清理完毕"""
+        if self._thread is None or self.loop.is_closed():
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        if self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    def _close(self):
+        """取消剩余任务（让其执行清理代码）后关闭事件循环"""
+        tasks = asyncio.all_tasks(self.loop)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+        self.loop.close()
+
+    def in_loop(self):
+        """当前是否处于事件循环线程"""
+        return threading.get_ident() == self._thread_id
+
+    # ---------- 线程桥接 ----------
+
+    def spawn(self, coro):
+        """以后台任务运行协程（只能在事件循环线程中调用）"""
+        task = self.loop.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._task_done)
+        return task
+
+    def _task_done(self, task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"[{'SYS':>3}] 后台任务出错: {task.exception()!r}")
+
+    def call(self, func, *args):
+        """从任意线程把普通函数转交到事件循环执行（不等待结果）；返回协程时作为后台任务运行"""
+        self.loop.call_soon_threadsafe(self._invoke, func, args)
+
+    def _invoke(self, func, args):
+        try:
+            result = func(*args)
+        except Exception as e:
+            print(f"[{'SYS':>3}] 回调执行出错: {e!r}")
+            return
+        if asyncio.iscoroutine(result):
+            self.spawn(result)
+
+    def submit(self, coro):
+        """从任意线程提交协程，返回 concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def bridge(self, func):
+        """包装回调：无论在哪个线程被调用，都转交到事件循环执行"""
+        def wrapper(*args):
+            self.call(func, *args)
+        return wrapper
+
+def _benchmark(count=2000):
+    """跨线程调用开销：桥接到常驻事件循环 vs 每次新建线程与事件循环（原快捷键实现）"""
+    async def action():
+        return None
+
+    runtime = Runtime()
+    runtime.start()
+    start = time.perf_counter()
+    for _ in range(count):
+        runtime.submit(action()).result()
+    bridged = time.perf_counter() - start
+    runtime.stop()
+
+    def per_thread():
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(action())
+        finally:
+            loop.close()
+
+    start = time.perf_counter()
+    for _ in range(count):
+        thread = threading.Thread(target=per_thread, daemon=True)
+        thread.start()
+        thread.join()
+    threaded = time.perf_counter() - start
+    print(f"{count} 次调用: 桥接 {bridged / count * 1e6:.1f} µs/次, "
+          f"新建线程+事件循环 {threaded / count * 1e6:.1f} µs/次")
+
+if __name__ == "__main__":
+    # python -m modules.runtime
+    _benchmark()
@@ -0,0 +1,150 @@
+# modules/song_index.py
+# 本地歌曲模糊索引模块
+
+import heapq
+import threading
+import time
+
+from modules.utils import normalize_text
+
+try:
+    from pypinyin import lazy_pinyin  # 可选：拼音匹配
+except ImportError:
+    lazy_pinyin = None
+
+def _grams(text):
+    """文本的二元组集合（单字文本返回自身）"""
+    if len(text) < 2:
+        return {text} if text else set()
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+def _pinyin(text):
+    """文本的拼音串（未安装 pypinyin 或无汉字时返回None）"""
+    if lazy_pinyin is None:
+        return None
+    result = ''.join(lazy_pinyin(text))
+    return result if result != text else None
+
+class SongIndex:
+    """
+    歌曲名/歌手/别名的二元组倒排索引，按 Dice 系数打分
+    支持增量添加；查询只访问与查询共享二元组的候选键
+    """
+
+    def __init__(self, threshold=0.75):
+        self.threshold = threshold  # 低于该分数的结果视为未命中
+        self._lock = threading.Lock()
+        self._songs = {}        # 歌曲ID -> (歌曲ID, 歌名, 歌手)
+        self._exact = {}        # 归一化键 -> 键序号
+        self._postings = {}     # 二元组 -> {键序号}
+        self._key_sids = []     # 键序号 -> [歌曲ID]（同名歌曲共用一个键）
+        self._key_size = []     # 键序号 -> 二元组个数
+
+    def _add_key(self, text, sid):
+        if not text:
+            return
+        key_id = self._exact.get(text)
+        if key_id is not None:
+            sids = self._key_sids[key_id]
+            if sid not in sids:
+                sids.append(sid)
+            return
+        grams = _grams(text)
+        key_id = self._exact[text] = len(self._key_sids)
+        self._key_sids.append([sid])
+        self._key_size.append(len(grams))
+        for gram in grams:
+            self._postings.setdefault(gram, set()).add(key_id)
+
+    def add(self, sid, name, artist, aliases=()):
+        """添加（或补充）一首歌曲；aliases 为额外的匹配文本，如点歌时使用的关键词"""
+        name_key = normalize_text(name)
+        artist_key = normalize_text(artist or "")
+        keys = [name_key, name_key + artist_key, artist_key + name_key]
+        keys += [normalize_text(alias) for alias in aliases]
+        pinyin = _pinyin(name_key)
+        if pinyin:
+            keys += [pinyin, pinyin + (_pinyin(artist_key) or artist_key)]
+        with self._lock:
+            self._songs[sid] = (sid, name, artist)
+            for key in keys:
+                self._add_key(key, sid)
+
+    def add_item(self, item):
+        """从队列条目添加（仅网易云歌曲）"""
+        if not item.is_video and isinstance(item.item_id, int):
+            self.add(item.item_id, item.name, item.artist)
+
+    def search(self, query, limit=5):
+        """返回 [(分数, (歌曲ID, 歌名, 歌手))]，按分数降序"""
+        text = normalize_text(query)
+        if not text:
+            return []
+        variants = [text]
+        pinyin = _pinyin(text)
+        if pinyin:
+            variants.append(pinyin)
+        best = {}
+        with self._lock:
+            # 只有唯一对应一首歌时才直接返回；同名歌曲交给下面的打分，得到同分的多个候选
+            key_id = self._exact.get(text)
+            if key_id is not None and len(self._key_sids[key_id]) == 1:
+                return [(1.0, self._songs[self._key_sids[key_id][0]])]
+            for variant in variants:
+                grams = _grams(variant)
+                counts = {}
+                for gram in grams:
+                    for key_id in self._postings.get(gram, ()):
+                        counts[key_id] = counts.get(key_id, 0) + 1
+                total = len(grams)
+                for key_id, shared in counts.items():
+                    score = 2 * shared / (total + self._key_size[key_id])
+                    for sid in self._key_sids[key_id]:
+                        if score > best.get(sid, 0):
+                            best[sid] = score
+            top = heapq.nlargest(limit, best.items(), key=lambda entry: entry[1])
+            return [(score, self._songs[sid]) for sid, score in top]
+
+    def lookup(self, query, threshold=None):
+        """返回置信度达到阈值且唯一的最佳结果 (歌曲ID, 歌名, 歌手)，否则返回None"""
+        threshold = self.threshold if threshold is None else threshold
+        results = self.search(query, limit=2)
+        if not results or results[0][0] < threshold:
+            return None
+        # 最高分有多首歌（如不同歌手的同名歌曲且查询未带歌手）时无法区分，交给网络搜索
+        if len(results) > 1 and results[1][0] >= results[0][0]:
+            return None
+        return results[0][1]
+
+    def __len__(self):
+        return len(self._songs)
+
+def _benchmark(count=30000, queries=2000):
+    """构建与查询耗时测试（随机生成的中文歌名）"""
+    import random
+    random.seed(0)
+    chars = [chr(code) for code in range(0x4e00, 0x4e00 + 800)]
+    songs = [(i, ''.join(random.choices(chars, k=random.randint(2, 8))),
+              ''.join(random.choices(chars, k=3))) for i in range(count)]
+    index = SongIndex()
+    start = time.perf_counter()
+    for sid, name, artist in songs:
+        index.add(sid, name, artist)
+    build_time = time.perf_counter() - start
+
+    samples = random.sample(songs, queries)
+    hits = 0
+    start = time.perf_counter()
+    for sid, name, artist in samples:
+        # 模拟错字：替换歌名中的一个字
+        pos = random.randrange(len(name))
+        typo = name[:pos] + random.choice(chars) + name[pos + 1:]
+        result = index.lookup(typo + artist, threshold=0.5)
+        hits += bool(result and result[0] == sid)
+    query_time = time.perf_counter() - start
+    print(f"{count} 首歌曲: 构建 {build_time:.2f}s, 查询 {query_time / queries * 1000:.3f} ms/次, "
+          f"错字命中率 {hits / queries:.1%}")
+
+if __name__ == "__main__":
+    # python -m modules.song_index
+    _benchmark()
@@ -0,0 +1,61 @@
+# modules/startup.py
+# 启动耗时测试模块
+
+import os
+import subprocess
+import sys
+
+IMPORT_BUDGET_MS = 800  # import main 的累计导入耗时预算（毫秒）
+# 这些模块只应在首次使用时导入，出现在启动导入链中即视为回归
+LAZY_MODULES = ("yt_dlp", "playwright", "qrcode", "tkinter", "keyboard", "pynput")
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def import_profile(target="main"):
+    """
+    以 python -X importtime 导入目标模块，返回 [(深度, 模块名, 自身微秒, 累计微秒)]
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=PROJECT_ROOT, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "导入失败")
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        field = parts[2][1:]
+        depth = (len(field) - len(field.lstrip())) // 2
+        entries.append((depth, field.strip(), int(parts[0]), int(parts[1])))
+    return entries
+
+def check_regressions(entries, budget_ms=IMPORT_BUDGET_MS):
+    """返回 (总导入耗时毫秒, 问题列表)"""
+    total_ms = sum(cumulative for depth, _, _, cumulative in entries if depth == 0) / 1000
+    problems = []
+    if total_ms > budget_ms:
+        problems.append(f"导入耗时 {total_ms:.0f} ms 超出预算 {budget_ms} ms")
+    imported = {name.split(".")[0] for _, name, _, _ in entries}
+    eager = [name for name in LAZY_MODULES if name in imported]
+    if eager:
+        problems.append(f"以下模块应延迟导入: {', '.join(eager)}")
+    return total_ms, problems
+
+def _benchmark(target="main", top=10):
+    """启动导入耗时测试；超出预算或提前导入重量级模块时以非0状态退出"""
+    entries = import_profile(target)
+    total_ms, problems = check_regressions(entries)
+    print(f"import {target}: {total_ms:.0f} ms (预算 {IMPORT_BUDGET_MS} ms)")
+    heaviest = sorted((entry for entry in entries if entry[0] == 0), key=lambda entry: entry[3], reverse=True)
+    for _, name, _, cumulative in heaviest[:top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+    print("运行时的启动耗时（至首次轮询）见程序日志中的“启动完成”一行")
+    for problem in problems:
+        print(f"[{'SYS':>3}] {problem}")
+    return 1 if problems else 0
+
+if __name__ == "__main__":
+    # python -m modules.startup
+    sys.exit(_benchmark())
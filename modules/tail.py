@@ -0,0 +1,101 @@
+# modules/tail.py
+# 日志尾部读取模块
+
+import os
+import sys
+import time
+
+def tail_lines(path, n=10, block_size=8192, encoding='utf-8'):
+    """从文件末尾按固定大小的块反向读取，只解码最后 n 行"""
+    if n <= 0:
+        return []
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        chunks = []
+        newlines = 0
+        # 多读一个换行符，保证第一行是完整的（文件以换行结尾时最后一个换行不算分隔）
+        while pos > 0 and newlines <= n:
+            read_size = min(block_size, pos)
+            pos -= read_size
+            f.seek(pos)
+            chunk = f.read(read_size)
+            chunks.append(chunk)
+            newlines += chunk.count(b'\n')
+    data = b''.join(reversed(chunks))
+    return [line.decode(encoding, errors='replace') for line in data.splitlines()[-n:]]
+
+def follow(path, poll_interval=0.5, from_end=True, encoding='utf-8'):
+    """
+    持续读取文件新增的行（类似 tail -f），供外部面板使用
+    文件被轮转或截断时自动从新文件开头继续
+    """
+    f = None
+    inode = None
+    partial = b''
+    try:
+        while True:
+            if f is None:
+                try:
+                    f = open(path, 'rb')
+                except FileNotFoundError:
+                    time.sleep(poll_interval)
+                    continue
+                inode = os.fstat(f.fileno()).st_ino
+                if from_end:
+                    f.seek(0, os.SEEK_END)
+                from_end = False  # 之后重新打开的文件都从头读取
+
+            data = f.read()
+            if data:
+                lines = (partial + data).split(b'\n')
+                partial = lines.pop()
+                for line in lines:
+                    yield line.decode(encoding, errors='replace')
+                continue
+
+            # 没有新数据：检查文件是否被轮转或截断
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                stat = None
+            if stat is None or stat.st_ino != inode or stat.st_size < f.tell():
+                f.close()
+                f = None
+                partial = b''
+                continue
+            time.sleep(poll_interval)
+    finally:
+        if f:
+            f.close()
+
+def _benchmark(size_mb=1024, n=10):
+    """在合成日志上对比尾部读取与整文件读取"""
+    import tempfile
+    line = '{"ts": 1700000000.0, "user": "测试用户", "item": [0, 1234567, "晴天", "周杰伦", "测试用户"]}\n'.encode('utf-8')
+    block = line * (1024 * 1024 // len(line))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "requests.jsonl")
+        print(f"生成 {size_mb} MB 合成日志...")
+        with open(path, 'wb') as f:
+            for _ in range(size_mb):
+                f.write(block)
+
+        start = time.perf_counter()
+        result = tail_lines(path, n)
+        tail_time = time.perf_counter() - start
+        print(f"tail_lines({n}): {tail_time * 1000:.3f} ms, 返回 {len(result)} 行")
+
+        start = time.perf_counter()
+        last = []
+        with open(path, 'r', encoding='utf-8') as f:
+            for text in f:
+                last.append(text)
+                if len(last) > n:
+                    last.pop(0)
+        scan_time = time.perf_counter() - start
+        print(f"逐行扫描全文件: {scan_time * 1000:.1f} ms ({scan_time / tail_time:.0f}x)")
+
+if __name__ == "__main__":
+    # python -m modules.tail [大小MB]
+    _benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 1024)
@@ -1,24 +1,93 @@
 import asyncio
-from playwright.async_api import async_playwright
+import contextlib
+import html
 import json
 import re
-from urllib.parse import urljoin
+import time
+from html.parser import HTMLParser
+from urllib.parse import quote, urljoin
 import sys
 import subprocess
 import os
 import platform
 
+from modules.http_client import TTLCache, fetch_text
+from modules.utils import normalize_text
+
+BASE_URL = "https://music.pjmp3.com"
+LAUNCH_ARGS = [
+    '--no-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-gpu',
+    '--window-size=1920,1080'
+]
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+# 解析只需要文档、脚本与XHR，其余资源及统计脚本一律中止
+BLOCKED_RESOURCE_TYPES = {"image", "media", "font", "stylesheet", "texttrack", "manifest"}
+BLOCKED_HOSTS = ("google-analytics.com", "googletagmanager.com", "doubleclick.net",
+                 "googlesyndication.com", "hm.baidu.com", "cnzz.com", "51.la")
+
+NAVIGATION_TIMEOUT = 10000  # 页面跳转超时（毫秒）
+RESULT_TIMEOUT = 5000       # 等待搜索结果列表出现的超时，超时视为无结果
+AUDIO_TIMEOUT = 5000        # 等待播放器数据或音频请求的超时
+
+RESULT_SELECTOR = "a.search-result-list-item"
+# 前5个搜索结果的歌名、歌手与链接
+RESULTS_JS = """
+    (items) => items.slice(0, 5).map((item) => {
+        const text = (selector) => {
+            const elem = item.querySelector(selector);
+            return elem ? elem.innerText : null;
+        };
+        return {
+            title: text(".search-result-list-item-left-song"),
+            artist: text(".search-result-list-item-left-singer"),
+            href: item.getAttribute("href")
+        };
+    })
+"""
+# 播放器（APlayer）初始化后返回第一首的音频URL，之前返回null以继续等待
+AUDIO_URL_JS = """
+    () => {
+        if (typeof ap !== 'undefined' && ap.options && ap.options.audio && ap.options.audio.length) {
+            return ap.options.audio[0].url || null;
+        }
+        return null;
+    }
+"""
+
+async def _route_request(route):
+    """请求拦截：中止解析用不到的资源"""
+    request = route.request
+    if request.resource_type in BLOCKED_RESOURCE_TYPES or any(host in request.url for host in BLOCKED_HOSTS):
+        await route.abort()
+    else:
+        await route.continue_()
+
+async def _launch(playwright):
+    """启动无头浏览器并创建上下文，返回 (browser, context)"""
+    browser = await playwright.chromium.launch(
+        headless=True,  # 设为True可无头运行
+        args=LAUNCH_ARGS
+    )
+    context = await browser.new_context(user_agent=USER_AGENT)
+    context.set_default_navigation_timeout(NAVIGATION_TIMEOUT)
+    await context.route("**/*", _route_request)
+    return browser, context
+
 class UnorthodoxMusicPlayer:
     """
     集成MPV播放功能的备用音乐线路测试工具
     用于验证从music.pjmp3.com获取音乐资源并使用MPV播放的可行性
+    传入 page 时直接使用该页面（由 BrowserPool 提供），无需 initialize/close
     """
     
-    def __init__(self):
-        self.base_url = "https://music.pjmp3.com"
+    def __init__(self, page=None, base_url=BASE_URL):
+        self.base_url = base_url
         self.browser = None
         self.context = None
-        self.page = None
+        self.page = page
         self.mpv_path = self._find_mpv_path()
     
     def _find_mpv_path(self):
@@ -59,19 +128,9 @@ class UnorthodoxMusicPlayer:
     async def initialize(self):
         """初始化Playwright浏览器"""
         try:
+            from playwright.async_api import async_playwright  # 首次使用备线源时才导入
             self.playwright = await async_playwright().start()
-            self.browser = await self.playwright.chromium.launch(
-                headless=True,  # 设为True可无头运行
-                args=[
-                    '--no-sandbox',
-                    '--disable-dev-shm-usage',
-                    '--disable-gpu',
-                    '--window-size=1920,1080'
-                ]
-            )
-            self.context = await self.browser.new_context(
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            )
+            self.browser, self.context = await _launch(self.playwright)
             self.page = await self.context.new_page()
             return True
         except Exception as e:
@@ -80,45 +139,30 @@ class UnorthodoxMusicPlayer:
     
     async def search_song(self, keyword):
         """搜索歌曲"""
+        from playwright.async_api import TimeoutError as PlaywrightTimeoutError
         try:
-            search_url = f"{self.base_url}/search.php?keyword={keyword}"
+            search_url = f"{self.base_url}/search.php?keyword={quote(keyword)}"
             print(f"[SYS] 正在处理...(1/3)")
             
-            await self.page.goto(search_url, wait_until="networkidle")
-            await self.page.wait_for_timeout(3000)  # 等待页面加载
-            
-            # 查找搜索结果
-            search_results = await self.page.query_selector_all("a.search-result-list-item")
+            # 文档解析完成即可，随后只等待结果列表出现
+            await self.page.goto(search_url, wait_until="domcontentloaded")
+            try:
+                await self.page.wait_for_selector(RESULT_SELECTOR, timeout=RESULT_TIMEOUT)
+            except PlaywrightTimeoutError:
+                return []
             
-            # print(f"[SYS] 找到 {len(search_results)} 个搜索结果")
+            # 一次取回前5个结果的歌名、歌手与链接
+            items = await self.page.eval_on_selector_all(RESULT_SELECTOR, RESULTS_JS)
             
             results = []
-            for i, result in enumerate(search_results[:5]):  # 只取前5个结果
-                try:
-                    # 获取歌曲信息
-                    title_elem = await result.query_selector(".search-result-list-item-left-song")
-                    artist_elem = await result.query_selector(".search-result-list-item-left-singer")
-                    
-                    title = await title_elem.inner_text() if title_elem else "未知歌曲"
-                    artist = await artist_elem.inner_text() if artist_elem else "未知歌手"
-                    
-                    # 获取链接
-                    href = await result.get_attribute("href")
-                    if href:
-                        full_url = urljoin(self.base_url, href)
-                        results.append({
-                            'title': title,
-                            'artist': artist,
-                            'url': full_url,
-                            'index': i+1
-                        })
-                        # print(f"[SYS] {i+1}. {title} - {artist}")
-                    else:
-                        # print(f"[SYS] {i+1}. 找到结果但无链接")
-                        continue
-                except Exception as e:
-                    # print(f"[SYS] 处理搜索结果 {i+1} 时出错: {e}")
-                    continue
+            for i, item in enumerate(items):
+                if item.get('href'):
+                    results.append({
+                        'title': item.get('title') or "未知歌曲",
+                        'artist': item.get('artist') or "未知歌手",
+                        'url': urljoin(self.base_url, item['href']),
+                        'index': i+1
+                    })
             
             return results
             
@@ -130,52 +174,45 @@ class UnorthodoxMusicPlayer:
             print(content[:1000])
             return []
     
+    async def _first_audio_url(self, media):
+        """等待播放器数据就绪或播放器发出音频请求，取先到者；均超时返回None"""
+        player = asyncio.ensure_future(self.page.wait_for_function(AUDIO_URL_JS, timeout=AUDIO_TIMEOUT))
+        pending = {media, player}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        continue  # 一方超时后继续等待另一方
+                    if task is media:
+                        return task.result().url
+                    return await task.result().json_value()
+            return None
+        finally:
+            player.cancel()
+    
     async def get_audio_url(self, song_page_url):
         """从歌曲页面获取音频URL"""
         try:
             print(f"[SYS] 正在处理...(2/3)")
-            await self.page.goto(song_page_url, wait_until="networkidle")
-            await self.page.wait_for_timeout(3000)  # 等待页面加载
-            
-            # 执行JavaScript获取音频信息
+            # 音频请求会被拦截中止，但请求事件仍会触发，其中即为音频URL
+            media = asyncio.ensure_future(self.page.wait_for_event(
+                "request", predicate=lambda request: request.resource_type == "media", timeout=AUDIO_TIMEOUT))
             try:
-                audio_data = await self.page.evaluate("""
-                    () => {
-                        if (typeof ap !== 'undefined' && ap.options && ap.options.audio) {
-                            return ap.options.audio;
-                        } else {
-                            return null;
-                        }
-                    }
-                """)
-                
-                if audio_data:
-                    print("[SYS] 正在处理...(3/3)")
-                    if isinstance(audio_data, list) and len(audio_data) > 0:
-                        audio_info = audio_data[0]
-                        # print(f"[SYS]   歌曲: {audio_info.get('name', '未知')}")
-                        # print(f"[SYS]   歌手: {audio_info.get('artist', '未知')}")
-                        # print(f"[SYS]   封面: {audio_info.get('cover', '无')}")
-                        # print(f"[SYS]   音频URL: {audio_info.get('url', '无')}")
-                        
-                        return audio_info.get('url', None)
-                    else:
-                        # print(f"[SYS]   返回数据格式: {type(audio_data)}")
-                        # print(f"[SYS]   返回数据: {audio_data}")
-                        return None
-                else:
-                    print("[SYS] 未能获取音频信息")
-                    # 输出页面内容用于调试
-                    content = await self.page.content()
-                    print("[SYS] 页面内容片段:")
-                    print(content[:1000])
-                    
-            except Exception as e:
-                print(f"[SYS] 执行JavaScript获取音频信息时出错: {e}")
-                # 输出页面内容用于调试
-                content = await self.page.content()
-                print("[SYS] 页面内容片段:")
-                print(content[:1000])
+                await self.page.goto(song_page_url, wait_until="domcontentloaded")
+                audio_url = await self._first_audio_url(media)
+            finally:
+                media.cancel()
+            
+            if audio_url:
+                print("[SYS] 正在处理...(3/3)")
+                return urljoin(song_page_url, audio_url)
+            
+            print("[SYS] 未能获取音频信息")
+            # 输出页面内容用于调试
+            content = await self.page.content()
+            print("[SYS] 页面内容片段:")
+            print(content[:1000])
                 
         except Exception as e:
             print(f"[SYS] 获取音频URL过程中出错: {e}")
@@ -264,6 +301,264 @@ class UnorthodoxMusicPlayer:
         if hasattr(self, 'playwright'):
             await self.playwright.stop()
 
+class BrowserPool:
+    """
+    常驻的备线浏览器：一个浏览器进程 + 固定数量的可复用页面
+    并发的点歌请求分摊到不同页面，页面全部占用时排队等待
+    每次借用前检查浏览器连接，断开时整体重建；出错或已关闭的页面在下次借用时重新创建
+    空闲超过 idle_timeout 秒后关闭浏览器，下次使用时再启动
+    所有方法须在同一个事件循环中调用
+    """
+
+    def __init__(self, size=2, idle_timeout=300, base_url=BASE_URL):
+        self.size = max(1, size)
+        self.idle_timeout = idle_timeout    # 为0时常驻不关闭
+        self.base_url = base_url
+        self._playwright = None
+        self._browser = None
+        self._context = None
+        self._pages = None          # 空闲页面队列（None 表示待创建的空位）
+        self._lock = asyncio.Lock()
+        self._busy = 0
+        self._last_used = time.monotonic()
+        self._idle_task = None
+        self.launches = 0           # 浏览器启动次数
+
+    @property
+    def running(self):
+        return self._browser is not None and self._browser.is_connected()
+
+    async def _start(self):
+        """确保浏览器可用（未启动或已断开时重建）"""
+        if self.running:
+            return
+        async with self._lock:
+            if self.running:
+                return
+            await self._stop()
+            from playwright.async_api import async_playwright  # 首次使用备线源时才导入
+            self._playwright = await async_playwright().start()
+            self._browser, self._context = await _launch(self._playwright)
+            self._pages = asyncio.Queue()
+            for _ in range(self.size):
+                self._pages.put_nowait(await self._context.new_page())
+            self.launches += 1
+            if self.idle_timeout and self._idle_task is None:
+                self._idle_task = asyncio.create_task(self._idle_watch())
+
+    async def _stop(self):
+        browser, playwright = self._browser, self._playwright
+        self._browser = self._context = self._playwright = self._pages = None
+        if browser is not None:
+            with contextlib.suppress(Exception):
+                await browser.close()
+        if playwright is not None:
+            with contextlib.suppress(Exception):
+                await playwright.stop()
+
+    async def _idle_watch(self):
+        try:
+            while self._browser is not None and self.idle_timeout:
+                await asyncio.sleep(max(1, min(self.idle_timeout, 30)))
+                if self._busy or time.monotonic() - self._last_used < self.idle_timeout:
+                    continue
+                async with self._lock:
+                    if not self._busy and self._browser is not None:
+                        await self._stop()
+                        print(f"[{'SYS':>3}] 备线浏览器空闲超过 {self.idle_timeout}s，已关闭")
+        finally:
+            self._idle_task = None
+
+    @contextlib.asynccontextmanager
+    async def page(self):
+        """借用一个页面"""
+        while True:
+            await self._start()
+            pages, context = self._pages, self._context
+            page = await pages.get()
+            if pages is self._pages:
+                break
+            # 等待期间浏览器已重建：把空位让给其他等待者后重新借用
+            pages.put_nowait(None)
+        self._busy += 1
+        healthy = False
+        try:
+            if page is None or page.is_closed():
+                page = await context.new_page()
+            yield page
+            healthy = True
+        finally:
+            self._busy -= 1
+            self._last_used = time.monotonic()
+            if not healthy and page is not None:
+                with contextlib.suppress(Exception):
+                    await page.close()
+                page = None
+            pages.put_nowait(page)
+
+    async def search_and_get_first_song(self, keyword):
+        """借用页面完成一次备线搜索，返回值同 UnorthodoxMusicPlayer.search_and_get_first_song"""
+        async with self.page() as page:
+            return await UnorthodoxMusicPlayer(page, self.base_url).search_and_get_first_song(keyword)
+
+    async def close(self):
+        """关闭浏览器"""
+        async with self._lock:
+            await self._stop()
+        if self._idle_task is not None:
+            self._idle_task.cancel()
+            self._idle_task = None
+
+# ---------- 免浏览器解析 ----------
+
+# 播放器初始化脚本中的第一首音频：audio: [{ ..., url: '...' }]（键名可带引号，如JSON）
+_AUDIO_BLOCK = re.compile(r"""\baudio["']?\s*:\s*\[\s*\{(.*?)\}""", re.S)
+_URL_FIELD = re.compile(r"""["']?\burl["']?\s*:\s*(["'])(.*?)(?<!\\)\1""", re.S)
+_AUDIO_TAG = re.compile(r"""<(?:audio|source)\b[^>]*?\ssrc\s*=\s*(["'])(.*?)\1""", re.I | re.S)
+
+class _SearchResultParser(HTMLParser):
+    """提取 a.search-result-list-item 中的歌名、歌手与链接"""
+
+    FIELDS = {
+        "search-result-list-item-left-song": "title",
+        "search-result-list-item-left-singer": "artist",
+    }
+
+    def __init__(self):
+        super().__init__()
+        self.items = []
+        self._item = None
+        self._field = None      # 正在读取的字段
+        self._field_tag = None
+        self._depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        classes = (attrs.get("class") or "").split()
+        if self._item is None:
+            if tag == "a" and "search-result-list-item" in classes:
+                self._item = {"title": "", "artist": "", "href": attrs.get("href")}
+            return
+        if self._field is None:
+            for name, field in self.FIELDS.items():
+                if name in classes:
+                    self._field, self._field_tag, self._depth = field, tag, 1
+                    return
+        elif tag == self._field_tag:
+            self._depth += 1
+
+    def handle_endtag(self, tag):
+        if self._item is None:
+            return
+        if self._field is not None and tag == self._field_tag:
+            self._depth -= 1
+            if self._depth == 0:
+                self._field = None
+        elif tag == "a":
+            self.items.append(self._item)
+            self._item = self._field = None
+
+    def handle_data(self, data):
+        if self._field is not None:
+            self._item[self._field] += data
+
+def parse_search_results(page_html, base_url=BASE_URL, limit=5):
+    """解析搜索页，返回格式同 UnorthodoxMusicPlayer.search_song"""
+    parser = _SearchResultParser()
+    parser.feed(page_html)
+    parser.close()
+    results = []
+    for i, item in enumerate(parser.items[:limit]):
+        if item["href"]:
+            results.append({
+                'title': " ".join(item["title"].split()) or "未知歌曲",
+                'artist': " ".join(item["artist"].split()) or "未知歌手",
+                'url': urljoin(base_url, item["href"]),
+                'index': i+1
+            })
+    return results
+
+def parse_audio_url(page_html, page_url):
+    """从歌曲页的播放器初始化脚本（或 audio 标签）中取第一首的音频URL"""
+    block = _AUDIO_BLOCK.search(page_html)
+    match = _URL_FIELD.search(block.group(1)) if block else None
+    if match:
+        url = match.group(2)
+        if match.group(1) == '"':
+            try:
+                url = json.loads(f'"{url}"')
+            except ValueError:
+                pass
+        url = url.replace("\\/", "/")
+    else:
+        match = _AUDIO_TAG.search(page_html)
+        if not match:
+            return None
+        url = html.unescape(match.group(2))
+    return urljoin(page_url, url) if url else None
+
+async def http_search_and_get_first_song(keyword, base_url=BASE_URL, session=None):
+    """不启动浏览器，直接请求并解析搜索页与歌曲页；返回值同 search_and_get_first_song"""
+    search_html = await fetch_text(f"{base_url}/search.php?keyword={quote(keyword)}", session=session)
+    results = parse_search_results(search_html, base_url) if search_html else []
+    if not results:
+        return None
+    first_result = results[0]
+    song_html = await fetch_text(first_result['url'], session=session)
+    audio_url = parse_audio_url(song_html, first_result['url']) if song_html else None
+    if not audio_url:
+        return None
+    return (first_result['index'], first_result['title'], first_result['artist'], audio_url)
+
+class UnorthodoxSource:
+    """
+    备线点歌入口：结果缓存 → 免浏览器解析 → 浏览器池兜底
+    缓存按归一化后的关键词存放，容量与有效期有限（音频URL可能过期）
+    """
+
+    def __init__(self, pool_size=2, idle_timeout=300, cache_size=256, cache_ttl=600, base_url=BASE_URL):
+        self.base_url = base_url
+        self.pool = BrowserPool(pool_size, idle_timeout, base_url)
+        self.cache = TTLCache(cache_size, cache_ttl)
+        self.stats = {"cache": 0, "http": 0, "browser": 0, "miss": 0}
+        self._retiring = set()  # 正在后台关闭的旧浏览器池任务
+
+    def configure(self, pool_size, idle_timeout, cache_ttl):
+        """应用配置变更（池大小变化时关闭旧池，下次使用时按新大小启动）"""
+        if max(1, pool_size) != self.pool.size:
+            task = asyncio.get_running_loop().create_task(self.pool.close())
+            self._retiring.add(task)
+            task.add_done_callback(self._retiring.discard)
+            self.pool = BrowserPool(pool_size, idle_timeout, self.base_url)
+        self.pool.idle_timeout = idle_timeout
+        self.cache.ttl = cache_ttl
+
+    async def search_and_get_first_song(self, keyword):
+        key = normalize_text(keyword) or keyword
+        result = self.cache.get(key)
+        if result is not None:
+            self.stats["cache"] += 1
+            return result
+        try:
+            result = await http_search_and_get_first_song(keyword, self.base_url)
+        except Exception as e:
+            print(f"[SYS] 直连解析失败，改用浏览器: {e}")
+            result = None
+        if result is not None:
+            self.stats["http"] += 1
+        else:
+            result = await self.pool.search_and_get_first_song(keyword)
+            self.stats["browser" if result else "miss"] += 1
+        if result is not None:
+            self.cache.put(key, result)
+        return result
+
+    async def close(self):
+        """关闭浏览器池，并等待仍在关闭中的旧池"""
+        await self.pool.close()
+        if self._retiring:
+            await asyncio.gather(*self._retiring, return_exceptions=True)
+
 async def main():
     """主函数"""
     # print("[SYS] 正在初始化集成MPV播放功能的备用音乐线路测试工具...")
@@ -279,5 +574,141 @@ async def main():
         import traceback
         traceback.print_exc()
 
+# 模拟备线站点结构的静态页面（搜索结果列表 + 定义了 ap.options.audio 的歌曲页）
+# /slow 开头的资源（样式、图片）延迟返回，模拟拖慢 networkidle 的图片、字体与统计请求
+_FIXTURE_SEARCH = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><link rel="stylesheet" href="/slow.css"></head><body>
+<img src="/slow.png">
+<a class="search-result-list-item" href="/song.php?id=1">
+  <span class="search-result-list-item-left-song">测试歌曲</span>
+  <span class="search-result-list-item-left-singer">测试歌手</span>
+</a>
+<a class="search-result-list-item" href="/song.php?id=2">
+  <span class="search-result-list-item-left-song">测试歌曲2</span>
+  <span class="search-result-list-item-left-singer">测试歌手2</span>
+</a>
+</body></html>"""
+
+_FIXTURE_SONG = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><link rel="stylesheet" href="/slow.css"></head><body>
+<img src="/slow-cover.png">
+<div id="player"></div>
+<script>
+var ap = {options: {audio: [{name: "测试歌曲", artist: "测试歌手", cover: "", url: "/audio/1.mp3"}]}};
+</script>
+</body></html>"""
+
+def _serve_fixture(slow_delay=1.5):
+    """在后台线程中提供模拟站点，返回 (server, base_url)"""
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    pages = {"/search.php": _FIXTURE_SEARCH, "/song.php": _FIXTURE_SONG}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.startswith("/slow"):
+                time.sleep(slow_delay)
+                self.send_response(200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            body = pages.get(self.path.split("?")[0])
+            if body is None:
+                self.send_error(404)
+                return
+            data = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def _check_fixture_parsing():
+    """离线校验：直接解析模拟页面，不发起任何请求"""
+    results = parse_search_results(_FIXTURE_SEARCH, "http://fixture")
+    assert [(r['title'], r['artist']) for r in results] == [("测试歌曲", "测试歌手"), ("测试歌曲2", "测试歌手2")], results
+    assert results[0]['url'] == "http://fixture/song.php?id=1", results
+    assert parse_audio_url(_FIXTURE_SONG, "http://fixture/song.php?id=1") == "http://fixture/audio/1.mp3"
+    assert parse_audio_url('<audio src="/a.mp3?x=1&amp;y=2">', "http://fixture/s") == "http://fixture/a.mp3?x=1&y=2"
+    assert parse_audio_url("<html></html>", "http://fixture/s") is None
+
+async def _benchmark(requests=6, size=3):
+    """备线点歌延迟与吞吐测试：直连解析 / 每次请求启动浏览器 / 浏览器池（本地模拟站点）"""
+    import io
+    from modules.http_client import close_session
+    _check_fixture_parsing()
+    print("离线解析校验通过")
+    server, base_url = _serve_fixture()
+
+    async def cold(keyword):
+        player = UnorthodoxMusicPlayer(base_url=base_url)
+        await player.initialize()
+        try:
+            return await player.search_and_get_first_song(keyword)
+        finally:
+            await player.close()
+
+    async def direct(keyword):
+        return await http_search_and_get_first_song(keyword, base_url)
+
+    async def timed(func, keyword):
+        start = time.perf_counter()
+        result = await func(keyword)
+        assert result and result[3].endswith("/audio/1.mp3"), result
+        return time.perf_counter() - start
+
+    async def sequential(label, func):
+        results.append((f"{label}（逐个）", [await timed(func, f"song{i}") for i in range(requests)], None))
+
+    async def concurrent(label, func):
+        start = time.perf_counter()
+        latencies = await asyncio.gather(*(timed(func, f"song{i}") for i in range(requests)))
+        results.append((f"{label}（并发 {requests}）", latencies, time.perf_counter() - start))
+
+    def report(label, latencies, total=None):
+        latencies = sorted(latencies)
+        line = (f"{label}: 平均 {sum(latencies) / len(latencies) * 1000:.0f} ms, "
+                f"中位 {latencies[len(latencies) // 2] * 1000:.0f} ms, 最大 {latencies[-1] * 1000:.0f} ms")
+        if total is not None:
+            line += f", 总计 {total * 1000:.0f} ms, 吞吐 {len(latencies) / total:.1f} 次/秒"
+        print(line)
+
+    pool = BrowserPool(size=size, idle_timeout=0, base_url=base_url)
+    results = []
+    first = None
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            await sequential("直连解析", direct)
+            await concurrent("直连解析", direct)
+            try:
+                await sequential("冷启动", cold)
+                first = await timed(pool.search_and_get_first_song, "warmup")
+                await sequential(f"浏览器池 size={size}", pool.search_and_get_first_song)
+                await concurrent(f"浏览器池 size={size}", pool.search_and_get_first_song)
+            except ImportError:
+                pass
+    finally:
+        await pool.close()
+        await close_session()
+        server.shutdown()
+    for label, latencies, total in results:
+        report(label, latencies, total)
+    if first is None:
+        print("未安装 playwright，跳过浏览器路径")
+    else:
+        print(f"浏览器池首次请求（含启动）: {first * 1000:.0f} ms")
+
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    # python -m modules.unorthodox [--benchmark]
+    if "--benchmark" in sys.argv:
+        asyncio.run(_benchmark())
+    else:
+        asyncio.run(main())
@@ -3,6 +3,7 @@
 
 import re
 import hashlib
+import unicodedata
 from datetime import datetime
 import platform
 import subprocess
@@ -56,6 +57,12 @@ def parse_bilibili_id(video_id):
     # 如果不是特殊格式，返回原ID
     return video_id, None
 
+_NON_WORD = re.compile(r'[\W_]+')
+
+def normalize_text(text):
+    """归一化文本用于匹配：全角转半角(NFKC)、统一大小写、去除空白与标点"""
+    return _NON_WORD.sub('', unicodedata.normalize('NFKC', text).casefold())
+
 def format_output(prefix, user_name, content):
     """格式化输出，使前缀对齐"""
     return f"[{prefix:>3}] {user_name}: {content}"
@@ -80,9 +87,48 @@ def format_denied_output(user_name, content):
     """格式化权限拒绝输出"""
     return f"[{'DNY':>3}] {user_name}: {content}"
 
+DEPS_CACHE_FILE = "data/deps_check.json"
+
+def _requirements_fingerprint(required_packages):
+    """依赖检查的缓存键：解释器 + 依赖清单 + requirements.txt + site-packages 修改时间"""
+    import json
+    import sysconfig
+    
+    digest = hashlib.sha256()
+    digest.update(f"{sys.executable}|{sys.version}".encode('utf-8'))
+    digest.update(json.dumps(sorted(required_packages.items())).encode('utf-8'))
+    requirements_file = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "requirements.txt")
+    if os.path.exists(requirements_file):
+        with open(requirements_file, 'rb') as f:
+            digest.update(f.read())
+    # 安装/卸载包会改变 site-packages 目录的修改时间，使缓存失效
+    for key in ("purelib", "platlib"):
+        try:
+            digest.update(str(os.stat(sysconfig.get_paths()[key]).st_mtime_ns).encode('utf-8'))
+        except (KeyError, OSError):
+            pass
+    return digest.hexdigest()
+
+def _load_deps_cache():
+    import json
+    try:
+        with open(DEPS_CACHE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f).get("fingerprint")
+    except (OSError, ValueError):
+        return None
+
+def _save_deps_cache(fingerprint):
+    import json
+    try:
+        os.makedirs(os.path.dirname(DEPS_CACHE_FILE), exist_ok=True)
+        with open(DEPS_CACHE_FILE, 'w', encoding='utf-8') as f:
+            json.dump({"fingerprint": fingerprint}, f)
+    except OSError:
+        pass
+
 def check_and_install_requirements():
-    """检查并安装所需的依赖包"""
-    import importlib
+    """检查并安装所需的依赖包（解释器与依赖清单未变化时直接使用上次的检查结果）"""
+    import importlib.util
     import subprocess
     
     required_packages = {
@@ -99,27 +145,33 @@ def check_and_install_requirements():
         required_packages['win32file'] = 'pywin32>=306'
         required_packages['pywintypes'] = 'pywin32>=306'
 
+    fingerprint = _requirements_fingerprint(required_packages)
+    if _load_deps_cache() == fingerprint:
+        print("环境配置完成 (已缓存)")
+        return
+    
+    # 只查找模块是否存在，不实际导入
+    def is_installed(import_name):
+        try:
+            return importlib.util.find_spec(import_name) is not None
+        except (ImportError, ValueError):
+            return False
+    
     missing_packages = []
     
     for import_name, package_name in required_packages.items():
         if import_name == 'tkinter':
-            try:
-                import tkinter
-            except ImportError:
+            if not is_installed('tkinter'):
                 print("警告: tkinter 未找到，GUI 功能可能不可用。")
         elif import_name in ['win32file', 'pywintypes']:
-            try:
-                importlib.import_module(import_name)
-            except ImportError:
+            if not is_installed(import_name):
                 if package_name and 'pywin32' in missing_packages:
                     continue
                 elif package_name:
                     if 'pywin32' not in missing_packages:
                         missing_packages.append(package_name)
         else:
-            try:
-                importlib.import_module(import_name)
-            except ImportError:
+            if not is_installed(import_name):
                 if package_name:
                     missing_packages.append(package_name)
     
@@ -140,12 +192,15 @@ def check_and_install_requirements():
         try:
             subprocess.check_call([sys.executable, '-m', 'pip', 'install'] + final_missing)
             print("依赖包安装完成")
+            importlib.invalidate_caches()
+            _save_deps_cache(_requirements_fingerprint(required_packages))
         except subprocess.CalledProcessError as e:
             print(f"依赖包安装失败: {e}")
             print("请手动执行: pip install " + " ".join(final_missing))
             sys.exit(1)
     else:
         print("环境配置完成")
+        _save_deps_cache(fingerprint)
 
 def get_mpv_path(config_mpv_path="mpv"):
     """
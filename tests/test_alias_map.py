@@ -0,0 +1,67 @@
+# tests/test_alias_map.py
+# 点歌词典映射测试：归一化、前缀补全、错字匹配与增量维护
+
+from modules.alias_map import AliasMap
+
+def aliases():
+    return AliasMap({
+        "晴天": "186016",
+        "Love Story": "BV1xx411c7mD",
+        "稻香": "185811",
+        "七里香": "185809",
+        "hello world": "1",
+        "hello word": "2",
+    })
+
+def test_exact_and_normalized():
+    mapping = aliases()
+    assert mapping.resolve("晴天") == ("晴天", "186016")
+    # 大小写、全角与空白归一化后命中，返回原始键
+    assert mapping.resolve(" ＬＯＶＥ story ") == ("Love Story", "BV1xx411c7mD")
+    assert mapping.resolve("！！") is None
+
+def test_unique_prefix():
+    mapping = AliasMap({"lovestory": "a", "lovesong": "b", "七里香": "c"})
+    assert mapping.resolve("loves") is None  # 两个键共享前缀
+    assert mapping.resolve("lovest") == ("lovestory", "a")
+    assert mapping.resolve("七里") is None   # 短于 min_prefix
+    assert AliasMap({"七里香": "c"}, min_prefix=2).resolve("七里") == ("七里香", "c")
+
+def test_typo_within_distance():
+    mapping = aliases()
+    assert mapping.resolve("love stroy") == ("Love Story", "BV1xx411c7mD")
+    assert mapping.resolve("七里想") == ("七里香", "185809")
+    # 短查询不做模糊匹配
+    assert mapping.resolve("晴添") is None
+    # 较长查询允许2处差异
+    assert mapping.resolve("lovx storx") == ("Love Story", "BV1xx411c7mD")
+    assert mapping.resolve("lovx stxrx") is None
+    assert mapping.resolve("完全不相关的词") is None
+
+def test_tie_with_different_targets_is_ambiguous():
+    mapping = aliases()
+    # 与 "hello world" / "hello word" 距离均为1，目标不同，视为歧义
+    assert mapping.resolve("hello wordd") is None
+    mapping["hello word"] = "1"
+    assert mapping.resolve("hello wordd")[1] == "1"
+
+def test_incremental_updates():
+    mapping = aliases()
+    del mapping["七里香"]
+    assert mapping.resolve("七里想") is None
+    assert mapping.pop("不存在", None) is None
+    mapping["夜曲"] = "185813"
+    assert mapping.resolve("夜曲") == ("夜曲", "185813")
+    changed = mapping.sync({"晴天": "186016", "稻香": "0"})
+    assert changed == 5
+    assert sorted(mapping) == ["晴天", "稻香"]
+    assert mapping.resolve("稻香") == ("稻香", "0")
+    assert mapping.resolve("love story") is None
+    mapping.clear()
+    assert mapping.resolve("晴天") is None
+
+def test_duplicate_normalized_keys_use_latest():
+    mapping = AliasMap({"Love Story": "a", "love story": "b"})
+    assert mapping.resolve("LOVE STORY") == ("love story", "b")
+    del mapping["love story"]
+    assert mapping.resolve("LOVE STORY") == ("Love Story", "a")
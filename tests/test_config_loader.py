@@ -0,0 +1,124 @@
+# tests/test_config_loader.py
+# 配置加载测试：类型转换、校验回退与键级差异分发
+
+import json
+
+import pytest
+
+from modules.config_loader import ConfigLoader
+from modules.persistence import persistence
+
+@pytest.fixture
+def loader(tmp_path):
+    path = tmp_path / "config" / "config.json"
+    path.parent.mkdir()
+    path.write_text(json.dumps({"env_roomid": 1, "env_queue_maxsize": 5, "env_alpha": 1.0}), encoding="utf-8")
+    return ConfigLoader(str(path))
+
+# ---------- 类型转换 ----------
+
+@pytest.mark.parametrize("value, expected, result", [
+    (" 42 ", int, 42),
+    (3.0, int, 3),
+    ("0.5", (int, float), 0.5),
+    ("yes", bool, True),
+    ("Off", bool, False),
+    (1, bool, True),
+    (0, bool, False),
+    (8765, str, "8765"),
+])
+def test_coerce_compatible_values(value, expected, result):
+    coerced = ConfigLoader._coerce(value, expected)
+    assert coerced == result and type(coerced) is type(result)
+
+@pytest.mark.parametrize("value, expected", [
+    ("abc", int),
+    (3.5, int),
+    (True, int),
+    (True, str),
+    ("maybe", bool),
+    (2, bool),
+    ([1], str),
+    ({}, list),
+])
+def test_coerce_rejects_incompatible_values(value, expected):
+    with pytest.raises(ValueError):
+        ConfigLoader._coerce(value, expected)
+
+# ---------- 校验 ----------
+
+def test_validate_coerces_or_falls_back(loader, capsys):
+    clean = loader.validate({
+        "env_queue_maxsize": "8",
+        "env_alpha": 1,
+        "env_unorthodox": "on",
+        "env_poll_interval": "快一点",
+        "unknown_key": "保留",
+    })
+    assert clean == {
+        "env_queue_maxsize": 8,
+        "env_alpha": 1,  # 浮点项允许写成整数
+        "env_unorthodox": True,
+        "env_poll_interval": loader.default_config["env_poll_interval"],
+        "unknown_key": "保留",
+    }
+    out = capsys.readouterr().out
+    assert "已将 '8' 转换为 8" in out
+    assert "env_poll_interval" in out and "回退为默认值" in out
+
+def test_missing_file_creates_defaults(tmp_path):
+    path = tmp_path / "config" / "config.json"
+    loader = ConfigLoader(str(path))
+    assert loader.config == loader.default_config
+    assert json.loads(path.read_text(encoding="utf-8")) == loader.default_config
+
+# ---------- 差异分发 ----------
+
+def test_apply_returns_key_diff_and_notifies_subscribers(loader):
+    seen = {"queue": [], "room": [], "all": []}
+    loader.subscribe({"env_queue_maxsize"}, seen["queue"].append)
+    loader.subscribe(["env_roomid"], seen["room"].append)
+    loader.subscribe(None, seen["all"].append)
+
+    new_config = dict(loader.config, env_queue_maxsize=10, env_poll_interval=3)
+    del new_config["env_alpha"]
+    changes = loader.apply(new_config)
+    assert changes == {
+        "env_queue_maxsize": (5, 10),
+        "env_poll_interval": (None, 3),
+        "env_alpha": (1.0, None),
+    }
+    assert loader.config == new_config
+    # 只通知关注变更键的订阅者，且只传递相关的差异
+    assert seen["queue"] == [{"env_queue_maxsize": (5, 10)}]
+    assert seen["room"] == []
+    assert seen["all"] == [changes]
+    assert [(key, old, new) for _, key, old, new in loader.changes] == \
+        [(key, old, new) for key, (old, new) in changes.items()]
+
+    # 没有变化时不通知
+    assert loader.apply(dict(new_config)) == {}
+    assert len(seen["all"]) == 1
+
+def test_subscriber_error_does_not_stop_dispatch(loader, capsys):
+    seen = []
+    loader.subscribe(None, lambda changes: 1 / 0)
+    loader.subscribe(None, seen.append)
+    loader.apply(dict(loader.config, env_roomid=2))
+    assert seen == [{"env_roomid": (1, 2)}]
+    assert "配置变更回调出错" in capsys.readouterr().out
+
+def test_update_config_validates_and_saves(loader):
+    changes = loader.update_config({"env_queue_maxsize": "7"})
+    assert changes == {"env_queue_maxsize": (5, 7)}
+    persistence.flush(loader.config_path)
+    with open(loader.config_path, encoding="utf-8") as f:
+        assert json.load(f)["env_queue_maxsize"] == 7
+
+def test_reload_dispatches_file_changes(loader):
+    seen = []
+    loader.subscribe({"env_roomid"}, seen.append)
+    with open(loader.config_path, "w", encoding="utf-8") as f:
+        json.dump(dict(loader.config, env_roomid="42"), f)
+    assert loader.reload() == {"env_roomid": (1, 42)}
+    assert seen == [{"env_roomid": (1, 42)}]
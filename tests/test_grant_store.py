@@ -0,0 +1,122 @@
+# tests/test_grant_store.py
+# 临时授权存储测试：到期、次数配额与持久化
+
+import json
+
+import pytest
+
+from modules import grant_store
+from modules.grant_store import GrantStore
+from modules.persistence import persistence
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(grant_store.time, "time", clock)
+    return clock
+
+@pytest.fixture
+def grants_file(tmp_path):
+    return str(tmp_path / "grants.json")
+
+def saved(path):
+    persistence.flush(path)
+    with open(path, encoding="utf-8") as f:
+        # 只接受标准JSON（不允许 Infinity / NaN）
+        return json.load(f, parse_constant=lambda name: pytest.fail(f"非标准JSON常量: {name}"))
+
+def test_user_grant_expires(clock, grants_file):
+    store = GrantStore(grants_file)
+    store.grant_user("alice", 60)
+    assert store.check("alice")
+    assert not store.check("bob")
+    clock.now += 60
+    assert not store.check("alice")
+    assert len(store) == 0
+
+def test_regrant_user_extends_expiry(clock, grants_file):
+    store = GrantStore(grants_file)
+    store.grant_user("alice", 10)
+    clock.now += 5
+    store.grant_user("alice", 60)
+    clock.now += 10
+    # 旧的堆条目到期时不会删除新的授权
+    assert store.check("alice")
+
+def test_global_grant(clock, grants_file):
+    store = GrantStore(grants_file)
+    store.grant_global(30)
+    assert store.check("anyone")
+    clock.now += 30
+    assert not store.check("anyone")
+
+def test_count_quota_claimed_once_per_grant(clock, grants_file):
+    store = GrantStore(grants_file)
+    store.grant_count(2)
+    assert store.check("alice")
+    store.consume("alice")
+    store.consume("alice")
+    assert store.remaining("alice") == 0
+    # 用完后同一授权期间不会重新分配
+    clock.now += 7 * 24 * 3600
+    assert not store.check("alice")
+    # 新的次数授权让所有人重新领取
+    store.grant_count(1)
+    assert store.check("alice") and store.remaining("alice") == 1
+
+def test_revoke_count_drops_claims(clock, grants_file):
+    store = GrantStore(grants_file)
+    store.grant_count(3)
+    store.check("alice")
+    store.revoke("count")
+    assert not store.check("alice")
+    assert store.remaining("alice") == 0
+
+def test_time_grant_does_not_consume_quota(clock, grants_file):
+    store = GrantStore(grants_file)
+    store.grant_count(1)
+    store.check("alice")
+    store.grant_user("alice", 60)
+    store.consume("alice")
+    assert store.remaining("alice") == 1
+
+def test_persistence_round_trip(clock, grants_file):
+    store = GrantStore(grants_file)
+    store.grant_user("alice", 60)
+    store.grant_count(2)
+    store.check("bob")
+    store.consume("bob")
+    data = saved(grants_file)
+    assert data["count_quota"] == 2 and data["claims"] == {"bob": 1}
+
+    reloaded = GrantStore(grants_file)
+    assert reloaded.remaining("bob") == 1
+    assert reloaded.check("alice")
+    # 重启后的到期时间堆仍然有效
+    clock.now += 61
+    reloaded.compact()
+    assert "alice" not in reloaded._user_until
+
+def test_expired_grants_dropped_on_load(clock, grants_file):
+    store = GrantStore(grants_file)
+    store.grant_user("alice", 10)
+    saved(grants_file)
+    clock.now += 11
+    reloaded = GrantStore(grants_file)
+    assert len(reloaded) == 0
+    assert saved(grants_file)["users"] == {}
+
+def test_unlimited_global_grant_is_strict_json(clock, grants_file):
+    store = GrantStore(grants_file)
+    store.grant_global(float("inf"))
+    assert saved(grants_file)["global_until"] is None
+    reloaded = GrantStore(grants_file)
+    clock.now += 10 ** 9
+    assert reloaded.check("anyone")
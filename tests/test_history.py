@@ -0,0 +1,66 @@
+# tests/test_history.py
+# 播放历史环形缓冲区测试
+
+from modules.history import HistoryManager, PlayEvent
+from modules.queue_item import QueueItem
+
+def play(sid, started_at, name=None):
+    return PlayEvent(QueueItem.netease(sid, name or f"歌曲{sid}", "歌手"), started_at, started_at + 1)
+
+def test_last_in_order():
+    history = HistoryManager(capacity=5)
+    for i in range(3):
+        history.record(play(i, 100 + i))
+    assert [event.item.item_id for event in history.last(5)] == [0, 1, 2]
+    assert [event.item.item_id for event in history.last(2)] == [1, 2]
+    assert history.last(0) == []
+    assert len(history) == 3
+
+def test_wraparound_evicts_oldest():
+    history = HistoryManager(capacity=3)
+    for i in range(5):
+        history.record(play(i, 100 + i))
+    assert len(history) == 3
+    assert [event.item.item_id for event in history.last(10)] == [2, 3, 4]
+    key = QueueItem.netease(0, "", "").key
+    # 被挤出缓冲区的条目不再参与去重
+    assert not history.was_played_within(key, 1000, now=110)
+    assert history.was_played_within(QueueItem.netease(2, "", "").key, 1000, now=110)
+
+def test_eviction_keeps_newer_event_for_same_key():
+    history = HistoryManager(capacity=2)
+    history.record(play(1, 100))
+    history.record(play(1, 200))
+    history.record(play(2, 300))
+    key = QueueItem.netease(1, "", "").key
+    # 挤出的是较早的那次播放，去重仍按较新的一次判断
+    assert history.was_played_within(key, 10, now=205)
+
+def test_pop_last_repoints_to_older_event():
+    history = HistoryManager(capacity=5)
+    history.record(play(1, 100))
+    history.record(play(1, 200))
+    popped = history.pop_last()
+    assert popped.started_at == 200
+    key = popped.item.key
+    assert history.was_played_within(key, 10, now=105)
+    assert not history.was_played_within(key, 10, now=205)
+    history.pop_last()
+    assert not history.was_played_within(key, 1000, now=105)
+    assert history.pop_last() is None
+
+def test_pop_last_across_wraparound():
+    history = HistoryManager(capacity=3)
+    for i in range(4):
+        history.record(play(i, 100 + i))
+    assert history.pop_last().item.item_id == 3
+    assert [event.item.item_id for event in history.last(3)] == [1, 2]
+    history.record(play(9, 200))
+    assert [event.item.item_id for event in history.last(3)] == [1, 2, 9]
+
+def test_clear():
+    history = HistoryManager(capacity=3)
+    history.record(play(1, 100))
+    history.clear()
+    assert len(history) == 0 and history.last(3) == []
+    assert not history.was_played_within(QueueItem.netease(1, "", "").key, 1000, now=100)
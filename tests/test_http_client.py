@@ -0,0 +1,96 @@
+# tests/test_http_client.py
+# 结果缓存与共享会话测试
+
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from modules import http_client
+from modules.http_client import TTLCache, close_session, fetch_text, get_session
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(http_client.time, "monotonic", clock)
+    return clock
+
+# ---------- TTLCache ----------
+
+def test_entries_expire_after_ttl(clock):
+    cache = TTLCache(maxsize=4, ttl=10)
+    cache.put("a", 1)
+    clock.now += 9.9
+    assert cache.get("a") == 1
+    clock.now += 0.1
+    assert cache.get("a") is None
+    assert cache.get("a", "default") == "default"
+    # 过期条目在访问时删除
+    assert len(cache) == 0
+    assert (cache.hits, cache.misses) == (1, 2)
+
+def test_put_refreshes_expiry(clock):
+    cache = TTLCache(maxsize=4, ttl=10)
+    cache.put("a", 1)
+    clock.now += 8
+    cache.put("a", 2)
+    clock.now += 8
+    assert cache.get("a") == 2
+
+def test_evicts_least_recently_used(clock):
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    cache.clear()
+    assert len(cache) == 0
+
+# ---------- 共享会话 ----------
+
+@pytest.fixture
+def server():
+    """本地HTTP服务：/ok 返回页面，其余返回404"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/ok":
+                self.send_error(404)
+                return
+            data = "<p>晴天</p>".encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+def test_fetch_text_shares_session(server):
+    async def run():
+        session = get_session()
+        assert get_session() is session
+        try:
+            assert await fetch_text(f"{server}/ok") == "<p>晴天</p>"
+            assert await fetch_text(f"{server}/missing") is None
+        finally:
+            await close_session()
+        assert session.closed
+
+    asyncio.run(run())
@@ -0,0 +1,150 @@
+# tests/test_rate_limit.py
+# 点歌频率限制测试：令牌桶补充、退还与重复内容抑制
+
+import asyncio
+import time
+
+import pytest
+
+from modules import permission
+from modules.permission import PermissionManager, TokenBucketLimiter
+from modules.pipeline import RequestPipeline
+
+# ---------- TokenBucketLimiter ----------
+
+def test_bucket_refills_over_time():
+    limiter = TokenBucketLimiter(capacity=2, refill_interval=10)
+    assert limiter.allow("alice", now=100)
+    assert limiter.allow("alice", now=100)
+    assert not limiter.allow("alice", now=105)
+    # 每 refill_interval 秒补充一个令牌
+    assert limiter.allow("alice", now=110)
+    assert not limiter.allow("alice", now=110)
+    # 其他用户互不影响
+    assert limiter.allow("bob", now=110)
+
+def test_full_buckets_are_evicted():
+    # 时间轮从当前时间开始推进
+    start = time.time()
+    limiter = TokenBucketLimiter(capacity=2, refill_interval=10)
+    limiter.allow("alice", now=start)
+    assert len(limiter) == 1
+    limiter.allow("bob", now=start + 100)
+    # alice 的桶早已补满，推进时间轮时删除
+    assert len(limiter) == 1
+    assert limiter.allow("alice", now=start + 100) and limiter.allow("alice", now=start + 100)
+
+def test_refund_returns_one_token():
+    limiter = TokenBucketLimiter(capacity=1, refill_interval=60)
+    assert limiter.allow("alice", now=100)
+    assert not limiter.allow("alice", now=101)
+    limiter.refund("alice", now=101)
+    assert limiter.allow("alice", now=101)
+    # 退还不超过容量
+    limiter.refund("alice", now=102)
+    limiter.refund("alice", now=102)
+    assert limiter.allow("alice", now=102)
+    assert not limiter.allow("alice", now=102)
+
+@pytest.mark.parametrize("capacity, interval", [(0, 20), (-1, 20), (3, 0)])
+def test_non_positive_settings_disable_limiting(capacity, interval):
+    limiter = TokenBucketLimiter(capacity, interval)
+    assert all(limiter.allow("alice", now=100) for _ in range(10))
+    limiter.refund("alice", now=100)
+
+# ---------- PermissionManager ----------
+
+@pytest.fixture
+def manager(tmp_path):
+    config = {
+        "env_default_admins": ["admin"],
+        "env_default_allowed_users": [],
+        "env_rate_user_capacity": 2,
+        "env_rate_user_interval": 60,
+        "env_rate_global_capacity": 100,
+        "env_rate_global_interval": 1,
+        "env_rate_dup_window": 30,
+    }
+    return PermissionManager(
+        config,
+        whitelist_file=str(tmp_path / "whitelist.json"),
+        fused_keys_file=str(tmp_path / "fused_keys.json"),
+        grants_file=str(tmp_path / "grants.json")
+    )
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(permission.time, "time", lambda: now[0])
+    return now
+
+def test_duplicate_text_suppressed_within_window(manager, clock):
+    assert manager.check_rate_limit("alice", "点歌 晴天") == (True, None)
+    allowed, reason = manager.check_rate_limit("alice", " 点歌 晴天 ")
+    assert not allowed and "重复" in reason
+    # 其他用户的相同内容不受影响
+    assert manager.check_rate_limit("bob", "点歌 晴天")[0]
+    clock[0] += 30
+    assert manager.check_rate_limit("alice", "点歌 晴天")[0]
+
+def test_user_limit_and_admin_bypass(manager, clock):
+    assert manager.check_rate_limit("alice", "a")[0]
+    assert manager.check_rate_limit("alice", "b")[0]
+    allowed, reason = manager.check_rate_limit("alice", "c")
+    assert not allowed and "频繁" in reason
+    assert all(manager.check_rate_limit("admin", str(i))[0] for i in range(10))
+
+def test_refund_rate_limit_restores_token_and_text(manager, clock):
+    assert manager.check_rate_limit("alice", "错字歌名")[0]
+    assert manager.check_rate_limit("alice", "b")[0]
+    manager.refund_rate_limit("alice", "错字歌名")
+    # 令牌与重复内容记录都已退还，可以立即重试
+    assert manager.check_rate_limit("alice", "错字歌名")[0]
+
+# ---------- 点歌流程中的退还 ----------
+
+class FakeBus:
+    def publish(self, event):
+        pass
+
+class FakeQueue:
+    def __init__(self):
+        self.items = []
+
+    def is_full(self):
+        return False
+
+    async def add_song(self, item):
+        self.items.append(item)
+        return True, None
+
+class FakeDict:
+    def resolve(self, query):
+        return None
+
+class FakeHandler:
+    dict_map = FakeDict()
+
+class FakeMusicBot:
+    def __init__(self, songs):
+        self.songs = songs
+
+    def get_song_info(self, query):
+        return self.songs.get(query, (None, None, None))
+
+def test_failed_lookup_does_not_cost_a_token(manager, clock):
+    queue = FakeQueue()
+    bot = FakeMusicBot({"晴天": (186016, "晴天", "周杰伦")})
+    pipeline = RequestPipeline(FakeBus(), manager, queue, bot, FakeHandler(), {})
+    manager.allowed_users.add("alice")
+
+    async def run():
+        for typo in ("晴添", "请天", "青天", "晴天天"):
+            await pipeline.handle_request("alice", typo)
+        await pipeline.handle_request("alice", "晴天")
+
+    asyncio.run(run())
+    assert [item.item_id for item in queue.items] == [186016]
+    # 只有成功入队的请求消耗了令牌
+    assert manager.check_rate_limit("alice", "另一首")[0]
+    assert not manager.check_rate_limit("alice", "第三首")[0]
@@ -0,0 +1,61 @@
+# tests/test_song_index.py
+# 本地歌曲索引测试：同名歌曲、歌手区分、错字与拼音匹配
+
+import pytest
+
+from modules import song_index
+from modules.queue_item import QueueItem
+from modules.song_index import SongIndex
+
+@pytest.fixture
+def index():
+    index = SongIndex(threshold=0.5)
+    index.add(186016, "晴天", "周杰伦")
+    index.add(1001, "七里香", "周杰伦")
+    index.add(2001, "倔强", "五月天")
+    return index
+
+def test_exact_and_normalized_lookup(index):
+    assert index.lookup("七里香") == (1001, "七里香", "周杰伦")
+    assert index.lookup(" 七里香！") == (1001, "七里香", "周杰伦")
+    assert index.search("七里香")[0][0] == 1.0
+    assert index.lookup("") is None and index.search("") == []
+
+def test_same_name_tie_returns_none(index):
+    index.add(3001, "晴天", "孙燕姿")
+    # 不带歌手时两首同分，无法区分
+    assert index.lookup("晴天") is None
+    scores = [score for score, _ in index.search("晴天")]
+    assert scores[0] == scores[1]
+    # 带上歌手即可唯一确定
+    assert index.lookup("晴天 周杰伦")[0] == 186016
+    assert index.lookup("孙燕姿 晴天")[0] == 3001
+
+def test_readding_same_song_is_not_a_tie(index):
+    index.add(186016, "晴天", "周杰伦", aliases=["qingtian"])
+    assert len(index) == 3
+    assert index.lookup("晴天")[0] == 186016
+    assert index.lookup("qingtian")[0] == 186016
+
+def test_typo_matches_above_threshold(index):
+    # 歌名+歌手中错一个字仍能命中
+    assert index.lookup("七里香周杰轮")[0] == 1001
+    assert index.lookup("倔強五月天")[0] == 2001
+    # 低于阈值视为未命中
+    assert index.lookup("完全无关的歌") is None
+    assert index.lookup("七里香周杰轮", threshold=0.99) is None
+
+def test_add_item_skips_videos(index):
+    index.add_item(QueueItem.netease(4001, "稻香", "周杰伦"))
+    index.add_item(QueueItem.video("BV1xx411c7mD"))
+    assert len(index) == 4
+    assert index.lookup("稻香")[0] == 4001
+    assert index.lookup("BV1xx411c7mD") is None
+
+def test_pinyin_match(monkeypatch):
+    table = {"晴": "qing", "天": "tian", "周": "zhou", "杰": "jie", "伦": "lun"}
+    monkeypatch.setattr(song_index, "lazy_pinyin", lambda text: [table.get(char, char) for char in text])
+    index = SongIndex(threshold=0.5)
+    index.add(186016, "晴天", "周杰伦")
+    assert index.lookup("qingtian")[0] == 186016
+    assert index.lookup("情天")[0] == 186016
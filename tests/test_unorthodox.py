@@ -0,0 +1,135 @@
+# tests/test_unorthodox.py
+# 备线解析与回退顺序测试（本地页面，不访问网络、不启动浏览器）
+
+import asyncio
+import os
+
+import pytest
+
+from modules import unorthodox
+from modules.unorthodox import UnorthodoxSource, parse_audio_url, parse_search_results
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+BASE_URL = "https://music.example.com"
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+# ---------- 页面解析 ----------
+
+def test_parse_search_results():
+    results = parse_search_results(read_fixture("unorthodox_search.html"), BASE_URL)
+    assert [(r['title'], r['artist']) for r in results] == [
+        ("晴天", "周杰伦"),
+        ("晴天 (Live)", "周杰伦 / 五月天"),
+        ("未知歌曲", "未知歌手"),
+    ]
+    assert [r['url'] for r in results] == [
+        "https://music.example.com/song.php?id=186016",
+        "https://music.example.com/song.php?id=2001&from=search",
+        "https://cdn.example.com/song.php?id=3",
+    ]
+    assert [r['index'] for r in results] == [1, 2, 3]
+
+def test_parse_search_results_limit_and_empty():
+    assert len(parse_search_results(read_fixture("unorthodox_search.html"), BASE_URL, limit=1)) == 1
+    assert parse_search_results("<html><body>没有结果</body></html>", BASE_URL) == []
+
+def test_parse_audio_url_from_player_options():
+    page_url = f"{BASE_URL}/song.php?id=186016"
+    assert parse_audio_url(read_fixture("unorthodox_song.html"), page_url) == \
+        "https://music.example.com/music/186016.mp3?sign=ab12&t=1700000000"
+
+def test_parse_audio_url_unescapes_json():
+    assert parse_audio_url(read_fixture("unorthodox_song_json.html"), f"{BASE_URL}/song.php?id=1") == \
+        "https://cdn.example.com/music/186016.mp3?from=晴"
+
+def test_parse_audio_url_from_audio_tag():
+    assert parse_audio_url(read_fixture("unorthodox_song_tag.html"), f"{BASE_URL}/song.php?id=1") == \
+        "https://music.example.com/music/186016.mp3?sign=ab12&t=1700000000"
+
+def test_parse_audio_url_missing():
+    assert parse_audio_url(read_fixture("unorthodox_search.html"), BASE_URL) is None
+
+# ---------- 缓存 → 直连解析 → 浏览器池 ----------
+
+SONG = (1, "晴天", "周杰伦", "https://music.example.com/music/186016.mp3")
+
+class FakePool:
+    """记录调用的浏览器池替身"""
+
+    def __init__(self, size=2, result=None):
+        self.size = size
+        self.idle_timeout = 300
+        self.result = result
+        self.calls = []
+        self.closed = False
+
+    async def search_and_get_first_song(self, keyword):
+        self.calls.append(keyword)
+        return self.result
+
+    async def close(self):
+        await asyncio.sleep(0)
+        self.closed = True
+
+@pytest.fixture
+def source(monkeypatch):
+    """http_calls 记录直连解析的调用；http_result 为其返回值（异常实例则抛出）"""
+    source = UnorthodoxSource(base_url=BASE_URL)
+    source.pool = FakePool()
+    source.http_calls = []
+    source.http_result = None
+
+    async def fake_http(keyword, base_url=BASE_URL, session=None):
+        source.http_calls.append(keyword)
+        if isinstance(source.http_result, Exception):
+            raise source.http_result
+        return source.http_result
+
+    monkeypatch.setattr(unorthodox, "http_search_and_get_first_song", fake_http)
+    return source
+
+def test_http_hit_skips_browser_and_is_cached(source):
+    source.http_result = SONG
+    assert asyncio.run(source.search_and_get_first_song("晴天")) == SONG
+    # 归一化后相同的关键词命中缓存
+    assert asyncio.run(source.search_and_get_first_song(" 晴天 ")) == SONG
+    assert source.http_calls == ["晴天"]
+    assert source.pool.calls == []
+    assert source.stats == {"cache": 1, "http": 1, "browser": 0, "miss": 0}
+
+def test_http_miss_falls_back_to_browser(source):
+    source.pool.result = SONG
+    assert asyncio.run(source.search_and_get_first_song("晴天")) == SONG
+    assert asyncio.run(source.search_and_get_first_song("晴天")) == SONG
+    assert source.http_calls == ["晴天"]
+    assert source.pool.calls == ["晴天"]
+    assert source.stats == {"cache": 1, "http": 0, "browser": 1, "miss": 0}
+
+def test_http_error_falls_back_to_browser(source):
+    source.http_result = ConnectionError("reset")
+    source.pool.result = SONG
+    assert asyncio.run(source.search_and_get_first_song("晴天")) == SONG
+    assert source.pool.calls == ["晴天"]
+
+def test_miss_is_not_cached(source):
+    assert asyncio.run(source.search_and_get_first_song("不存在")) is None
+    assert asyncio.run(source.search_and_get_first_song("不存在")) is None
+    assert source.http_calls == ["不存在", "不存在"]
+    assert source.pool.calls == ["不存在", "不存在"]
+    assert source.stats["miss"] == 2
+
+def test_resize_closes_old_pool_on_close(source):
+    async def run():
+        old = source.pool
+        source.configure(3, 60, 30)
+        assert source.pool is not old and source.pool.size == 3
+        assert source.pool.idle_timeout == 60 and source.cache.ttl == 30
+        await source.close()
+        return old
+
+    old = asyncio.run(run())
+    assert old.closed
+    assert not source._retiring